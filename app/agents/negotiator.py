@@ -1,8 +1,10 @@
 """Grafo LangGraph do agente negociador."""
 
 import json
-import os
 import re
+import threading
+import time
+from functools import partial
 
 import openai
 from dotenv import load_dotenv
@@ -11,7 +13,12 @@ from langgraph.graph import END, START, StateGraph
 from langgraph.types import Command, interrupt
 
 from app.agents.state import NegotiatorState
+from app.core.metrics import current_node, metrics, timed_node
+from app.core.resilience import build_policies, call_with_policy, with_policy
+from app.core.routing import ModelRouter, current_router, with_router
 from app.tools import OPENAI_TOOL_SCHEMAS
+from app.tools.intent import classify_offer_reply
+from app.tools.personal_info import DONE_TEMPLATE, clean_personal_fields
 from app.tools.guardrails import (
     HANDOFF_SUFFIX,
     SENSITIVE_RESPONSE,
@@ -20,12 +27,10 @@ from app.tools.guardrails import (
     check_sensitive_data,
 )
 from app.tools.pricing import approval_required, calculate_price_range
-from app.tools.retrieval import retrieve_benchmarks
+from app.tools.retrieval import BenchmarkMemo
 
 load_dotenv()
 
-MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-
 SYSTEM_PROMPT = """Você é a Raimunda, negociadora profissional que trabalha para a Gocase.
 
 Seu objetivo é fechar o melhor negócio possível para a agência — ou seja, o MENOR preço que o influenciador aceitar.
@@ -34,7 +39,7 @@ Regras de negociação:
 - NUNCA revele ao influenciador a faixa de preço interna (floor, target, ceiling). Isso é informação confidencial da agência.
 - NUNCA mencione os termos "floor", "target", "ceiling", "faixa de preço" ou valores mínimos/máximos que você está disposto a pagar.
 - NUNCA proponha um valor em reais (R$) por iniciativa própria. Você NÃO sugere preços. Quem define preço é o influenciador.
-- A ÚNICA exceção é quando há uma [CONTRAPROPOSTA DO OPERADOR] nos dados internos — nesse caso, apresente exatamente aquele valor.
+- A ÚNICA exceção é quando há "contraproposta_operador" nos dados da sessão — nesse caso, apresente exatamente aquele valor.
 - Use benchmarks de mercado como ARGUMENTO para convencer o influenciador a baixar o preço, mas sem propor um número específico. Ex: "deals similares no mercado fecham por valores bem abaixo disso" ou "o mercado pratica valores mais acessíveis para esse tipo de parceria".
 - Só ultrapasse o ceiling se receber aprovação do operador.
 - Seja cordial, profissional e persuasivo.
@@ -59,7 +64,44 @@ Aceitação de deal:
 - Respostas curtas como "sim", "ok", "fechado" em resposta a uma proposta de preço SÃO aceitações — chame confirm_deal.
 - Só NÃO chame confirm_deal se houver dúvida genuína ou contra-proposta explícita.
 
-{context}"""
+Dados da sessão:
+- No fim da entrada chega uma mensagem "[DADOS DA SESSÃO]" com um JSON compacto. Vale sempre a versão mais recente.
+- "faixa": faixa interna {floor, target, ceiling} em R$ — NUNCA revelar. O floor é o valor mínimo aceitável (comece aqui), o target é o ideal para a agência e acima do ceiling é preciso aprovação.
+- "faixas_plataforma": faixa interna por plataforma — NUNCA revelar.
+- "mercado": {count, avg_cpm, median_price} de deals similares — pode usar para justificar propostas.
+- "oferta_agente": sua última proposta ao influenciador, em R$.
+- "requer_aprovacao": se a "oferta_influenciador" precisa de aprovação humana (já calculado; não é preciso chamar tools de preço).
+- "oferta_influenciador": preço proposto pelo influenciador, em R$. Se for null, o influenciador AINDA NÃO INFORMOU SEU PREÇO — pergunte o valor dele antes de qualquer proposta.
+- "contraproposta_operador": AÇÃO OBRIGATÓRIA — apresente EXATAMENTE este valor como sua oferta ao influenciador. Diga algo como "Consigo te oferecer R$X.XXX por essa parceria, o que acha?". NÃO pergunte o mínimo do influenciador — OFEREÇA este valor diretamente.
+- "influenciador": dados já coletados do influenciador.
+
+Tarefas:
+- Quando houver uma mensagem "[TAREFA]" no fim da entrada, siga-a com prioridade sobre a estratégia geral (ex: extrair dados com uma tool, saudar, coletar dados pós-deal)."""
+
+# Chave estável para o roteamento do cache de prompt do provedor: todas as
+# chamadas compartilham o mesmo prefixo (tools + instruções).
+PROMPT_CACHE_KEY = "negotiator-v1"
+
+_client_lock = threading.Lock()
+_client_cache: tuple | None = None  # (fábrica, cliente)
+
+
+def get_client():
+    """Cliente OpenAI do processo, criado uma vez e compartilhado entre chamadas.
+
+    Reaproveita o pool de conexões HTTP; um novo cliente só é criado se a
+    fábrica ``openai.OpenAI`` for trocada (ex: stubs nos testes). Os retries
+    do SDK ficam desligados: quem repete é ``call_with_policy``.
+    """
+    global _client_cache
+    factory = openai.OpenAI
+    cached = _client_cache
+    if cached is None or cached[0] is not factory:
+        with _client_lock:
+            if _client_cache is None or _client_cache[0] is not factory:
+                _client_cache = (factory, factory(max_retries=0))
+            cached = _client_cache
+    return cached[1]
 
 GREETING_NEW = (
     "Olá, sou a Raimunda, tudo bem com você? 😊\n\n"
@@ -71,9 +113,7 @@ GREETING_NEW = (
     "Fico no aguardo! ✨"
 )
 
-GREETING_SYSTEM = (
-    "Você é a Raimunda, negociadora profissional da Gocase. "
-    "Responda sempre em português brasileiro. "
+GREETING_STYLE = (
     "Mantenha o tom amigável e profissional. Use emoji com moderação (1-2 no máximo)."
 )
 
@@ -149,6 +189,29 @@ EXTRACT_INFO_TOOL = {
     },
 }
 
+QUALIFY_TURN_TOOL = {
+    "type": "function",
+    "name": "qualify_turn",
+    "description": (
+        "Registra, numa única chamada, as informações extraídas da mensagem do "
+        "influenciador e a resposta que será enviada a ele."
+    ),
+    "parameters": {
+        **EXTRACT_INFO_TOOL["parameters"],
+        "properties": {
+            **EXTRACT_INFO_TOOL["parameters"]["properties"],
+            "reply": {
+                "type": "string",
+                "description": (
+                    "Resposta ao influenciador pedindo apenas os campos obrigatórios "
+                    "que continuam faltando depois desta mensagem."
+                ),
+            },
+        },
+        "required": ["reply"],
+    },
+}
+
 
 CONFIRM_DEAL_TOOL = {
     "type": "function",
@@ -175,62 +238,66 @@ CONFIRM_DEAL_TOOL = {
 }
 
 
-def _build_context(state: NegotiatorState) -> str:
-    """Monta a string de contexto para o system prompt.
+def _round_money(value):
+    return round(float(value), 2) if value is not None else None
+
+
+def _encode_context(data: dict) -> str:
+    """Codificação compacta e determinística (chaves ordenadas, sem espaços)."""
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
 
-    Usa rótulos internos para que o modelo conheça os valores sem vazá-los.
+def _build_context(state: NegotiatorState, precomputed: bool = False) -> str:
+    """Monta a mensagem de dados da sessão, enviada no FIM da entrada.
+
+    Tudo que varia por turno fica aqui, fora do prefixo estático
+    (tools + ``SYSTEM_PROMPT``) que o provedor consegue manter em cache.
+    O significado de cada chave está descrito no ``SYSTEM_PROMPT``. Com
+    *precomputed*, inclui o resultado de ``approval_required`` para a oferta
+    do influenciador (substitui a tool ``check_approval_required``).
     """
-    parts = []
+    data = {
+        "oferta_influenciador": _round_money(state.get("current_offer_brl")),
+    }
     if state.get("suggested_range"):
         r = state["suggested_range"]
-        parts.append(
-            "[DADOS INTERNOS — NUNCA revelar estes valores ao influenciador]\n"
-            f"  Valor mínimo aceitável (comece aqui): R${r['floor']:.2f}\n"
-            f"  Valor ideal para a agência: R${r['target']:.2f}\n"
-            f"  Valor máximo (precisa de aprovação acima): R${r['ceiling']:.2f}"
-        )
+        data["faixa"] = {k: _round_money(r[k]) for k in ("floor", "target", "ceiling")}
     if state.get("benchmarks") and state["benchmarks"].get("count", 0) > 0:
         b = state["benchmarks"]
-        parts.append(
-            "[DADOS DE MERCADO — pode usar para justificar propostas]\n"
-            f"  {b['count']} deals similares encontrados\n"
-            f"  CPM médio de mercado: R${b['avg_cpm']:.2f}\n"
-            f"  Preço mediano de mercado: R${b['median_price']:.2f}"
+        data["mercado"] = {
+            "count": b["count"],
+            "avg_cpm": _round_money(b["avg_cpm"]),
+            "median_price": _round_money(b["median_price"]),
+        }
+    if precomputed and state.get("current_offer_brl") and state.get("suggested_range"):
+        data["requer_aprovacao"] = approval_required(
+            state["current_offer_brl"], state["suggested_range"], state.get("benchmarks")
         )
     if state.get("last_agent_offer_brl"):
-        parts.append(
-            f"[SUA ÚLTIMA PROPOSTA AO INFLUENCIADOR]: R${state['last_agent_offer_brl']:.2f}"
-        )
-    if state.get("current_offer_brl"):
-        parts.append(
-            f"[PROPOSTA DO INFLUENCIADOR]: R${state['current_offer_brl']:.2f}"
-        )
-    else:
-        parts.append(
-            "[O INFLUENCIADOR AINDA NÃO INFORMOU SEU PREÇO] — Pergunte qual o valor dele antes de qualquer proposta."
-        )
+        data["oferta_agente"] = _round_money(state["last_agent_offer_brl"])
     if state.get("operator_counter_offer_brl"):
-        parts.append(
-            f"[CONTRAPROPOSTA DO OPERADOR]: R${state['operator_counter_offer_brl']:.2f}\n"
-            "AÇÃO OBRIGATÓRIA: Apresente EXATAMENTE este valor como sua oferta ao influenciador. "
-            "Diga algo como 'Consigo te oferecer R$X.XXX por essa parceria, o que acha?'. "
-            "NÃO pergunte o mínimo do influenciador — OFEREÇA este valor diretamente."
-        )
+        data["contraproposta_operador"] = _round_money(state["operator_counter_offer_brl"])
     if state.get("suggested_range_per_platform"):
-        lines = ["[FAIXAS DE PREÇO POR PLATAFORMA — NUNCA revelar]"]
-        for plat, pr in state["suggested_range_per_platform"].items():
-            lines.append(
-                f"  {plat}: floor=R${pr['floor']:.2f}, target=R${pr['target']:.2f}, ceiling=R${pr['ceiling']:.2f}"
-            )
-        parts.append("\n".join(lines))
+        data["faixas_plataforma"] = {
+            plat: {k: _round_money(pr[k]) for k in ("floor", "target", "ceiling")}
+            for plat, pr in state["suggested_range_per_platform"].items()
+        }
     known = {f: state.get(f) for f in QUALIFICATION_FIELDS if state.get(f)}
-    if state.get("name"):
-        known["name"] = state["name"]
     if state.get("platform_details"):
         known["platform_details"] = state["platform_details"]
     if known:
-        parts.append(f"Dados coletados do influenciador: {known}")
-    return "\n".join(parts)
+        data["influenciador"] = known
+    return "[DADOS DA SESSÃO] " + _encode_context(data)
+
+
+def _session_input(conversation: list, context: str | None = None, task: str | None = None) -> list:
+    """Anexa ao fim da entrada os dados da sessão e a tarefa do turno."""
+    items = list(conversation)
+    if context:
+        items.append({"role": "developer", "content": context})
+    if task:
+        items.append({"role": "developer", "content": "[TAREFA] " + task})
+    return items
 
 
 def _extract_text(output_items) -> str:
@@ -246,6 +313,77 @@ def _extract_text(output_items) -> str:
     return "\n".join(texts) if texts else ""
 
 
+def _allow_tools(*names: str, mode: str = "auto") -> dict | str:
+    """``tool_choice`` restrito a um subconjunto de ``ALL_TOOLS``.
+
+    A lista completa de tools continua sendo enviada em toda chamada para que o
+    prefixo do prompt seja idêntico; a restrição vai só no ``tool_choice``.
+    """
+    if not names:
+        return "none"
+    return {
+        "type": "allowed_tools",
+        "mode": mode,
+        "tools": [{"type": "function", "name": n} for n in names],
+    }
+
+
+def _create_response(
+    client,
+    call: str,
+    *,
+    input: list,
+    tool_choice: dict | str = "none",
+    model: str | None = None,
+    iteration: int | None = None,
+    **kwargs,
+):
+    """Chama ``client.responses.create`` registrando latência, modelo e tokens.
+
+    Todas as chamadas usam o mesmo prefixo estático (``ALL_TOOLS`` +
+    ``SYSTEM_PROMPT``) para aproveitar o cache de prompt do provedor; o que
+    muda por chamada vai em *input* e *tool_choice*.
+
+    *call* identifica o tipo de chamada (ex: ``extract_fields``, ``negotiate``);
+    o nó vem do contexto definido por ``timed_node``/``node_scope``. Sem
+    *model* explícito, modelo e limites vêm da rota (``app/core/routing.py``).
+    """
+    route = current_router().route(current_node(), call)
+    model = model or route.model
+    kwargs = {**route.request_kwargs(), **kwargs}
+    start = time.perf_counter()
+    response = None
+    try:
+        response = call_with_policy(
+            lambda timeout: client.responses.create(
+                model=model,
+                instructions=SYSTEM_PROMPT,
+                tools=ALL_TOOLS,
+                tool_choice=tool_choice,
+                input=input,
+                prompt_cache_key=PROMPT_CACHE_KEY,
+                timeout=timeout,
+                **kwargs,
+            ),
+            call,
+        )
+        return response
+    finally:
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "input_tokens_details", None)
+        metrics.record_llm_call(
+            node=current_node(),
+            call=call,
+            model=model,
+            duration_s=time.perf_counter() - start,
+            input_tokens=getattr(usage, "input_tokens", 0) or 0,
+            cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+            output_tokens=getattr(usage, "output_tokens", 0) or 0,
+            iteration=iteration,
+            error=response is None,
+        )
+
+
 def generate_greeting(
     user_message: str | None = None,
     influencer_name: str | None = None,
@@ -290,16 +428,16 @@ def generate_greeting(
 
     parts.append(
         "Depois peça os valores e formatos disponíveis para alinhar a proposta.\n"
-        "Seja concisa (máximo 4-5 linhas)."
+        "Seja concisa (máximo 4-5 linhas). " + GREETING_STYLE
     )
 
-    prompt = "\n".join(parts)
+    prompt = "Escreva a saudação inicial da conversa.\n" + "\n".join(parts)
 
-    client = openai.OpenAI()
-    response = client.responses.create(
-        model=MODEL,
-        input=[{"role": "user", "content": prompt}],
-        instructions=GREETING_SYSTEM,
+    client = get_client()
+    response = _create_response(
+        client,
+        "greeting",
+        input=_session_input([], task=prompt),
     )
     text = _extract_text(response.output)
     return text or GREETING_NEW
@@ -307,8 +445,6 @@ def generate_greeting(
 
 # ── Coleta de dados pessoais pós-deal ─────────────────────────────
 
-PERSONAL_INFO_FIELDS = ["email", "cpf", "address", "phone_model"]
-
 EXTRACT_PERSONAL_TOOL = {
     "type": "function",
     "name": "extract_personal_info",
@@ -338,27 +474,59 @@ EXTRACT_PERSONAL_TOOL = {
     },
 }
 
+POST_DEAL_TURN_TOOL = {
+    "type": "function",
+    "name": "post_deal_turn",
+    "description": (
+        "Registra, numa única chamada, os dados pessoais presentes na mensagem do "
+        "influenciador e a resposta à pergunta dele."
+    ),
+    "parameters": {
+        **EXTRACT_PERSONAL_TOOL["parameters"],
+        "properties": {
+            **EXTRACT_PERSONAL_TOOL["parameters"]["properties"],
+            "reply": {
+                "type": "string",
+                "description": (
+                    "Resposta ao influenciador: responde a pergunta e pede os dados que "
+                    "continuam faltando."
+                ),
+            },
+        },
+        "required": ["reply"],
+    },
+}
+
+# Lista única e em ordem fixa: faz parte do prefixo em cache de toda chamada.
+ALL_TOOLS = OPENAI_TOOL_SCHEMAS + [
+    CONFIRM_DEAL_TOOL,
+    EXTRACT_INFO_TOOL,
+    EXTRACT_PERSONAL_TOOL,
+    QUALIFY_TURN_TOOL,
+    POST_DEAL_TURN_TOOL,
+]
+
 
 def extract_personal_info(user_message: str, known: dict) -> dict:
     """Extrai dados pessoais da mensagem do usuário via LLM."""
-    client = openai.OpenAI()
-    known_str = json.dumps(known, ensure_ascii=False) if known else "nenhum"
-
-    response = client.responses.create(
-        model=MODEL,
-        input=[
-            {
-                "role": "user",
-                "content": (
-                    f"Mensagem do influenciador: '{user_message}'\n\n"
-                    f"Dados já coletados: {known_str}\n\n"
-                    "Extraia email, CPF, endereço e modelo de celular da mensagem. "
-                    "Se não houver nenhum dado pessoal, NÃO chame a tool."
-                ),
-            }
-        ],
-        instructions="Você é um extrator de dados. Extraia informações pessoais usando a tool disponível.",
-        tools=[EXTRACT_PERSONAL_TOOL],
+    client = get_client()
+    known_str = _encode_context(known) if known else "nenhum"
+
+    response = _create_response(
+        client,
+        "extract_personal",
+        input=_session_input(
+            [],
+            task=(
+                "Você é um extrator de dados. Extraia informações pessoais usando a tool "
+                "extract_personal_info.\n"
+                f"Mensagem do influenciador: '{user_message}'\n"
+                f"Dados já coletados: {known_str}\n"
+                "Extraia email, CPF, endereço e modelo de celular da mensagem. "
+                "Se não houver nenhum dado pessoal, NÃO chame a tool."
+            ),
+        ),
+        tool_choice=_allow_tools("extract_personal_info"),
     )
 
     extracted = {}
@@ -376,11 +544,7 @@ def generate_post_deal_response(
     name = influencer_name or "você"
 
     if not missing:
-        return (
-            f"Perfeito, {name}! Recebi todos os dados. "
-            "Muito obrigada! Em breve entraremos em contato com os próximos passos. "
-            "Tenha um ótimo dia! 😊"
-        )
+        return DONE_TEMPLATE.format(name=name)
 
     field_labels = {
         "email": "email",
@@ -395,36 +559,84 @@ def generate_post_deal_response(
     else:
         missing_str = ", ".join(missing_labels[:-1]) + " e " + missing_labels[-1]
 
-    client = openai.OpenAI()
-    response = client.responses.create(
-        model=MODEL,
-        input=[
-            {
-                "role": "user",
-                "content": (
-                    f"O influenciador ({name}) enviou: '{user_message}'\n"
-                    f"Dados já recebidos: {json.dumps(known, ensure_ascii=False)}\n"
-                    f"Ainda falta receber: {missing_str}\n\n"
-                    "Agradeça os dados recebidos de forma breve e peça o que falta. "
-                    "Seja cordial e concisa."
-                ),
-            }
-        ],
-        instructions=GREETING_SYSTEM,
+    client = get_client()
+    response = _create_response(
+        client,
+        "post_deal",
+        input=_session_input(
+            [],
+            task=(
+                "O deal já foi fechado; agora você coleta os dados para envio.\n"
+                f"O influenciador ({name}) enviou: '{user_message}'\n"
+                f"Dados já recebidos: {_encode_context(known)}\n"
+                f"Ainda falta receber: {missing_str}\n"
+                "Agradeça os dados recebidos de forma breve e peça o que falta. "
+                "Seja cordial e concisa. " + GREETING_STYLE
+            ),
+        ),
     )
     text = _extract_text(response.output)
     return text or f"Obrigada! Só falta o {missing_str}. Pode me enviar?"
 
 
-def _dispatch_tool(name: str, arguments: dict, session=None, deal_result: dict | None = None) -> dict:
-    """Despacha uma chamada de tool para a função correspondente."""
+def post_deal_turn(
+    user_message: str, known: dict, missing: list[str], influencer_name: str | None
+) -> tuple[dict, str] | None:
+    """Extrai dados pessoais e responde uma pergunta livre numa única chamada.
+
+    Retorna ``(extracted, reply)`` — com valores inválidos já descartados — ou
+    ``None`` se o modelo não devolver uma chamada ``post_deal_turn`` válida.
+    """
+    client = get_client()
+    response = _create_response(
+        client,
+        "post_deal_turn",
+        input=_session_input(
+            [],
+            task=(
+                "O deal já foi fechado; agora você coleta os dados para envio. "
+                "Chame a tool post_deal_turn UMA vez com os dados pessoais presentes na "
+                "mensagem (email, CPF, endereço, modelo de celular) e, em 'reply', a "
+                "resposta à pergunta do influenciador, pedindo o que ainda falta.\n"
+                f"O influenciador ({influencer_name or 'você'}) enviou: '{user_message}'\n"
+                f"Dados já recebidos: {_encode_context(known) if known else 'nenhum'}\n"
+                f"Ainda falta receber: {', '.join(missing) or 'nada'}\n"
+                "Seja cordial e concisa. " + GREETING_STYLE
+            ),
+        ),
+        tool_choice=_allow_tools("post_deal_turn", mode="required"),
+    )
+    for item in response.output:
+        if item.type == "function_call" and item.name == "post_deal_turn":
+            try:
+                args = json.loads(item.arguments)
+            except json.JSONDecodeError:
+                return None
+            reply = (args.pop("reply", None) or "").strip()
+            if not reply:
+                return None
+            return clean_personal_fields(args), reply
+    return None
+
+
+def _dispatch_tool(
+    name: str,
+    arguments: dict,
+    session=None,
+    deal_result: dict | None = None,
+    memo: BenchmarkMemo | None = None,
+) -> dict:
+    """Despacha uma chamada de tool para a função correspondente.
+
+    ``retrieve_benchmarks`` passa pelo *memo* da conversa quando houver.
+    """
     if name == "confirm_deal":
         if deal_result is not None:
             deal_result["accepted"] = arguments.get("accepted", False)
             deal_result["agreed_price_brl"] = arguments.get("agreed_price_brl")
         return {"status": "deal_confirmed", "accepted": arguments.get("accepted", False)}
     if name == "retrieve_benchmarks":
-        return retrieve_benchmarks(
+        return (memo or BenchmarkMemo()).get(
             platform=arguments["platform"],
             deliverable_type=arguments["deliverable_type"],
             avg_views=arguments["avg_views"],
@@ -450,46 +662,101 @@ def _dispatch_tool(name: str, arguments: dict, session=None, deal_result: dict |
     return {"error": f"Tool desconhecida: {name}"}
 
 
+# Tools determinísticas cujo resultado o grafo já calcula (price_node + contexto)
+PURE_TOOLS = ("calculate_price_range", "check_approval_required")
+
+
 def _run_openai_with_tools(
     conversation: list,
-    tools: list,
-    system_prompt: str,
-    model: str = MODEL,
+    allowed_tools: list[str],
+    model: str | None = None,
     session=None,
     deal_result: dict | None = None,
+    call: str = "tool_loop",
+    chain: dict | None = None,
+    max_tool_rounds: int = 9,
+    memo: BenchmarkMemo | None = None,
 ) -> tuple[str, list]:
-    """Executa a API Responses da OpenAI com loop de tools."""
-    client = openai.OpenAI()
-
-    for _attempt in range(10):  # máximo de iterações de tools
-        response = client.responses.create(
-            model=model,
-            input=conversation,
-            instructions=system_prompt,
-            tools=tools,
-        )
+    """Executa a API Responses da OpenAI com loop de tools.
+
+    *allowed_tools* restringe (via ``tool_choice``) quais tools de ``ALL_TOOLS``
+    o modelo pode chamar; lista vazia desliga as tools. Depois de
+    *max_tool_rounds* rodadas de tools, a chamada seguinte sai sem tools e
+    força a resposta em texto.
+
+    Com *chain*, as chamadas são encadeadas por ``previous_response_id`` e
+    cada uma envia só os itens novos: no início, ``chain["input"]`` a partir
+    de ``chain["previous_response_id"]`` (se houver); no loop, só as saídas
+    das tools. Se o servidor rejeitar o id, repete com a *conversation*
+    completa. O id da última resposta fica em ``chain["response_id"]``.
+    """
+    client = get_client()
+    tool_choice = _allow_tools(*allowed_tools)
+    previous_id = chain.get("previous_response_id") if chain is not None else None
+    pending = list(chain["input"]) if previous_id else conversation
+    extra = {"store": True} if chain is not None else {}
+
+    for _attempt in range(max_tool_rounds + 1):
+        choice = "none" if _attempt == max_tool_rounds else tool_choice
+        if _attempt and choice != tool_choice:
+            metrics.incr("tool_loop_capped", node=current_node() or "-", call=call)
+        try:
+            response = _create_response(
+                client,
+                call,
+                iteration=_attempt + 1,
+                model=model,
+                input=pending,
+                tool_choice=choice,
+                **({"previous_response_id": previous_id} if previous_id else {}),
+                **extra,
+            )
+        except (openai.BadRequestError, openai.NotFoundError):
+            if not previous_id:
+                raise
+            # Id expirado/desconhecido: reenvia tudo e recomeça a cadeia
+            metrics.incr("response_chain", node=current_node() or "-", result="invalid")
+            previous_id = None
+            response = _create_response(
+                client,
+                call,
+                iteration=_attempt + 1,
+                model=model,
+                input=conversation,
+                tool_choice=choice,
+                **extra,
+            )
+        if chain is not None:
+            previous_id = chain["response_id"] = getattr(response, "id", None)
 
         function_calls = [
             item for item in response.output if item.type == "function_call"
         ]
 
         if not function_calls:
+            metrics.record_tool_loop(current_node(), _attempt + 1)
             text = _extract_text(response.output)
             return text, conversation
 
+        outputs = []
         for fc in function_calls:
             conversation.append(fc.to_dict())
             result = _dispatch_tool(
-                fc.name, json.loads(fc.arguments), session, deal_result
-            )
-            conversation.append(
-                {
-                    "type": "function_call_output",
-                    "call_id": fc.call_id,
-                    "output": json.dumps(result),
-                }
+                fc.name, json.loads(fc.arguments), session, deal_result, memo
             )
-
+            output = {
+                "type": "function_call_output",
+                "call_id": fc.call_id,
+                "output": json.dumps(result),
+            }
+            conversation.append(output)
+            outputs.append(output)
+        # Rodadas só com tools puras são as que o modo local economiza
+        kind = "pure" if all(fc.name in PURE_TOOLS for fc in function_calls) else "other"
+        metrics.incr("tool_rounds", node=current_node() or "-", kind=kind)
+        pending = outputs if previous_id else conversation
+
+    metrics.record_tool_loop(current_node(), _attempt + 1)
     text = _extract_text(response.output)
     return text, conversation
 
@@ -497,35 +764,39 @@ def _run_openai_with_tools(
 # ── Nós do LangGraph ─────────────────────────────────────────────
 
 
+EXTRACT_FIELDS_RULES = (
+    "Converta valores como '100k' para 100000. "
+    "Se o influenciador menciona 'reels', o deliverable_type é 'reel' e a platform é 'instagram'. "
+    "Se menciona 'stories', o deliverable_type é 'story'. "
+    "IMPORTANTE sobre o campo 'name': só extraia um nome se for claramente um nome próprio de pessoa "
+    "(ex: 'Sou a Maria', 'Meu nome é João'). "
+    "NÃO extraia cumprimentos ('oi', 'olá', 'e aí'), perguntas ou palavras genéricas como nome. "
+    "Na dúvida, NÃO preencha o campo name."
+)
+
+
 def _extract_fields_from_message(user_message: str, state: NegotiatorState) -> dict:
     """Usa OpenAI para extrair campos estruturados da mensagem do usuário."""
-    client = openai.OpenAI()
+    client = get_client()
 
     known = {f: state.get(f) for f in QUALIFICATION_FIELDS if state.get(f)}
-    known_str = json.dumps(known, ensure_ascii=False) if known else "nenhum"
-
-    response = client.responses.create(
-        model=MODEL,
-        input=[
-            {
-                "role": "user",
-                "content": (
-                    f"Mensagem do influenciador: '{user_message}'\n\n"
-                    f"Dados já coletados: {known_str}\n\n"
-                    "Extraia TODAS as informações presentes na mensagem usando a tool extract_info. "
-                    "Converta valores como '100k' para 100000. "
-                    "Se o influenciador menciona 'reels', o deliverable_type é 'reel' e a platform é 'instagram'. "
-                    "Se menciona 'stories', o deliverable_type é 'story'. "
-                    "IMPORTANTE sobre o campo 'name': só extraia um nome se for claramente um nome próprio de pessoa "
-                    "(ex: 'Sou a Maria', 'Meu nome é João'). "
-                    "NÃO extraia cumprimentos ('oi', 'olá', 'e aí'), perguntas ou palavras genéricas como nome. "
-                    "Na dúvida, NÃO preencha o campo name. "
-                    "Se não houver nenhuma informação extraível, NÃO chame a tool."
-                ),
-            }
-        ],
-        instructions="Você é um extrator de dados. Extraia informações estruturadas usando a tool disponível.",
-        tools=[EXTRACT_INFO_TOOL],
+    known_str = _encode_context(known) if known else "nenhum"
+
+    response = _create_response(
+        client,
+        "extract_fields",
+        input=_session_input(
+            [],
+            task=(
+                "Você é um extrator de dados. Extraia TODAS as informações presentes "
+                "na mensagem usando a tool extract_info. "
+                + EXTRACT_FIELDS_RULES
+                + " Se não houver nenhuma informação extraível, NÃO chame a tool.\n"
+                f"Dados já coletados: {known_str}\n"
+                f"Mensagem do influenciador: '{user_message}'"
+            ),
+        ),
+        tool_choice=_allow_tools("extract_info"),
     )
 
     extracted = {}
@@ -537,12 +808,80 @@ def _extract_fields_from_message(user_message: str, state: NegotiatorState) -> d
     return extracted
 
 
-def qualify(state: NegotiatorState) -> dict:
-    """Extrai info da mensagem do usuário e pergunta campos faltantes."""
-    # Passo 1: Extrair dados da mensagem do usuário
-    extracted = _extract_fields_from_message(
-        state["last_user_message"], state
+QUALIFY_REPLY_RULES = (
+    "Responda ao influenciador pedindo os dados de qualificação que ainda faltam.\n"
+    "REGRAS OBRIGATÓRIAS:\n"
+    "1. NUNCA pergunte algo que já está nos dados confirmados. "
+    "Se 'name' já existe, NÃO peça o nome novamente.\n"
+    "2. Pergunte APENAS os campos que estão na lista 'faltando'.\n"
+    "3. Se o influenciador fez uma pergunta, responda ANTES de pedir o que falta.\n"
+    "4. Confirme os dados coletados de forma breve e natural.\n"
+    "5. Seja conciso e cordial."
+)
+
+
+def _history_input(state: NegotiatorState) -> list:
+    """Histórico recente da conversa no formato de entrada da Responses API."""
+    return [
+        {"role": msg["role"], "content": msg["content"]}
+        for msg in (state.get("conversation_history") or [])
+    ]
+
+
+def _qualify_single_call(state: NegotiatorState) -> tuple[dict, str] | None:
+    """Extrai campos e gera a resposta de qualificação numa única chamada.
+
+    Retorna ``(extracted, reply)`` ou ``None`` se o modelo não devolver uma
+    chamada ``qualify_turn`` válida (o chamador cai no caminho de duas chamadas).
+    """
+    known = {f: state.get(f) for f in QUALIFICATION_FIELDS if state.get(f)}
+    known_str = _encode_context(known) if known else "nenhum"
+    client = get_client()
+    response = _create_response(
+        client,
+        "qualify_turn",
+        input=_session_input(
+            _history_input(state),
+            _build_context(state),
+            "Chame a tool qualify_turn UMA vez com: (1) TODAS as informações presentes "
+            "na mensagem do influenciador; (2) em 'reply', a resposta a ele. "
+            + EXTRACT_FIELDS_RULES
+            + "\n"
+            + QUALIFY_REPLY_RULES
+            + f"\nCampos obrigatórios: {', '.join(QUALIFICATION_FIELDS)}.\n"
+            f"Dados já confirmados: {known_str}\n"
+            f"O influenciador disse: '{state['last_user_message']}'",
+        ),
+        tool_choice=_allow_tools("qualify_turn", mode="required"),
     )
+    for item in response.output:
+        if item.type == "function_call" and item.name == "qualify_turn":
+            try:
+                extracted = json.loads(item.arguments)
+            except json.JSONDecodeError:
+                return None
+            reply = (extracted.pop("reply", None) or "").strip()
+            if not reply:
+                return None
+            return extracted, reply
+    return None
+
+
+def qualify(state: NegotiatorState, single_call: bool = False) -> dict:
+    """Extrai info da mensagem do usuário e pergunta campos faltantes.
+
+    Com *single_call*, extração e resposta saem de uma única chamada LLM;
+    se ela falhar, usa o caminho de duas chamadas (extração + resposta).
+    """
+    reply = None
+    combined = _qualify_single_call(state) if single_call else None
+    if combined is not None:
+        extracted, reply = combined
+    else:
+        # Passo 1: Extrair dados da mensagem do usuário
+        extracted = _extract_fields_from_message(
+            state["last_user_message"], state
+        )
 
     # Monta atualizações do estado a partir dos dados extraídos
     updates = {}
@@ -594,7 +933,8 @@ def qualify(state: NegotiatorState) -> dict:
         existing_pd = dict(state.get("platform_details") or {})
         for plat, details in extracted["platform_details"].items():
             if plat in existing_pd:
-                existing_pd[plat].update({k: v for k, v in details.items() if v})
+                # Cópia: o dict do estado pode ser o do checkpoint em cache
+                existing_pd[plat] = {**existing_pd[plat], **{k: v for k, v in details.items() if v}}
             else:
                 existing_pd[plat] = details
         updates["platform_details"] = existing_pd
@@ -623,36 +963,24 @@ def qualify(state: NegotiatorState) -> dict:
         return updates
 
     # Passo 3: Gerar pergunta natural para campos faltantes
-    context = _build_context(state)
-    known_now = {f: merged[f] for f in QUALIFICATION_FIELDS if merged.get(f)}
-    missing_str = ", ".join(missing)
-
-    system = SYSTEM_PROMPT.format(context=context)
-
-    # Monta conversa com histórico para continuidade de contexto
-    conversation = []
-    for msg in (state.get("conversation_history") or []):
-        conversation.append({"role": msg["role"], "content": msg["content"]})
-    # Adiciona instrução como última mensagem do usuário
-    conversation.append(
-        {
-            "role": "user",
-            "content": (
-                f"O influenciador disse: '{state['last_user_message']}'\n\n"
-                f"Dados já confirmados: {json.dumps(known_now, ensure_ascii=False)}\n"
-                f"Campos ainda faltando: {missing_str}.\n\n"
-                "REGRAS OBRIGATÓRIAS:\n"
-                "1. NUNCA pergunte algo que já está nos dados confirmados acima. "
-                "Se 'name' já existe, NÃO peça o nome novamente.\n"
-                "2. Pergunte APENAS os campos que estão na lista 'faltando'.\n"
-                "3. Se o influenciador fez uma pergunta, responda ANTES de pedir o que falta.\n"
-                "4. Confirme os dados coletados de forma breve e natural.\n"
-                "5. Seja conciso e cordial."
-            ),
-        }
-    )
+    if reply:
+        text = reply
+    else:
+        context = _build_context(state)
+        known_now = {f: merged[f] for f in QUALIFICATION_FIELDS if merged.get(f)}
+        missing_str = ", ".join(missing)
+
+        # Histórico para continuidade; dados da sessão e instrução ficam no fim
+        conversation = _session_input(
+            _history_input(state),
+            context,
+            QUALIFY_REPLY_RULES
+            + f"\nDados já confirmados: {_encode_context(known_now)}\n"
+            f"Campos ainda faltando: {missing_str}.\n"
+            f"O influenciador disse: '{state['last_user_message']}'",
+        )
 
-    text, _ = _run_openai_with_tools(conversation, [], system)
+        text, _ = _run_openai_with_tools(conversation, [], call="qualify_reply")
     text = append_handoff_suffix(text)
 
     updates["messages"] = [AIMessage(content=text)]
@@ -662,11 +990,27 @@ def qualify(state: NegotiatorState) -> dict:
     return updates
 
 
+def _with_memo(memo: BenchmarkMemo, updates: dict, node: str) -> dict:
+    """Registra hits/misses do memo e o devolve ao estado se mudou."""
+    if memo.hits:
+        metrics.incr("benchmark_memo", memo.hits, node=node, result="hit")
+    if memo.misses:
+        metrics.incr("benchmark_memo", memo.misses, node=node, result="miss")
+    if memo.changed:
+        updates["benchmark_memo"] = memo.to_state()
+    return updates
+
+
 def retrieve_benchmarks_node(state: NegotiatorState) -> dict:
-    """Nó determinístico: consulta benchmarks no banco."""
+    """Nó determinístico: consulta benchmarks no banco.
+
+    Só as estatísticas vão para o estado; as amostras interessam ao LLM e
+    chegam a ele pela tool ``retrieve_benchmarks``.
+    """
     platform_details = state.get("platform_details")
     deliverable_type = state.get("deliverable_type", "reel")
     niche = state.get("niche")
+    memo = BenchmarkMemo(state.get("benchmark_memo"))
 
     if platform_details and len(platform_details) > 1:
         # Multi-plataforma: busca benchmarks por plataforma
@@ -677,11 +1021,12 @@ def retrieve_benchmarks_node(state: NegotiatorState) -> dict:
 
         for plat, details in platform_details.items():
             avg_views = details.get("avg_views") or state.get("avg_views", 50000)
-            b = retrieve_benchmarks(
+            b = memo.get(
                 platform=plat,
                 deliverable_type=deliverable_type,
                 avg_views=avg_views,
                 niche=niche,
+                samples=False,
             )
             benchmarks_per_platform[plat] = b
             count = b.get("count", 0)
@@ -696,22 +1041,25 @@ def retrieve_benchmarks_node(state: NegotiatorState) -> dict:
             "avg_cpm": round(weighted_cpm_sum / total_count, 2) if total_count else 0,
             "median_price": round(sum(all_prices) / len(all_prices), 2) if all_prices else 0,
         }
-        return {
+        return _with_memo(memo, {
             "benchmarks": combined,
             "benchmarks_per_platform": benchmarks_per_platform,
             "current_node": "retrieve_benchmarks",
-        }
+        }, node="retrieve_benchmarks")
 
     # Plataforma única
     platform_raw = state.get("platform", "instagram")
     first_platform = platform_raw.split(",")[0] if platform_raw else "instagram"
-    benchmarks = retrieve_benchmarks(
+    benchmarks = memo.get(
         platform=first_platform,
         deliverable_type=deliverable_type,
         avg_views=state.get("avg_views", 50000),
         niche=niche,
+        samples=False,
+    )
+    return _with_memo(
+        memo, {"benchmarks": benchmarks, "current_node": "retrieve_benchmarks"}, node="retrieve_benchmarks"
     )
-    return {"benchmarks": benchmarks, "current_node": "retrieve_benchmarks"}
 
 
 def price_node(state: NegotiatorState) -> dict:
@@ -763,16 +1111,21 @@ def price_node(state: NegotiatorState) -> dict:
     return {"suggested_range": price_range, "current_node": "price"}
 
 
+def _extract_prices_from_text(text: str) -> list[float]:
+    """Todos os preços em R$ mencionados no texto, na ordem em que aparecem."""
+    prices = []
+    for raw in re.findall(r"R\$\s?([\d.,]+)", text):
+        try:
+            prices.append(float(raw.replace(".", "").replace(",", ".")))
+        except ValueError:
+            continue
+    return prices
+
+
 def _extract_price_from_text(text: str) -> float | None:
     """Extrai o último preço em R$ mencionado na resposta do agente."""
-    matches = re.findall(r"R\$\s?([\d.,]+)", text)
-    if not matches:
-        return None
-    raw = matches[-1].replace(".", "").replace(",", ".")
-    try:
-        return float(raw)
-    except ValueError:
-        return None
+    prices = _extract_prices_from_text(text)
+    return prices[-1] if prices else None
 
 
 def _extract_user_price(message: str) -> float | None:
@@ -799,27 +1152,156 @@ def _extract_user_price(message: str) -> float | None:
     return None
 
 
-def negotiate(state: NegotiatorState) -> dict:
-    """Nó principal de negociação via LLM com chamada de tools."""
+FAST_ACCEPT_PENDING_MESSAGE = (
+    "Perfeito! Só um instante enquanto confirmo os detalhes internamente "
+    "para fecharmos a parceria."
+)
+
+
+def _offer_on_table(state: NegotiatorState) -> float | None:
+    """Valor da proposta em aberto na última mensagem do agente, se houver.
+
+    Só conta se a mensagem citar um único preço e ele for o
+    ``last_agent_offer_brl`` do estado. O ``current_offer_brl`` é o pedido
+    do influenciador e não vale como proposta do agente; mensagens que
+    comparam valores ("R$ 4.000, abaixo dos R$ 5.000") ficam para o LLM.
+    """
+    history = state.get("conversation_history") or []
+    last_agent = next(
+        (m["content"] for m in reversed(history) if m["role"] == "assistant"), None
+    )
+    if not last_agent:
+        return None
+    prices = set(_extract_prices_from_text(last_agent))
+    if len(prices) != 1:
+        return None
+    (price,) = prices
+    if price and price == state.get("last_agent_offer_brl"):
+        return price
+    return None
+
+
+def _apply_acceptance(state: NegotiatorState, agreed_price: float | None, result: dict) -> None:
+    """Marca o deal como aceito ou, se o valor exigir, como pendente de aprovação."""
+    result["agreed_price_brl"] = agreed_price
+    result["current_offer_brl"] = agreed_price
+
+    needs_approval = False
+    if agreed_price and state.get("suggested_range"):
+        needs_approval = approval_required(
+            agreed_price,
+            state["suggested_range"],
+            state.get("benchmarks"),
+        )
+
+    if needs_approval:
+        result["approval_required"] = True
+        result["deal_accepted"] = False
+    else:
+        result["deal_accepted"] = True
+
+
+def _chain_delta(conversation: list, response_chain: dict | None) -> list | None:
+    """Mensagens posteriores à última resposta encadeada (``None`` se não achar).
+
+    A âncora é o texto da resposta que encerrou a cadeia; se ela saiu da
+    janela do histórico, a cadeia não tem como ser continuada.
+    """
+    if not response_chain or not response_chain.get("id"):
+        return None
+    anchor = response_chain.get("anchor")
+    for i in range(len(conversation) - 1, -1, -1):
+        item = conversation[i]
+        if item.get("role") == "assistant" and item.get("content") == anchor:
+            return conversation[i + 1:]
+    return None
+
+
+def negotiate(
+    state: NegotiatorState,
+    fast_path: bool = False,
+    chain_responses: bool = False,
+    local_tools: bool = False,
+    max_tool_rounds: int = 9,
+) -> dict:
+    """Nó principal de negociação via LLM com chamada de tools.
+
+    Com *fast_path*, um aceite explícito ("fechado", "ok, pode ser") da
+    proposta em aberto vai direto para aprovação/salvamento sem chamar o LLM,
+    e uma recusa explícita gera a resposta numa única chamada, sem tools.
+
+    Com *chain_responses*, continua a conversa do lado do servidor a partir
+    de ``state["response_chain"]``, enviando só as mensagens novas.
+
+    Com *local_tools*, as tools puras (``PURE_TOOLS``) saem do ``tool_choice``:
+    a faixa já vem do ``price_node`` e a necessidade de aprovação vai
+    pré-calculada no contexto. *max_tool_rounds* limita as rodadas de tools.
+    """
     # Extrai preço proposto pelo influenciador na mensagem atual
     user_price = _extract_user_price(state["last_user_message"])
 
-    context = _build_context(state)
-    system = SYSTEM_PROMPT.format(context=context)
+    intent = None
+    # Re-entradas após decisão do operador sempre passam pelo LLM
+    if (
+        fast_path
+        and not state.get("operator_counter_offer_brl")
+        and state.get("current_node") != "approval"
+    ):
+        intent = classify_offer_reply(state["last_user_message"])
+        offer = _offer_on_table(state)
+        if offer and intent.is_accept():
+            metrics.incr("fast_path", node="negotiate", intent="accept")
+            result = {
+                "approval_required": False,
+                "current_node": "negotiate",
+                "operator_counter_offer_brl": None,
+            }
+            _apply_acceptance(state, offer, result)
+            if result["approval_required"]:
+                result["messages"] = [
+                    AIMessage(content=append_handoff_suffix(FAST_ACCEPT_PENDING_MESSAGE))
+                ]
+            return result
+
+    if local_tools and user_price:
+        # Aprovação pré-calculada sobre o preço desta mensagem, não o do turno anterior
+        context = _build_context({**state, "current_offer_brl": user_price}, precomputed=True)
+    else:
+        context = _build_context(state, precomputed=local_tools)
 
     # Monta conversa com histórico para continuidade de contexto
-    conversation = []
-    for msg in (state.get("conversation_history") or []):
-        conversation.append({"role": msg["role"], "content": msg["content"]})
+    conversation = _history_input(state)
     # Adiciona mensagem atual se ainda não for a última no histórico
     if not conversation or conversation[-1]["content"] != state["last_user_message"]:
         conversation.append({"role": "user", "content": state["last_user_message"]})
-
-    negotiate_tools = OPENAI_TOOL_SCHEMAS + [CONFIRM_DEAL_TOOL]
+    chain = None
+    if chain_responses:
+        chain = {"previous_response_id": None, "input": None}
+        delta = _chain_delta(conversation, state.get("response_chain"))
+        if delta is not None:
+            chain["previous_response_id"] = state["response_chain"]["id"]
+            chain["input"] = _session_input(delta, context)
+        metrics.incr("response_chain", node="negotiate", result="chained" if delta is not None else "full")
+    conversation = _session_input(conversation, context)
+
+    negotiate_tools = [t["name"] for t in OPENAI_TOOL_SCHEMAS] + [CONFIRM_DEAL_TOOL["name"]]
+    if local_tools:
+        negotiate_tools = [t for t in negotiate_tools if t not in PURE_TOOLS]
+    if intent and intent.is_reject():
+        # Recusa clara: só precisa de uma resposta persuasiva, sem loop de tools
+        metrics.incr("fast_path", node="negotiate", intent="reject")
+        negotiate_tools = []
     deal_result = {}
+    memo = BenchmarkMemo(state.get("benchmark_memo"))
 
     text, _ = _run_openai_with_tools(
-        conversation, negotiate_tools, system, deal_result=deal_result
+        conversation,
+        negotiate_tools,
+        deal_result=deal_result,
+        call="negotiate",
+        chain=chain,
+        max_tool_rounds=max_tool_rounds,
+        memo=memo,
     )
     text = append_handoff_suffix(text)
 
@@ -829,6 +1311,9 @@ def negotiate(state: NegotiatorState) -> dict:
         "current_node": "negotiate",
         "operator_counter_offer_brl": None,  # limpa após uso
     }
+    if chain and chain.get("response_id"):
+        result["response_chain"] = {"id": chain["response_id"], "anchor": text}
+    _with_memo(memo, result, node="negotiate")
 
     # Rastreia o último preço proposto pelo agente para saber o valor em jogo
     agent_offer = _extract_price_from_text(text)
@@ -837,23 +1322,7 @@ def negotiate(state: NegotiatorState) -> dict:
 
     # Se confirm_deal foi chamado, checa aprovação antes de aceitar
     if deal_result.get("accepted"):
-        agreed_price = deal_result.get("agreed_price_brl")
-        result["agreed_price_brl"] = agreed_price
-        result["current_offer_brl"] = agreed_price
-
-        needs_approval = False
-        if agreed_price and state.get("suggested_range"):
-            needs_approval = approval_required(
-                agreed_price,
-                state["suggested_range"],
-                state.get("benchmarks"),
-            )
-
-        if needs_approval:
-            result["approval_required"] = True
-            result["deal_accepted"] = False
-        else:
-            result["deal_accepted"] = True
+        _apply_acceptance(state, deal_result.get("agreed_price_brl"), result)
     else:
         # Se acabamos de apresentar contraproposta do operador, limpa a oferta
         # antiga do influenciador para não re-disparar aprovação em loop infinito.
@@ -966,6 +1435,7 @@ def save_deal_node(state: NegotiatorState) -> dict:
             p_cpm = (p_price / (p_views / 1000 * p_qty)) if p_views and p_qty else 0.0
 
             deals.append({
+                "thread_id": state.get("thread_id"),
                 "influencer_name": influencer_name,
                 "influencer_phone": influencer_phone,
                 "platform": plat,
@@ -993,6 +1463,7 @@ def save_deal_node(state: NegotiatorState) -> dict:
     cpm = (agreed_price / (avg_views / 1000 * qty)) if avg_views and qty else 0.0
 
     deal = {
+        "thread_id": state.get("thread_id"),
         "influencer_name": influencer_name,
         "influencer_phone": influencer_phone,
         "platform": first_platform,
@@ -1070,17 +1541,46 @@ def after_approval(state: NegotiatorState) -> str:
 # ── Montagem do grafo ────────────────────────────────────────────
 
 
-def build_graph(checkpointer=None):
-    """Monta e compila o grafo LangGraph do negociador."""
+def build_graph(checkpointer=None, agent_config=None):
+    """Monta e compila o grafo LangGraph do negociador.
+
+    *agent_config* (``AgentConfig``) ajusta o comportamento dos nós:
+    ``config["qualify_mode"]`` (``"single_call"`` ou ``"two_call"``) e
+    ``config["intent_fast_path"]`` (aceite/recusa explícitos sem loop de tools) e
+    ``config["llm_policies"]`` (prazo, retries e hedging das chamadas LLM por nó),
+    ``config["model_routing"]`` (modelo e limites por nó ou tipo de chamada) e
+    ``config["response_chaining"]`` (negotiate encadeado por ``previous_response_id``),
+    ``config["pure_tools"]`` (``"local"``: tools puras fora do loop) e
+    ``config["max_tool_rounds"]`` (teto de rodadas de tools por turno).
+    """
+    settings = agent_config.config if agent_config else {}
+    policies = build_policies(settings.get("llm_policies"))
+    router = ModelRouter(settings.get("model_routing"))
     graph = StateGraph(NegotiatorState)
 
-    graph.add_node("qualify", qualify)
-    graph.add_node("retrieve_benchmarks", retrieve_benchmarks_node)
-    graph.add_node("price", price_node)
-    graph.add_node("negotiate", negotiate)
-    graph.add_node("approval", approval_node)
-    graph.add_node("save_deal", save_deal_node)
-    graph.add_node("close", close_node)
+    qualify_node = qualify
+    if settings.get("qualify_mode") == "single_call":
+        qualify_node = partial(qualify, single_call=True)
+    negotiate_node = partial(
+        negotiate,
+        fast_path=bool(settings.get("intent_fast_path")),
+        chain_responses=bool(settings.get("response_chaining")),
+        local_tools=settings.get("pure_tools") == "local",
+        max_tool_rounds=settings.get("max_tool_rounds", 9),
+    )
+
+    nodes = {
+        "qualify": qualify_node,
+        "retrieve_benchmarks": retrieve_benchmarks_node,
+        "price": price_node,
+        "negotiate": negotiate_node,
+        "approval": approval_node,
+        "save_deal": save_deal_node,
+        "close": close_node,
+    }
+    for name, fn in nodes.items():
+        policy = policies.get(name, policies["default"])
+        graph.add_node(name, timed_node(name, with_policy(policy, with_router(router, fn))))
 
     graph.add_edge(START, "qualify")
     graph.add_conditional_edges("qualify", after_qualify)
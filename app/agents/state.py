@@ -37,3 +37,5 @@ class NegotiatorState(TypedDict):
     platform_details: Optional[dict]  # {"instagram": {"qty": 5, "avg_views": 100000}, ...}
     benchmarks_per_platform: Optional[dict]
     suggested_range_per_platform: Optional[dict]
+    benchmark_memo: Optional[dict]  # {"generation", "entries"}: memo de retrieve_benchmarks
+    response_chain: Optional[dict]  # {"id": último response id do negotiate, "anchor": texto dele}
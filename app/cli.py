@@ -1,13 +1,20 @@
-"""Interface CLI usando Typer + Rich."""
+"""Interface CLI usando Typer + Rich.
+
+Os imports pesados ficam dentro de cada comando: comandos que só tocam o
+banco (``seed``, ``list-conversations``, ``costs``...) nunca carregam o
+stack de LLM/grafo (``openai``, ``langgraph``, ``langchain_core``).
+"""
+
+from datetime import datetime
+from pathlib import Path
 
 import typer
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Prompt
+from rich.table import Table
 
-from app.core.orchestrator import Orchestrator
-from app.db.seed import seed as seed_db
-from app.db.session import SessionLocal, init_db
+from app.core.metrics import METRICS_FILE, MetricsRegistry
 
 app = typer.Typer(help="Agente Negociador de Influenciadores")
 console = Console()
@@ -28,6 +35,8 @@ def chat(
         )
     )
 
+    from app.core.orchestrator import Orchestrator
+
     orchestrator = Orchestrator(agent_id=agent)
 
     try:
@@ -137,6 +146,9 @@ def chat(
 @app.command()
 def seed():
     """Popular banco com deals fictícios."""
+    from app.db.seed import seed as seed_db
+    from app.db.session import init_db
+
     init_db()
     count = seed_db()
     if count:
@@ -145,28 +157,377 @@ def seed():
         console.print("[yellow]Banco já contém dados. Nenhum deal inserido.[/yellow]")
 
 
+@app.command(name="import-deals")
+def import_deals(
+    path: str = typer.Argument(..., help="Arquivo CSV (com cabeçalho) ou JSONL de deals"),
+    fmt: str | None = typer.Option(None, "--format", help="csv ou jsonl (padrão: pela extensão)"),
+    chunk_size: int = typer.Option(5_000, help="Linhas por lote/transação"),
+):
+    """Importar deals históricos em lote (valida, normaliza e deduplica)."""
+    from app.db.importer import import_deals as run_import
+    from app.db.session import init_db
+
+    init_db()
+
+    def progress(report):
+        console.print(
+            f"[dim]{report.read} lidas | {report.inserted} inseridas | "
+            f"{report.rows_per_s:,.0f} linhas/s[/dim]"
+        )
+
+    try:
+        report = run_import(path, fmt=fmt, chunk_size=chunk_size, on_progress=progress)
+    except (OSError, ValueError) as exc:
+        console.print(str(exc), style="red", markup=False)
+        raise typer.Exit(code=1)
+
+    for error in report.errors:
+        console.print(error, style="yellow", markup=False, highlight=False)
+    console.print(
+        f"[green]{report.inserted} deals inseridos[/green] | {report.duplicates} duplicados | "
+        f"{report.invalid} inválidos | {report.read} lidos em {report.elapsed_s:.1f}s "
+        f"({report.rows_per_s:,.0f} linhas/s)"
+    )
+
+
+def _same_database(a: str, b: str) -> bool:
+    """Se as duas URLs apontam para o mesmo banco (SQLite: mesmo arquivo)."""
+    from sqlalchemy.engine import make_url
+
+    url_a, url_b = make_url(a), make_url(b)
+    if url_a.get_backend_name() == url_b.get_backend_name() == "sqlite":
+        if not url_a.database or not url_b.database:
+            return url_a.database == url_b.database
+        return Path(url_a.database).resolve() == Path(url_b.database).resolve()
+    return url_a == url_b
+
+
+@app.command(name="generate-deals")
+def generate_deals(
+    database_url: str = typer.Option(
+        ..., "--database-url", help="Banco de destino (nunca o DATABASE_URL do agente)"
+    ),
+    rows: int = typer.Option(100_000, help="Quantidade de deals sintéticos"),
+    seed: int | None = typer.Option(None, help="Semente (reprodutível)"),
+    chunk_size: int = typer.Option(50_000, help="Linhas por lote/transação"),
+):
+    """Popular um banco separado com deals sintéticos em escala (benchmarks).
+
+    Deals sintéticos são indistinguíveis dos reais para o ``retrieve_benchmarks``;
+    por isso o comando recusa o banco que o agente usa em produção.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.session import DATABASE_URL, init_db
+    from app.db.synthetic import generate_deals as run_generate
+
+    if _same_database(database_url, DATABASE_URL):
+        console.print(
+            "[red]--database-url é o banco do agente (DATABASE_URL): deals sintéticos "
+            "entrariam no retrieval de preços. Use um banco separado.[/red]"
+        )
+        raise typer.Exit(code=1)
+
+    engine = create_engine(database_url)
+    init_db(engine)
+    elapsed = run_generate(
+        rows,
+        seed=seed,
+        chunk_size=chunk_size,
+        session_factory=sessionmaker(bind=engine),
+        on_progress=lambda done, s: console.print(f"[dim]{done:,} deals ({done / s:,.0f}/s)[/dim]"),
+    )
+    engine.dispose()
+    console.print(f"[green]{rows:,} deals sintéticos inseridos em {elapsed:.1f}s[/green]")
+
+
 @app.command(name="list-conversations")
-def list_conversations():
-    """Listar conversas existentes."""
+def list_conversations(
+    status: str | None = typer.Option(None, help="Filtrar por status (active, closed_deal, completed...)"),
+    owner: str | None = typer.Option(None, help="Filtrar por owner (agent ou human)"),
+    phone: str | None = typer.Option(None, help="Filtrar pelo telefone do influenciador"),
+    since: datetime | None = typer.Option(None, help="Criadas a partir desta data"),
+    until: datetime | None = typer.Option(None, help="Criadas antes desta data"),
+    limit: int = typer.Option(50, help="Tamanho da página"),
+    after: str | None = typer.Option(None, help="Cursor retornado pela página anterior"),
+    all_pages: bool = typer.Option(False, "--all", help="Percorrer todas as páginas em streaming"),
+):
+    """Listar conversas com filtros, paginação e agregados (mensagens, última atividade, deals)."""
+    from app.core.store import iter_conversation_summaries
+    from app.db.session import SessionLocal, init_db
+
     init_db()
     session = SessionLocal()
     try:
-        from app.db.models import Conversation
+        rows = iter_conversation_summaries(
+            session,
+            status=status,
+            owner=owner,
+            phone=phone,
+            since=since,
+            until=until,
+            after=after,
+            limit=None if all_pages else limit,
+        )
+        shown = 0
+        last_cursor = None
+        for c in rows:
+            deal = f" | Deals: R$ {c['deal_value_brl']:.2f}" if c["deal_value_brl"] else ""
+            console.print(
+                f"[bold]{c['thread_id']}[/bold] | {c['phone']} | "
+                f"Status: {c['status']} | Owner: {c['owner']} | "
+                f"Mensagens: {c['messages']} | Última: {c['last_message_at'] or '-'} | "
+                f"Criada: {c['created_at']}{deal}",
+                highlight=False,
+            )
+            shown += 1
+            last_cursor = c["cursor"]
+
+        if not shown:
+            console.print("[dim]Nenhuma conversa encontrada.[/dim]")
+        elif not all_pages and shown == limit:
+            console.print(f"[dim]Próxima página: --after {last_cursor}[/dim]")
+    finally:
+        session.close()
+
+
+@app.command()
+def export(
+    out: str = typer.Option("data/export", help="Diretório de saída"),
+    table: list[str] = typer.Option(
+        None, "--table", help="Tabela a exportar (repetível): deals, conversations, messages, offers"
+    ),
+    fmt: str = typer.Option("csv", "--format", help="Formato: csv ou parquet"),
+    chunk_size: int = typer.Option(10_000, help="Linhas por lote"),
+    incremental: bool = typer.Option(False, help="Exportar só linhas após a última marca d'água"),
+):
+    """Exportar tabelas em streaming (lotes de tamanho fixo) para CSV ou Parquet."""
+    from app.db.export import export_tables
+    from app.db.session import init_db
+
+    init_db()
+    try:
+        counts = export_tables(
+            out,
+            tables=table or None,
+            fmt=fmt,
+            chunk_size=chunk_size,
+            incremental=incremental,
+            on_chunk=lambda name, total: console.print(f"[dim]{name}: {total} linhas...[/dim]"),
+        )
+    except (RuntimeError, ValueError) as exc:
+        from rich.markup import escape
+
+        console.print(f"[red]{escape(str(exc))}[/red]")
+        raise typer.Exit(code=1)
+    for name, count in counts.items():
+        console.print(f"[green]{name}[/green]: {count} linhas exportadas")
+    console.print(f"[dim]Arquivos em {out}/<tabela>/[/dim]")
+
+
+@app.command()
+def stats(
+    file: str = typer.Option(METRICS_FILE, help="Arquivo JSONL de métricas"),
+    fmt: str = typer.Option("table", "--format", help="Formato: table, prometheus ou jsonl"),
+):
+    """Mostrar latência p50/p95/p99 por nó e uso de LLM."""
+    from pathlib import Path
+
+    if not Path(file).exists():
+        console.print(f"[dim]Nenhuma métrica encontrada em {file}.[/dim]")
+        return
 
-        convs = (
-            session.query(Conversation)
-            .order_by(Conversation.created_at.desc())
-            .all()
+    reg = MetricsRegistry.load_jsonl(file)
+    if fmt == "prometheus":
+        console.print(reg.to_prometheus(), end="", markup=False, highlight=False)
+        return
+    if fmt == "jsonl":
+        console.print(reg.to_jsonl(), end="", markup=False, highlight=False)
+        return
+
+    nodes = Table(title="Latência por nó (ms)")
+    for col in ("Nó", "N", "Média", "p50", "p95", "p99"):
+        nodes.add_column(col, justify="left" if col == "Nó" else "right")
+    for node, s in reg.node_summary().items():
+        nodes.add_row(
+            node, str(s["count"]), f"{s['mean']:.1f}",
+            f"{s['p50']:.1f}", f"{s['p95']:.1f}", f"{s['p99']:.1f}",
         )
+    console.print(nodes)
+
+    llm = Table(title="Chamadas LLM")
+    for col in ("Nó", "Modelo", "Chamadas", "Tokens in", "Tokens out", "Cache hit", "p50 ms", "p95 ms", "p99 ms"):
+        llm.add_column(col, justify="left" if col in ("Nó", "Modelo") else "right")
+    loops = reg.tool_loop_summary()
+    for (node, model), s in reg.llm_summary().items():
+        llm.add_row(
+            node, model, str(s["calls"]), str(s["input_tokens"]), str(s["output_tokens"]),
+            f"{s['cache_hit_rate']:.0%}",
+            f"{s['p50']:.1f}", f"{s['p95']:.1f}", f"{s['p99']:.1f}",
+        )
+    console.print(llm)
+
+    if loops:
+        console.print(
+            "[dim]Iterações do loop de tools (média por turno): "
+            + ", ".join(f"{n}={s['mean']:.2f}" for n, s in loops.items())
+            + "[/dim]"
+        )
+
+    counters = reg.counter_summary()
+    if counters:
+        table = Table(title="Contadores")
+        table.add_column("Nome")
+        table.add_column("Rótulos")
+        table.add_column("Total", justify="right")
+        for (name, labels), total in counters.items():
+            table.add_row(name, ", ".join(f"{k}={v}" for k, v in labels), f"{total:g}")
+        console.print(table)
+
+    observations = reg.observation_summary()
+    if observations:
+        table = Table(title="Amostras")
+        for col in ("Nome", "Rótulos", "N", "p50", "p95", "p99"):
+            table.add_column(col, justify="left" if col in ("Nome", "Rótulos") else "right")
+        for (name, labels), s in observations.items():
+            table.add_row(
+                name, ", ".join(f"{k}={v}" for k, v in labels), str(s["count"]),
+                f"{s['p50']:.1f}", f"{s['p95']:.1f}", f"{s['p99']:.1f}",
+            )
+        console.print(table)
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", help="Endereço de escuta"),
+    port: int = typer.Option(8000, help="Porta HTTP"),
+    agent: str = typer.Option("negotiator", help="ID do agente"),
+    pool_size: int = typer.Option(4, help="Orquestradores pré-inicializados no pool"),
+):
+    """Servir a API HTTP JSON (conversas, mensagens, aprovação, saudação)."""
+    from app.server import serve as run_server
+
+    console.print(f"[dim]Escutando em http://{host}:{port} — preload em andamento...[/dim]")
+    run_server(
+        host=host,
+        port=port,
+        agent_id=agent,
+        pool_size=pool_size,
+        on_ready=lambda _: console.print("[green]Pronto (GET /readyz).[/green]"),
+    )
+
+
+@app.command()
+def enqueue(
+    phone: str = typer.Option(..., help="Telefone do influenciador"),
+    message: str = typer.Option(..., help="Texto recebido"),
+    agent: str = typer.Option("negotiator", help="ID do agente"),
+):
+    """Enfileirar uma mensagem recebida (equivalente a um evento de webhook)."""
+    from app.core.inbox import InboundQueue
+
+    msg_id = InboundQueue().enqueue(phone, message, agent_id=agent)
+    console.print(f"[green]Mensagem {msg_id} enfileirada.[/green]")
+
+
+@app.command()
+def worker(
+    workers: int = typer.Option(4, help="Quantidade de workers em paralelo"),
+    agent: str = typer.Option("negotiator", help="ID do agente"),
+    drain: bool = typer.Option(False, help="Sair quando a fila esvaziar"),
+):
+    """Processar a fila de entrada com um pool de workers (ordem garantida por conversa)."""
+    import time
+    from functools import partial
+
+    from app.core.inbox import InboundQueue, OrchestratorHandler, WorkerPool
+
+    queue = InboundQueue()
+    pool = WorkerPool(queue, partial(OrchestratorHandler, agent), workers=workers)
+    console.print(f"[dim]{workers} workers consumindo a fila. Ctrl+C para encerrar.[/dim]")
+    if drain:
+        pool.run_until_idle()
+    else:
+        pool.start()
+        try:
+            while True:
+                time.sleep(5)
+                queue.record_depth()
+        except KeyboardInterrupt:
+            console.print("\n[dim]Encerrando workers...[/dim]")
+        pool.stop()
+    counts = queue.depth()
+    console.print(
+        f"Fila: {counts['pending']} pendentes, {counts['done']} processadas, "
+        f"{counts['failed']} com falha."
+    )
+
+
+@app.command(name="queue-status")
+def queue_status():
+    """Mostrar profundidade da fila de entrada e idade da mensagem mais antiga."""
+    from app.core.inbox import InboundQueue
+
+    queue = InboundQueue()
+    table = Table(title="Fila de entrada")
+    table.add_column("Status")
+    table.add_column("Mensagens", justify="right")
+    for status, count in queue.depth().items():
+        table.add_row(status, str(count))
+    console.print(table)
+    console.print(f"[dim]Pendente mais antiga: {queue.oldest_pending_age_s():.1f}s[/dim]")
+
+
+@app.command()
+def costs(
+    top: int = typer.Option(10, help="Quantidade de conversas/deals no ranking"),
+):
+    """Ranking das negociações e nós mais caros em tokens/custo LLM."""
+    from app.core.accounting import conversation_costs, deal_costs, node_costs
+    from app.db.session import SessionLocal, init_db
+
+    init_db()
+    session = SessionLocal()
+    try:
+        convs = conversation_costs(session, limit=top)
         if not convs:
-            console.print("[dim]Nenhuma conversa encontrada.[/dim]")
+            console.print("[dim]Nenhuma chamada LLM registrada.[/dim]")
             return
 
+        table = Table(title=f"Top {top} negociações mais caras")
+        for col in ("Thread", "Status", "Chamadas", "Tokens in", "Cache", "Tokens out", "Custo US$", "Deals R$"):
+            table.add_column(col, justify="left" if col in ("Thread", "Status") else "right")
         for c in convs:
-            console.print(
-                f"[bold]{c.thread_id}[/bold] | "
-                f"Status: {c.status} | Owner: {c.owner} | "
-                f"Criada: {c.created_at}"
+            table.add_row(
+                c["thread_id"], c["status"] or "-", str(c["calls"]),
+                str(c["input_tokens"]), str(c["cached_tokens"]), str(c["output_tokens"]),
+                f"{c['cost_usd']:.4f}",
+                f"{c['deal_value_brl']:.2f}" if c["deal_value_brl"] else "-",
+            )
+        console.print(table)
+
+        table = Table(title="Custo por nó")
+        for col in ("Nó", "Modelo", "Chamadas", "Tokens in", "Cache", "Tokens out", "Custo US$", "Média ms"):
+            table.add_column(col, justify="left" if col in ("Nó", "Modelo") else "right")
+        for n in node_costs(session):
+            table.add_row(
+                n["node"], n["model"], str(n["calls"]),
+                str(n["input_tokens"]), str(n["cached_tokens"]), str(n["output_tokens"]),
+                f"{n['cost_usd']:.4f}", f"{n['avg_duration_ms']:.0f}",
             )
+        console.print(table)
+
+        deals = deal_costs(session, limit=top)
+        if deals:
+            table = Table(title=f"Top {top} deals por custo LLM")
+            for col in ("Deal", "Influenciador", "Plataforma", "Preço R$", "Custo US$"):
+                table.add_column(col, justify="right" if col in ("Deal", "Preço R$", "Custo US$") else "left")
+            for d in deals:
+                table.add_row(
+                    str(d["id"]), d["influencer_name"], d["platform"],
+                    f"{d['final_price_brl']:.2f}", f"{d['llm_cost_usd']:.4f}",
+                )
+            console.print(table)
     finally:
         session.close()
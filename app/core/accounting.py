@@ -0,0 +1,219 @@
+"""Contabilidade de tokens e custo das chamadas LLM por conversa.
+
+Cada chamada registrada em ``metrics`` entra num buffer em memória; o
+orquestrador grava o buffer na tabela ``llm_calls`` com um único INSERT em
+lote ao fim de cada turno. As funções de relatório agregam os custos por
+conversa, por nó e por deal.
+"""
+
+import threading
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+from app.db.models import Conversation, Deal, LlmCall
+
+# Preço em USD por 1M de tokens: (input, input em cache, output)
+MODEL_PRICES_USD_PER_1M = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-5-nano": (0.05, 0.005, 0.40),
+    "gpt-5-mini": (0.25, 0.025, 2.00),
+    "gpt-5": (1.25, 0.125, 10.00),
+}
+
+
+def _model_prices(model: str) -> tuple[float, float, float] | None:
+    """Tabela de preço do modelo, aceitando sufixos de snapshot (``gpt-4o-mini-2024-07-18``)."""
+    if model in MODEL_PRICES_USD_PER_1M:
+        return MODEL_PRICES_USD_PER_1M[model]
+    for name in sorted(MODEL_PRICES_USD_PER_1M, key=len, reverse=True):
+        if model.startswith(name + "-"):
+            return MODEL_PRICES_USD_PER_1M[name]
+    return None
+
+
+def estimate_cost_usd(
+    model: str, input_tokens: int, cached_tokens: int, output_tokens: int
+) -> float:
+    """Custo estimado da chamada. Modelos sem preço conhecido custam 0."""
+    prices = _model_prices(model or "")
+    if not prices:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    uncached = max(input_tokens - cached_tokens, 0)
+    cost = (
+        uncached * input_price
+        + cached_tokens * cached_price
+        + output_tokens * output_price
+    ) / 1_000_000
+    return round(cost, 8)
+
+
+class LlmCallBuffer:
+    """Acumula chamadas LLM para inserção em lote na tabela ``llm_calls``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: list[dict] = []
+
+    def add_event(self, event: dict) -> None:
+        if event.get("kind") != "llm":
+            return
+        model = event.get("model") or "-"
+        input_tokens = event.get("input_tokens") or 0
+        cached_tokens = event.get("cached_tokens") or 0
+        output_tokens = event.get("output_tokens") or 0
+        row = {
+            "thread_id": event.get("thread_id"),
+            "node": event.get("node") or "-",
+            "call_type": event.get("call") or "-",
+            "model": model,
+            "input_tokens": input_tokens,
+            "cached_tokens": cached_tokens,
+            "output_tokens": output_tokens,
+            "duration_ms": event.get("duration_ms") or 0.0,
+            "cost_usd": estimate_cost_usd(model, input_tokens, cached_tokens, output_tokens),
+        }
+        with self._lock:
+            self._rows.append(row)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self, session: Session) -> int:
+        """Insere as chamadas pendentes num único ``executemany``. Retorna quantas.
+
+        Falhas de escrita não interrompem o turno: as linhas voltam para o
+        buffer e entram no próximo lote.
+        """
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        try:
+            session.execute(insert(LlmCall), rows)
+            session.commit()
+        except Exception:
+            session.rollback()
+            with self._lock:
+                self._rows[:0] = rows
+            return 0
+        return len(rows)
+
+
+llm_calls = LlmCallBuffer()
+metrics.add_listener(llm_calls.add_event)
+
+
+# ── Relatórios ───────────────────────────────────────────────────
+
+
+def _deal_totals_by_thread():
+    return (
+        select(
+            Deal.thread_id.label("thread_id"),
+            func.count(Deal.id).label("deals"),
+            func.sum(Deal.final_price_brl).label("deal_value_brl"),
+        )
+        .where(Deal.thread_id.is_not(None))
+        .group_by(Deal.thread_id)
+        .subquery()
+    )
+
+
+def conversation_costs(session: Session, limit: int = 10) -> list[dict]:
+    """Conversas mais caras: tokens, custo e valor dos deals fechados."""
+    calls = (
+        select(
+            LlmCall.thread_id.label("thread_id"),
+            func.count(LlmCall.id).label("calls"),
+            func.sum(LlmCall.input_tokens).label("input_tokens"),
+            func.sum(LlmCall.cached_tokens).label("cached_tokens"),
+            func.sum(LlmCall.output_tokens).label("output_tokens"),
+            func.sum(LlmCall.cost_usd).label("cost_usd"),
+        )
+        .where(LlmCall.thread_id.is_not(None))
+        .group_by(LlmCall.thread_id)
+        .subquery()
+    )
+    deals = _deal_totals_by_thread()
+    stmt = (
+        select(
+            calls,
+            func.coalesce(deals.c.deals, 0).label("deals"),
+            deals.c.deal_value_brl,
+        )
+        .outerjoin(deals, deals.c.thread_id == calls.c.thread_id)
+        .order_by(calls.c.cost_usd.desc())
+        .limit(limit)
+    )
+    rows = session.execute(stmt).all()
+    # Status numa segunda query por thread_id: com shards, conversations mora
+    # fora do catálogo e a consulta vai só aos shards desses threads
+    status = dict(
+        session.execute(
+            select(Conversation.thread_id, Conversation.status)
+            .where(Conversation.thread_id.in_([row.thread_id for row in rows]))
+        ).all()
+    )
+    return [{**row._mapping, "status": status.get(row.thread_id)} for row in rows]
+
+
+def node_costs(session: Session) -> list[dict]:
+    """Custo agregado por nó e modelo, do mais caro para o mais barato."""
+    stmt = (
+        select(
+            LlmCall.node,
+            LlmCall.model,
+            func.count(LlmCall.id).label("calls"),
+            func.sum(LlmCall.input_tokens).label("input_tokens"),
+            func.sum(LlmCall.cached_tokens).label("cached_tokens"),
+            func.sum(LlmCall.output_tokens).label("output_tokens"),
+            func.sum(LlmCall.cost_usd).label("cost_usd"),
+            func.avg(LlmCall.duration_ms).label("avg_duration_ms"),
+        )
+        .group_by(LlmCall.node, LlmCall.model)
+        .order_by(func.sum(LlmCall.cost_usd).desc())
+    )
+    return [dict(row._mapping) for row in session.execute(stmt)]
+
+
+def deal_costs(session: Session, limit: int = 10) -> list[dict]:
+    """Custo LLM atribuído a cada deal.
+
+    O custo da conversa é rateado entre os deals dela (multi-plataforma)
+    proporcionalmente ao preço final de cada um.
+    """
+    thread_cost = (
+        select(
+            LlmCall.thread_id.label("thread_id"),
+            func.sum(LlmCall.cost_usd).label("cost_usd"),
+        )
+        .where(LlmCall.thread_id.is_not(None))
+        .group_by(LlmCall.thread_id)
+        .subquery()
+    )
+    deals = _deal_totals_by_thread()
+    share = Deal.final_price_brl / func.nullif(deals.c.deal_value_brl, 0)
+    cost = thread_cost.c.cost_usd * func.coalesce(share, 1.0 / deals.c.deals)
+    stmt = (
+        select(
+            Deal.id,
+            Deal.thread_id,
+            Deal.influencer_name,
+            Deal.platform,
+            Deal.final_price_brl,
+            cost.label("llm_cost_usd"),
+        )
+        .join(thread_cost, thread_cost.c.thread_id == Deal.thread_id)
+        .join(deals, deals.c.thread_id == Deal.thread_id)
+        .order_by(cost.desc(), Deal.id)
+        .limit(limit)
+    )
+    return [dict(row._mapping) for row in session.execute(stmt)]
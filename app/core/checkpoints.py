@@ -0,0 +1,503 @@
+"""Serializador compacto para os checkpoints do LangGraph.
+
+O ``JsonPlusSerializer`` padrão grava cada checkpoint como msgpack com as
+versões de canal (strings de ~50 caracteres) repetidas a cada canal em
+``channel_versions``, e as mensagens como modelos pydantic completos
+(módulo, classe e todos os campos). O ``CompactSerializer`` grava:
+
+- ``channel_versions`` como ``[canais, índices]`` e cada versão uma vez,
+  numa tabela do checkpoint — montado só com ``dict``/``map``/``zip``, sem
+  laço Python por canal: o checkpoint é gravado a cada super-step, então a
+  gravação não pode custar mais que a do formato padrão;
+- ``HumanMessage``/``AIMessage`` simples como ``[tipo, conteúdo, id]`` — o
+  que mais pesa em CPU no formato padrão, na ida e na volta;
+- opcionalmente (``CHECKPOINT_SERDE=compact+zlib``) zlib por cima: bem
+  menor, ao custo de mais CPU na gravação.
+
+Tudo o que não se encaixa (tipos que o msgpack não grava direto, mensagens
+com tool calls ou metadados) vai para o serializador padrão, e os
+checkpoints já gravados por ele (``msgpack``, ``json``…) continuam
+legíveis: ``loads_typed`` despacha pelo tipo gravado.
+
+O ``CachedSaver`` guarda em memória o último checkpoint de cada thread (LRU
+limitado por bytes, ``CHECKPOINT_CACHE_BYTES``) e grava direto no SQLite: o
+``graph.invoke`` do turno seguinte não lê nem desserializa o que o próprio
+processo acabou de gravar. Escritas de outro processo são detectadas pelo
+``PRAGMA data_version``.
+
+Com ``DB_SHARDS`` > 1 o ``ShardedSaver`` reparte as threads entre vários
+arquivos (``checkpoints.shard<i>.sqlite``), pelo mesmo hash de ``thread_id``
+das conversas.
+"""
+
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import ExitStack, closing, contextmanager
+from dataclasses import dataclass, field
+from itertools import islice
+
+import ormsgpack
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.utils import pending_writes_sql, writes_sort_key
+
+from app.core.metrics import metrics
+from app.db.shards import DB_SHARDS, shard_for, shard_path
+
+COMPACT_TYPE = "compact1"
+COMPACT_ZLIB_TYPE = "compact1+zlib"
+# Tabela de versões dentro do checkpoint compacto
+_VERSIONS = "\x00versions"
+
+COMPRESS_LEVEL = 1
+
+_EXT_MESSAGE = 64
+_MESSAGE_TYPES = {"human": HumanMessage, "ai": AIMessage}
+# Mesmas opções do serializador padrão: datas, UUIDs, enums e dataclasses
+# caem no ``_default`` (e daí no padrão) em vez de virarem strings/dicts.
+_OPTIONS = (
+    ormsgpack.OPT_NON_STR_KEYS
+    | ormsgpack.OPT_PASSTHROUGH_DATACLASS
+    | ormsgpack.OPT_PASSTHROUGH_DATETIME
+    | ormsgpack.OPT_PASSTHROUGH_ENUM
+    | ormsgpack.OPT_PASSTHROUGH_UUID
+    | ormsgpack.OPT_REPLACE_SURROGATES
+)
+
+
+def _plain_message(msg) -> bool:
+    """Mensagem sem metadados além de conteúdo e id (o que o grafo produz)."""
+    if type(msg) not in (HumanMessage, AIMessage):
+        return False
+    if msg.additional_kwargs or msg.response_metadata or msg.name or not isinstance(msg.content, str):
+        return False
+    if isinstance(msg, AIMessage):
+        return not (msg.tool_calls or msg.invalid_tool_calls or msg.usage_metadata)
+    return True
+
+
+def _default(obj):
+    if _plain_message(obj):
+        return ormsgpack.Ext(_EXT_MESSAGE, ormsgpack.packb([obj.type, obj.content, obj.id]))
+    raise TypeError(type(obj).__name__)
+
+
+def _ext_hook(code: int, data: bytes):
+    if code == _EXT_MESSAGE:
+        type_, content, id_ = ormsgpack.unpackb(data)
+        return _MESSAGE_TYPES[type_](content=content, id=id_)
+    raise ValueError(f"extensão desconhecida no checkpoint: {code}")
+
+
+def _is_checkpoint(obj) -> bool:
+    return type(obj) is dict and "channel_values" in obj and "channel_versions" in obj and "versions_seen" in obj
+
+
+def _pack_checkpoint(checkpoint: dict) -> dict:
+    """Troca as versões de ``channel_versions`` por índices numa tabela única."""
+    versions = checkpoint["channel_versions"]
+    table = list(dict.fromkeys(versions.values()))
+    index = dict(zip(table, range(len(table))))
+    packed = checkpoint.copy()
+    packed["channel_versions"] = [list(versions), list(map(index.__getitem__, versions.values()))]
+    packed[_VERSIONS] = table
+    return packed
+
+
+def _unpack_checkpoint(packed: dict) -> dict:
+    table = packed.pop(_VERSIONS)
+    channels, indices = packed["channel_versions"]
+    packed["channel_versions"] = dict(zip(channels, map(table.__getitem__, indices)))
+    return packed
+
+
+class CompactSerializer(JsonPlusSerializer):
+    """``JsonPlusSerializer`` com formato compacto para os estados do grafo."""
+
+    def __init__(self, compress: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.compress = compress
+
+    def dumps_typed(self, obj):
+        if obj is None or isinstance(obj, (bytes, bytearray)):
+            return super().dumps_typed(obj)
+        try:
+            data = ormsgpack.packb(
+                _pack_checkpoint(obj) if _is_checkpoint(obj) else obj, default=_default, option=_OPTIONS
+            )
+        except ormsgpack.MsgpackEncodeError:
+            return super().dumps_typed(obj)
+        if self.compress:
+            return COMPACT_ZLIB_TYPE, zlib.compress(data, COMPRESS_LEVEL)
+        return COMPACT_TYPE, data
+
+    def loads_typed(self, data):
+        type_, payload = data
+        if type_ == COMPACT_ZLIB_TYPE:
+            payload = zlib.decompress(payload)
+        elif type_ != COMPACT_TYPE:
+            # Checkpoints gravados antes (msgpack/json/pickle) seguem pelo padrão
+            return super().loads_typed(data)
+        obj = ormsgpack.unpackb(payload, ext_hook=_ext_hook, option=ormsgpack.OPT_NON_STR_KEYS)
+        if type(obj) is dict and _VERSIONS in obj:
+            return _unpack_checkpoint(obj)
+        return obj
+
+
+def checkpoint_serde() -> JsonPlusSerializer:
+    """Serializador conforme ``CHECKPOINT_SERDE``: compact, compact+zlib ou default."""
+    mode = os.getenv("CHECKPOINT_SERDE", "compact")
+    if mode == "default":
+        return JsonPlusSerializer()
+    return CompactSerializer(compress=mode == "compact+zlib")
+
+
+# Teto padrão do cache de checkpoints (bytes serializados)
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+
+
+class _SizedSerde:
+    """Repassa para o serializador real contando os bytes por thread."""
+
+    def __init__(self, serde):
+        self.serde = serde
+        self._local = threading.local()
+
+    def _add(self, payload) -> None:
+        self._local.bytes = getattr(self._local, "bytes", 0) + len(payload or b"")
+
+    def dumps_typed(self, obj):
+        typed = self.serde.dumps_typed(obj)
+        self._add(typed[1])
+        return typed
+
+    def loads_typed(self, data):
+        self._add(data[1])
+        return self.serde.loads_typed(data)
+
+    def take(self) -> int:
+        """Bytes contados nesta thread desde o último ``take``."""
+        size, self._local.bytes = getattr(self._local, "bytes", 0), 0
+        return size
+
+    def __getattr__(self, name):
+        return getattr(self.serde, name)
+
+
+def _copy_checkpoint(checkpoint: dict) -> dict:
+    """Cópia rasa do que o loop do grafo altera no lugar (canais e versões)."""
+    return {
+        **checkpoint,
+        "channel_values": checkpoint["channel_values"].copy(),
+        "channel_versions": checkpoint["channel_versions"].copy(),
+        "versions_seen": {node: seen.copy() for node, seen in checkpoint["versions_seen"].items()},
+    }
+
+
+def _merge_writes(target: dict, writes, task_id: str, task_path: str) -> None:
+    """Aplica *writes* como o ``put_writes`` do ``SqliteSaver``: REPLACE só
+    quando todos os canais são especiais, senão IGNORE."""
+    replace = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+    for idx, (channel, value) in enumerate(writes):
+        slot = (task_id, WRITES_IDX_MAP.get(channel, idx))
+        if replace or slot not in target:
+            target[slot] = (task_path, channel, value)
+
+
+@dataclass
+class _Entry:
+    """Último checkpoint de uma thread, já desserializado."""
+
+    checkpoint: dict
+    metadata: dict
+    parent_id: str | None
+    data_version: int
+    checkpoint_bytes: int
+    # (task_id, idx) -> (task_path, channel, value)
+    writes: dict = field(default_factory=dict)
+    writes_bytes: int = 0
+
+    @property
+    def id(self) -> str:
+        return self.checkpoint["id"]
+
+    @property
+    def size(self) -> int:
+        return self.checkpoint_bytes + self.writes_bytes
+
+
+class CachedSaver(SqliteSaver):
+    """``SqliteSaver`` com cache write-through do último checkpoint por thread.
+
+    ``get_tuple`` sem ``checkpoint_id`` (o caso de todo ``graph.invoke``)
+    sai da memória enquanto o arquivo não mudou por outra conexão; se mudou,
+    confere o id do último checkpoint e relê só as escritas pendentes. Os
+    valores do cache são compartilhados com o estado devolvido: os nós não
+    podem alterá-los no lugar.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, *, serde=None, max_bytes: int = DEFAULT_CACHE_BYTES):
+        super().__init__(conn, serde=_SizedSerde(serde or JsonPlusSerializer()))
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        # Escritas que chegaram antes do put do seu checkpoint (o LangGraph
+        # grava checkpoints em segundo plano): chave -> checkpoint_id -> escritas
+        self._early: dict[tuple, dict[str, list]] = {}
+        self._total = 0
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def _key(config) -> tuple:
+        conf = config["configurable"]
+        return str(conf["thread_id"]), conf.get("checkpoint_ns", "")
+
+    def _data_version(self) -> int:
+        with self.cursor(transaction=False) as cur:
+            return cur.execute("PRAGMA data_version").fetchone()[0]
+
+    def _load_writes(self, key: tuple, checkpoint_id: str) -> tuple[dict, int]:
+        with self.cursor(transaction=False) as cur:
+            rows = cur.execute(pending_writes_sql(self._has_task_path), (*key, checkpoint_id)).fetchall()
+        self.serde.take()
+        writes = {
+            (task_id, idx): (path, channel, self.serde.loads_typed((type_, value)))
+            for task_id, channel, type_, value, path, idx in rows
+        }
+        return writes, self.serde.take()
+
+    # ── Cache ────────────────────────────────────────────────────
+
+    def _store(self, key: tuple, entry: _Entry) -> None:
+        with self._cache_lock:
+            current = self._entries.get(key)
+            if current is not None and current.id > entry.id:
+                return
+            self._drop(key)
+            self._entries[key] = entry
+            self._total += entry.size
+            self._evict()
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total -= entry.size
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+
+    def _take_early(self, key: tuple, checkpoint_id: str) -> tuple[dict, int]:
+        """Escritas adiantadas de *checkpoint_id*; descarta as de checkpoints anteriores."""
+        early = self._early.pop(key, {})
+        writes, size = early.pop(checkpoint_id, ({}, 0))
+        later = {cid: pending for cid, pending in early.items() if cid > checkpoint_id}
+        if later:
+            self._early[key] = later
+        return writes, size
+
+    def _tuple(self, key: tuple, entry: _Entry) -> CheckpointTuple:
+        thread_id, checkpoint_ns = key
+        configurable = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+        writes = sorted(entry.writes.items(), key=lambda w: writes_sort_key(w[1][0], *w[0]))
+        return CheckpointTuple(
+            {"configurable": {**configurable, "checkpoint_id": entry.id}},
+            _copy_checkpoint(entry.checkpoint),
+            dict(entry.metadata),
+            {"configurable": {**configurable, "checkpoint_id": entry.parent_id}} if entry.parent_id else None,
+            [(task_id, channel, value) for (task_id, _), (_, channel, value) in writes],
+        )
+
+    def _fresh(self, key: tuple, entry: _Entry) -> bool:
+        """Confere a entrada contra o arquivo; relê as escritas se outro processo gravou."""
+        version = self._data_version()
+        if version == entry.data_version:
+            return True
+        with self.cursor(transaction=False) as cur:
+            row = cur.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1",
+                key,
+            ).fetchone()
+        if row is None or row[0] != entry.id:
+            return False
+        writes, size = self._load_writes(key, entry.id)
+        with self._cache_lock:
+            if self._entries.get(key) is entry:
+                self._total += size - entry.writes_bytes
+            entry.writes, entry.writes_bytes, entry.data_version = writes, size, version
+            self._evict()
+        return True
+
+    def cache_info(self) -> dict:
+        """Entradas e bytes ocupados pelo cache."""
+        with self._cache_lock:
+            return {"entries": len(self._entries), "bytes": self._total, "max_bytes": self.max_bytes}
+
+    # ── SqliteSaver ──────────────────────────────────────────────
+
+    def get_tuple(self, config):
+        checkpoint_id = get_checkpoint_id(config)
+        key = self._key(config)
+        with self._cache_lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None and checkpoint_id in (None, entry.id):
+            if self._fresh(key, entry):
+                metrics.incr("checkpoint_cache", result="hit")
+                with self._cache_lock:
+                    return self._tuple(key, entry)
+            metrics.incr("checkpoint_cache", result="stale")
+            with self._cache_lock:
+                if self._entries.get(key) is entry:
+                    self._drop(key)
+        elif checkpoint_id is None:
+            metrics.incr("checkpoint_cache", result="miss")
+        if checkpoint_id is not None:
+            return super().get_tuple(config)
+
+        # Lido antes do SELECT: o que outro processo gravar depois invalida
+        version = self._data_version()
+        self.serde.take()
+        saved = super().get_tuple(config)
+        if saved is None:
+            return None
+        size = self.serde.take()
+        writes, writes_size = self._load_writes(key, saved.checkpoint["id"])
+        parent = saved.parent_config["configurable"]["checkpoint_id"] if saved.parent_config else None
+        with self._cache_lock:
+            self._take_early(key, saved.checkpoint["id"])
+        self._store(key, _Entry(
+            _copy_checkpoint(saved.checkpoint), dict(saved.metadata), parent, version,
+            size - writes_size, writes, writes_size,
+        ))
+        return saved
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        # Lido antes da gravação: o commit desta conexão não muda o data_version,
+        # e o de outro processo logo depois do nosso não passa por já visto
+        version = self._data_version()
+        self.serde.take()
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        key = self._key(next_config)
+        entry = _Entry(
+            _copy_checkpoint(checkpoint),
+            json.loads(json.dumps(get_checkpoint_metadata(config, metadata), ensure_ascii=False)),
+            config["configurable"].get("checkpoint_id"),
+            version,
+            self.serde.take(),
+        )
+        with self._cache_lock:
+            entry.writes, entry.writes_bytes = self._take_early(key, entry.id)
+        self._store(key, entry)
+        return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        self.serde.take()
+        super().put_writes(config, writes, task_id, task_path)
+        size = self.serde.take()
+        key = self._key(config)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        path = task_path if self._has_task_path else ""
+        with self._cache_lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.id == checkpoint_id:
+                _merge_writes(entry.writes, writes, task_id, path)
+                entry.writes_bytes += size
+                self._total += size
+                self._evict()
+            elif entry is None or checkpoint_id > entry.id:
+                pending = self._early.setdefault(key, {}).setdefault(checkpoint_id, [{}, 0])
+                _merge_writes(pending[0], writes, task_id, path)
+                pending[1] += size
+            # Escritas de um checkpoint já superado não voltam a ser lidas
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self._cache_lock:
+            for key in [k for k in self._entries if k[0] == str(thread_id)]:
+                self._drop(key)
+            for key in [k for k in self._early if k[0] == str(thread_id)]:
+                del self._early[key]
+
+
+class ShardedSaver(BaseCheckpointSaver):
+    """Checkpoints repartidos entre *savers* (um arquivo cada) pelo ``thread_id``."""
+
+    def __init__(self, savers: list):
+        super().__init__(serde=savers[0].serde)
+        self.savers = savers
+
+    def _saver(self, config):
+        return self.savers[shard_for(config["configurable"]["thread_id"], len(self.savers))]
+
+    def get_tuple(self, config):
+        return self._saver(config).get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        if config and config["configurable"].get("thread_id") is not None:
+            yield from self._saver(config).list(config, filter=filter, before=before, limit=limit)
+            return
+        # Sem thread: scatter-gather, do mais recente para o mais antigo
+        merged = heapq.merge(
+            *(saver.list(config, filter=filter, before=before, limit=limit) for saver in self.savers),
+            key=lambda t: t.checkpoint["id"],
+            reverse=True,
+        )
+        yield from islice(merged, limit)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        return self._saver(config).put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        self._saver(config).put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.savers[shard_for(thread_id, len(self.savers))].delete_thread(thread_id)
+
+    def get_next_version(self, current, channel):
+        return self.savers[0].get_next_version(current, channel)
+
+    def get_delta_channel_history(self, *, config, channels):
+        return self._saver(config).get_delta_channel_history(config=config, channels=channels)
+
+
+def cache_bytes() -> int:
+    """Teto do cache de checkpoints (``CHECKPOINT_CACHE_BYTES``; 0 desliga)."""
+    return int(os.getenv("CHECKPOINT_CACHE_BYTES", DEFAULT_CACHE_BYTES))
+
+
+@contextmanager
+def open_checkpointer(path: str, max_bytes: int | None = None, shards: int = DB_SHARDS):
+    """``SqliteSaver.from_conn_string`` com o serializador de ``checkpoint_serde``.
+
+    Com cache (*max_bytes* ou ``cache_bytes()`` > 0) devolve um ``CachedSaver``;
+    com *shards* > 1, um ``ShardedSaver`` sobre um arquivo por shard, cada um
+    com sua fatia do cache.
+    """
+    max_bytes = cache_bytes() if max_bytes is None else max_bytes
+    if shards > 1:
+        with ExitStack() as stack:
+            yield ShardedSaver([
+                stack.enter_context(open_checkpointer(shard_path(path, i), max_bytes // shards, shards=1))
+                for i in range(shards)
+            ])
+        return
+    with closing(sqlite3.connect(path, check_same_thread=False)) as conn:
+        if max_bytes > 0:
+            yield CachedSaver(conn, serde=checkpoint_serde(), max_bytes=max_bytes)
+        else:
+            yield SqliteSaver(conn, serde=checkpoint_serde())
@@ -0,0 +1,174 @@
+"""Saudações: cache de variantes, pré-geração em background e fallback por latência.
+
+Saudações de retorno não dependem da mensagem do influenciador, só do nome.
+Elas são geradas com um marcador no lugar do nome e guardadas por
+(cenário, formato do nome) com TTL, para serem reaproveitadas entre
+conversas. A geração roda num pool de threads: o orquestrador espera no
+máximo ``GREETING_BUDGET_S`` e, se estourar, usa um template fixo.
+"""
+
+import contextvars
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from app.agents.negotiator import GREETING_NEW, generate_greeting
+from app.core.metrics import metrics, node_scope, thread_scope
+
+GREETING_CACHE_TTL_S = float(os.getenv("GREETING_CACHE_TTL_S", "21600"))
+GREETING_BUDGET_S = float(os.getenv("GREETING_BUDGET_S", "2.0"))
+GREETING_VARIANTS = int(os.getenv("GREETING_VARIANTS", "3"))
+
+NAME_PLACEHOLDER = "[NOME]"
+
+GREETING_RETURNING = (
+    "Oi {name}, que bom falar com você de novo! 😊\n\n"
+    "Tô por aqui para alinharmos uma nova parceria com a Gocase. "
+    "Pode me enviar seus valores e formatos disponíveis?"
+)
+
+
+def name_shape(name: str | None) -> str:
+    """Formato do nome que afeta o texto: ausente, simples ou composto."""
+    if not name or not name.strip():
+        return "none"
+    return "single" if len(name.split()) == 1 else "compound"
+
+
+def greeting_scenario(user_message: str | None, influencer_name: str | None) -> str:
+    """``new`` (template fixo), ``returning`` (cacheável) ou ``reply`` (depende da mensagem)."""
+    if user_message and user_message.strip():
+        return "reply"
+    return "returning" if influencer_name else "new"
+
+
+def fallback_greeting(influencer_name: str | None) -> str:
+    """Template imediato usado quando a geração estoura o orçamento de latência."""
+    if influencer_name:
+        return GREETING_RETURNING.format(name=influencer_name)
+    return GREETING_NEW
+
+
+class GreetingCache:
+    """Variantes de saudação por (cenário, formato do nome), com TTL."""
+
+    def __init__(self, ttl_s: float = GREETING_CACHE_TTL_S, max_variants: int = GREETING_VARIANTS):
+        self.ttl_s = ttl_s
+        self.max_variants = max_variants
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str], list[tuple[float, str]]] = {}
+
+    def _fresh(self, key: tuple[str, str]) -> list[tuple[float, str]]:
+        now = time.monotonic()
+        entries = [(ts, t) for ts, t in self._entries.get(key, []) if now - ts < self.ttl_s]
+        self._entries[key] = entries
+        return entries
+
+    def get(self, key: tuple[str, str]) -> str | None:
+        with self._lock:
+            entries = self._fresh(key)
+        return random.choice(entries)[1] if entries else None
+
+    def put(self, key: tuple[str, str], template: str) -> None:
+        with self._lock:
+            entries = self._fresh(key)
+            if template in (t for _, t in entries):
+                return
+            entries.append((time.monotonic(), template))
+            del entries[: -self.max_variants]
+
+    def needs_refill(self, key: tuple[str, str]) -> bool:
+        with self._lock:
+            return len(self._fresh(key)) < self.max_variants
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+greeting_cache = GreetingCache()
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="greeting")
+
+
+def _generate_template(shape: str) -> str:
+    """Gera uma saudação de retorno com o marcador no lugar do nome e a guarda no cache."""
+    template = generate_greeting(influencer_name=NAME_PLACEHOLDER)
+    if NAME_PLACEHOLDER in template:
+        greeting_cache.put(("returning", shape), template)
+    return template
+
+
+def cached_greeting(
+    user_message: str | None = None,
+    influencer_name: str | None = None,
+) -> str:
+    """Mesmos cenários de ``generate_greeting``, reaproveitando variantes em cache."""
+    scenario = greeting_scenario(user_message, influencer_name)
+    if scenario == "new":
+        return GREETING_NEW
+    if scenario == "reply":
+        metrics.incr("greeting", result="generated")
+        return generate_greeting(user_message=user_message, influencer_name=influencer_name)
+
+    key = (scenario, name_shape(influencer_name))
+    template = greeting_cache.get(key)
+    if template:
+        metrics.incr("greeting", result="hit")
+        if greeting_cache.needs_refill(key):
+            # Completa as variantes em background para diversificar os próximos acertos
+            _submit(_generate_template, key[1])
+    else:
+        metrics.incr("greeting", result="miss")
+        template = _generate_template(key[1])
+        if NAME_PLACEHOLDER not in template:
+            # O modelo ignorou o marcador: texto já é específico desta conversa
+            return template
+    return template.replace(NAME_PLACEHOLDER, influencer_name)
+
+
+def _submit(fn, *args) -> Future:
+    """Agenda *fn* no pool preservando o contexto (thread_id/nó das métricas)."""
+    ctx = contextvars.copy_context()
+    return _executor.submit(ctx.run, fn, *args)
+
+
+def start_greeting(
+    thread_id: str | None,
+    user_message: str | None = None,
+    influencer_name: str | None = None,
+) -> Future:
+    """Dispara a geração da saudação em background. O resultado é o texto final."""
+
+    def run() -> str:
+        with thread_scope(thread_id), node_scope("greeting"):
+            return cached_greeting(user_message=user_message, influencer_name=influencer_name)
+
+    if greeting_scenario(user_message, influencer_name) == "new":
+        # Template fixo: não vale a pena passar pelo pool
+        future: Future = Future()
+        future.set_result(GREETING_NEW)
+        return future
+    return _submit(run)
+
+
+def resolve_greeting(
+    future: Future,
+    influencer_name: str | None,
+    timeout: float | None = None,
+) -> str:
+    """Espera a saudação até o orçamento de latência; se estourar, usa o template.
+
+    A geração continua em background e aquece o cache para as próximas conversas.
+    """
+    budget = GREETING_BUDGET_S if timeout is None else timeout
+    try:
+        return future.result(timeout=budget)
+    except TimeoutError:
+        metrics.incr("greeting", result="fallback")
+        return fallback_greeting(influencer_name)
+    except Exception:
+        metrics.incr("greeting", result="error")
+        return fallback_greeting(influencer_name)
@@ -0,0 +1,366 @@
+"""Fila de entrada durável (SQLite) na frente de ``Orchestrator.process_message``.
+
+Mensagens chegam como eventos de webhook identificados pelo telefone. Cada
+mensagem é gravada em ``INBOX_DB`` antes de qualquer processamento, então
+sobrevive a reinícios. A chave de ordenação é ``agente:telefone`` — cada
+telefone tem uma conversa ativa por agente, logo a ordem por chave garante a
+ordem por ``thread_id``. Um worker só pega a mensagem mais antiga de uma chave
+quando nenhuma outra daquela chave está em processamento; chaves diferentes
+são processadas em paralelo pelo pool.
+
+Cada mensagem em processamento tem um dono (o ``WorkerPool`` que a pegou) e
+um ``heartbeat_at`` renovado pelo pool enquanto ele vive. Só volta para a
+fila a mensagem cujo heartbeat venceu o lease (``INBOX_LEASE_S``): turnos
+longos de um pool vivo, em outro processo, nunca são pegos de novo.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from app.core.metrics import metrics
+
+load_dotenv()
+
+INBOX_DB = os.getenv("INBOX_DB", "data/inbox.sqlite")
+INBOX_MAX_ATTEMPTS = int(os.getenv("INBOX_MAX_ATTEMPTS", "3"))
+# Sem heartbeat por tanto tempo, o dono da mensagem é dado como morto
+INBOX_LEASE_S = float(os.getenv("INBOX_LEASE_S", "60"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inbound_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ordering_key TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    not_before REAL,
+    started_at REAL,
+    owner TEXT,
+    heartbeat_at REAL,
+    finished_at REAL,
+    error TEXT,
+    response TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_inbound_key_status ON inbound_messages (ordering_key, status, id);
+CREATE INDEX IF NOT EXISTS ix_inbound_status ON inbound_messages (status, id);
+"""
+
+# Mais antiga pendente cuja chave não tem nada em processamento nem
+# mensagem anterior ainda pendente (ex: devolvida para retry).
+_CLAIM_SQL = """
+UPDATE inbound_messages
+SET status = 'processing', started_at = ?, owner = ?, heartbeat_at = ?, attempts = attempts + 1
+WHERE id = (
+    SELECT m.id FROM inbound_messages m
+    WHERE m.status = 'pending'
+      AND (m.not_before IS NULL OR m.not_before <= ?)
+      AND NOT EXISTS (
+          SELECT 1 FROM inbound_messages p
+          WHERE p.ordering_key = m.ordering_key
+            AND (p.status = 'processing' OR (p.status = 'pending' AND p.id < m.id))
+      )
+    ORDER BY m.id
+    LIMIT 1
+)
+RETURNING id, ordering_key, agent_id, phone, body, attempts, enqueued_at, started_at
+"""
+
+
+@dataclass
+class InboundMessage:
+    id: int
+    ordering_key: str
+    agent_id: str
+    phone: str
+    body: str
+    attempts: int
+    enqueued_at: float
+    started_at: float
+
+    @property
+    def wait_s(self) -> float:
+        """Tempo entre a chegada e o início do processamento."""
+        return self.started_at - self.enqueued_at
+
+
+class InboundQueue:
+    """Fila FIFO por chave, persistida em SQLite e segura entre threads e processos."""
+
+    def __init__(self, path: str = INBOX_DB, max_attempts: int = INBOX_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Uma conexão por thread, em modo autocommit."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _connect(self) -> "_Transaction":
+        """Transação ``BEGIN IMMEDIATE``: serializa os claims entre threads e processos."""
+        return _Transaction(self._conn())
+
+    def enqueue(self, phone: str, body: str, agent_id: str = "negotiator") -> int:
+        """Grava uma mensagem recebida. Retorna o id na fila."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "INSERT INTO inbound_messages (ordering_key, agent_id, phone, body, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (f"{agent_id}:{phone}", agent_id, phone, body, time.time()),
+            )
+            msg_id = cur.lastrowid
+        metrics.incr("inbox_enqueued", agent=agent_id)
+        return msg_id
+
+    def claim(self, owner: str | None = None) -> InboundMessage | None:
+        """Reserva a próxima mensagem elegível, respeitando a ordem por chave.
+
+        *owner* identifica quem renova o heartbeat (ver ``heartbeat``).
+        """
+        with self._connect() as conn:
+            now = time.time()
+            row = conn.execute(_CLAIM_SQL, (now, owner, now, now)).fetchone()
+        if row is None:
+            return None
+        msg = InboundMessage(*row)
+        metrics.observe("inbox_wait_ms", round(msg.wait_s * 1000, 3), agent=msg.agent_id)
+        return msg
+
+    def complete(self, msg_id: int, response: dict | None = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE inbound_messages SET status = 'done', finished_at = ?, response = ?, "
+                "error = NULL WHERE id = ?",
+                (time.time(), json.dumps(response, ensure_ascii=False, default=str), msg_id),
+            )
+        metrics.incr("inbox_processed", status="done")
+
+    def fail(self, msg_id: int, error: str, attempts: int) -> str:
+        """Devolve a mensagem para retry ou, após ``max_attempts``, marca como ``failed``.
+
+        Enquanto voltar para ``pending`` (com backoff em ``not_before``), as
+        mensagens seguintes da mesma chave continuam bloqueadas; ``failed``
+        libera a fila daquela conversa.
+        """
+        status = "pending" if attempts < self.max_attempts else "failed"
+        now = time.time()
+        # Backoff exponencial simples antes da próxima tentativa
+        not_before = now + 2 ** attempts if status == "pending" else None
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE inbound_messages SET status = ?, finished_at = ?, error = ?, not_before = ? "
+                "WHERE id = ?",
+                (status, now, error[:2000], not_before, msg_id),
+            )
+        metrics.incr("inbox_processed", status="retry" if status == "pending" else "failed")
+        return status
+
+    def heartbeat(self, owner: str) -> int:
+        """Renova o lease das mensagens em processamento de *owner*."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE inbound_messages SET heartbeat_at = ? "
+                "WHERE status = 'processing' AND owner = ?",
+                (time.time(), owner),
+            )
+            return cur.rowcount
+
+    def requeue_stale(self, lease_s: float = INBOX_LEASE_S) -> int:
+        """Devolve para ``pending`` mensagens cujo dono parou de renovar o heartbeat."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE inbound_messages SET status = 'pending', owner = NULL "
+                "WHERE status = 'processing' AND heartbeat_at < ?",
+                (time.time() - lease_s,),
+            )
+            return cur.rowcount
+
+    def depth(self) -> dict[str, int]:
+        """Quantidade de mensagens por status."""
+        rows = self._conn().execute(
+            "SELECT status, COUNT(*) FROM inbound_messages GROUP BY status"
+        ).fetchall()
+        counts = {"pending": 0, "processing": 0, "done": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+    def oldest_pending_age_s(self) -> float:
+        row = self._conn().execute(
+            "SELECT MIN(enqueued_at) FROM inbound_messages WHERE status = 'pending'"
+        ).fetchone()
+        return time.time() - row[0] if row and row[0] else 0.0
+
+    def record_depth(self) -> dict[str, int]:
+        """Publica profundidade e idade da mensagem mais antiga como gauges."""
+        counts = self.depth()
+        for status in ("pending", "processing"):
+            metrics.gauge("inbox_depth", counts[status], status=status)
+        metrics.gauge("inbox_oldest_pending_s", round(self.oldest_pending_age_s(), 3))
+        return counts
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class _Transaction:
+    """``with`` que abre ``BEGIN IMMEDIATE`` e faz commit/rollback na conexão da thread."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class OrchestratorHandler:
+    """Processa mensagens da fila com um ``Orchestrator`` próprio (um por worker)."""
+
+    def __init__(self, agent_id: str = "negotiator", resources=None):
+        from app.core.orchestrator import Orchestrator
+
+        self.orchestrator = Orchestrator(agent_id=agent_id, resources=resources)
+
+    def __call__(self, msg: InboundMessage) -> dict:
+        """Um turno por mensagem; no retry (``InboundQueue.fail``) a mensagem não é regravada."""
+        orch = self.orchestrator
+        started = orch.start_or_resume_conversation(msg.phone)
+        conv = started["conversation"]
+        influencer = started["influencer"]
+        greeting = None
+        if not started["resumed"]:
+            orch.start_greeting(conv.id, influencer_name=influencer.name)
+            greeting = orch.finish_greeting(conv.id)
+        if conv.owner == "human":
+            # Conversa já com operador: só registra a mensagem
+            from app.core.store import save_user_message
+
+            save_user_message(orch.db_session, conv.id, msg.body, inbound_id=msg.id)
+            orch.db_session.commit()
+            return {"thread_id": conv.thread_id, "response": None, "owner": "human"}
+        result = orch.process_message(
+            conv.thread_id, conv.id, msg.body, influencer_id=influencer.id, inbound_id=msg.id
+        )
+        return {"thread_id": conv.thread_id, "greeting": greeting, **result}
+
+    def close(self) -> None:
+        self.orchestrator.close()
+
+
+class WorkerPool:
+    """Pool de threads consumindo a fila; cada worker cria seu handler via *handler_factory*.
+
+    Uma thread extra renova o heartbeat das mensagens do pool a cada
+    ``lease_s / 4`` enquanto houver workers rodando.
+    """
+
+    def __init__(
+        self,
+        queue: InboundQueue,
+        handler_factory,
+        workers: int = 4,
+        poll_interval_s: float = 0.2,
+        lease_s: float = INBOX_LEASE_S,
+    ):
+        self.queue = queue
+        self.handler_factory = handler_factory
+        self.workers = workers
+        self.poll_interval_s = poll_interval_s
+        self.lease_s = lease_s
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._beat_stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._beat: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._beat_stop.clear()
+        self.queue.requeue_stale(self.lease_s)
+        self._beat = threading.Thread(target=self._heartbeat, name="inbox-heartbeat", daemon=True)
+        self._beat.start()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"inbox-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Sinaliza parada e espera os workers terminarem a mensagem atual."""
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads.clear()
+        # O heartbeat só para depois dos workers: a mensagem atual segue com lease
+        self._beat_stop.set()
+        if self._beat is not None:
+            self._beat.join(timeout)
+            self._beat = None
+
+    def _heartbeat(self) -> None:
+        try:
+            while not self._beat_stop.wait(self.lease_s / 4):
+                self.queue.heartbeat(self.owner)
+        finally:
+            self.queue.close()
+
+    def run_until_idle(self, idle_s: float = 1.0) -> None:
+        """Processa até a fila ficar vazia por *idle_s* segundos (útil em lotes e testes)."""
+        self.start()
+        idle_since = None
+        while True:
+            counts = self.queue.depth()
+            if counts["pending"] == 0 and counts["processing"] == 0:
+                idle_since = idle_since or time.monotonic()
+                if time.monotonic() - idle_since >= idle_s:
+                    break
+            else:
+                idle_since = None
+            time.sleep(self.poll_interval_s)
+        self.stop()
+
+    def _run(self) -> None:
+        handler = self.handler_factory()
+        try:
+            while not self._stop.is_set():
+                msg = self.queue.claim(self.owner)
+                if msg is None:
+                    self._stop.wait(self.poll_interval_s)
+                    continue
+                try:
+                    response = handler(msg)
+                except Exception as exc:
+                    self.queue.fail(msg.id, f"{type(exc).__name__}: {exc}", msg.attempts)
+                else:
+                    self.queue.complete(msg.id, response)
+                self.queue.record_depth()
+        finally:
+            close = getattr(handler, "close", None)
+            if close:
+                close()
+            self.queue.close()
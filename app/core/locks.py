@@ -0,0 +1,177 @@
+"""Locks por ``thread_id``: serializam turnos da mesma conversa, entre threads e processos.
+
+Dois níveis:
+
+- em processo: um ``threading.Lock`` por ``thread_id``, criado sob demanda e
+  descartado quando ninguém mais o usa;
+- entre processos: lock de registro POSIX (``fcntl.lockf``) de 1 byte num
+  único arquivo (``LOCK_FILE``), no offset derivado do hash do ``thread_id``.
+  Conversas diferentes caem em bytes diferentes e não se bloqueiam, e o
+  arquivo não cresce com o número de conversas.
+
+Locks POSIX pertencem ao processo, não à thread — por isso o lock em processo
+é sempre adquirido primeiro. Sem ``fcntl`` (Windows) só o nível em processo vale.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from app.core.metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+load_dotenv()
+
+LOCK_FILE = os.getenv("LOCK_FILE", "data/threads.lock")
+LOCK_TIMEOUT_S = float(os.getenv("LOCK_TIMEOUT_S", "120"))
+
+# Offsets até 2^62 cabem em off_t de 64 bits com folga
+_OFFSET_SPACE = 2**62
+
+
+class ThreadLockTimeout(TimeoutError):
+    """O lock da conversa não foi obtido dentro do prazo."""
+
+
+class _Entry:
+    __slots__ = ("lock", "refs", "owner", "depth")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.refs = 0
+        self.owner: int | None = None
+        self.depth = 0
+
+
+class ThreadLockManager:
+    """Gerencia os locks por conversa. Reentrante para a mesma thread do SO."""
+
+    def __init__(self, path: str | None = LOCK_FILE, timeout_s: float | None = LOCK_TIMEOUT_S):
+        self.path = path
+        self.timeout_s = timeout_s
+        self._mutex = threading.Lock()
+        self._entries: dict[str, _Entry] = {}
+        self._fd: int | None = None
+
+    # ── Nível em processo ────────────────────────────────────────
+
+    def _ref(self, thread_id: str) -> _Entry:
+        with self._mutex:
+            entry = self._entries.get(thread_id)
+            if entry is None:
+                entry = self._entries[thread_id] = _Entry()
+            entry.refs += 1
+            return entry
+
+    def _unref(self, thread_id: str, entry: _Entry) -> None:
+        with self._mutex:
+            entry.refs -= 1
+            if entry.refs == 0:
+                self._entries.pop(thread_id, None)
+
+    # ── Nível entre processos ────────────────────────────────────
+
+    def _file(self) -> int | None:
+        if fcntl is None or not self.path:
+            return None
+        with self._mutex:
+            if self._fd is None:
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                # Nunca fechado: fechar qualquer fd do arquivo solta todos os locks do processo
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            return self._fd
+
+    @staticmethod
+    def _offset(thread_id: str) -> int:
+        digest = hashlib.blake2b(thread_id.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % _OFFSET_SPACE
+
+    def _lock_file(self, thread_id: str, deadline: float | None) -> None:
+        fd = self._file()
+        if fd is None:
+            return
+        offset = self._offset(thread_id)
+        if deadline is None:
+            fcntl.lockf(fd, fcntl.LOCK_EX, 1, offset, os.SEEK_SET)
+            return
+        delay = 0.005
+        while True:
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, offset, os.SEEK_SET)
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise ThreadLockTimeout(f"lock de {thread_id} ocupado por outro processo")
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+
+    def _unlock_file(self, thread_id: str) -> None:
+        fd = self._file()
+        if fd is not None:
+            fcntl.lockf(fd, fcntl.LOCK_UN, 1, self._offset(thread_id), os.SEEK_SET)
+
+    # ── API ──────────────────────────────────────────────────────
+
+    def _acquire(self, thread_id: str, entry: _Entry, timeout: float | None) -> None:
+        timeout = self.timeout_s if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout if timeout is not None else None
+        if not entry.lock.acquire(timeout=timeout if timeout is not None else -1):
+            metrics.incr("lock_timeouts", scope="process")
+            raise ThreadLockTimeout(f"lock de {thread_id} ocupado por outra thread")
+        try:
+            self._lock_file(thread_id, deadline)
+        except BaseException:
+            entry.lock.release()
+            metrics.incr("lock_timeouts", scope="file")
+            raise
+        waited = time.monotonic() - start
+        metrics.observe("lock_wait_ms", round(waited * 1000, 3))
+        if waited > 0.001:
+            metrics.incr("lock_contended")
+
+    @contextmanager
+    def hold(self, thread_id: str, timeout: float | None = None):
+        """Segura o lock da conversa durante o bloco.
+
+        Levanta ``ThreadLockTimeout`` se não conseguir em *timeout* segundos
+        (padrão ``LOCK_TIMEOUT_S``). Chamadas aninhadas na mesma thread não bloqueiam.
+        """
+        me = threading.get_ident()
+        entry = self._ref(thread_id)
+        try:
+            if entry.owner == me:
+                entry.depth += 1
+                try:
+                    yield
+                finally:
+                    entry.depth -= 1
+                return
+
+            self._acquire(thread_id, entry, timeout)
+            entry.owner, entry.depth = me, 1
+            try:
+                yield
+            finally:
+                entry.owner, entry.depth = None, 0
+                self._unlock_file(thread_id)
+                entry.lock.release()
+        finally:
+            self._unref(thread_id, entry)
+
+    def held(self) -> list[str]:
+        """``thread_id``s com lock ativo neste processo."""
+        with self._mutex:
+            return [tid for tid, e in self._entries.items() if e.owner is not None]
+
+
+thread_locks = ThreadLockManager()
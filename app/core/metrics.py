@@ -0,0 +1,389 @@
+"""Métricas em processo: latência dos nós do grafo e das chamadas LLM.
+
+Os eventos ficam num registro em memória (thread-safe) e podem ser exportados
+em formato texto do Prometheus ou JSONL. O orquestrador faz ``flush`` dos
+eventos novos para ``METRICS_FILE`` ao fim de cada turno; o comando
+``python -m app stats`` relê esse arquivo e calcula os percentis.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+
+METRICS_FILE = os.getenv("METRICS_FILE", "data/metrics.jsonl")
+
+_QUANTILES = (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99"))
+
+_current_node: ContextVar[str | None] = ContextVar("current_node", default=None)
+_current_thread: ContextVar[str | None] = ContextVar("current_thread", default=None)
+
+
+def current_node() -> str | None:
+    """Nome do nó (ou fase) em execução no contexto atual."""
+    return _current_node.get()
+
+
+def current_thread() -> str | None:
+    """``thread_id`` da conversa sendo processada no contexto atual."""
+    return _current_thread.get()
+
+
+@contextmanager
+def thread_scope(thread_id: str | None):
+    """Associa as chamadas LLM feitas dentro do bloco a uma conversa."""
+    token = _current_thread.set(thread_id)
+    try:
+        yield
+    finally:
+        _current_thread.reset(token)
+
+
+@contextmanager
+def node_scope(name: str):
+    """Marca chamadas feitas fora do grafo (saudação, pós-deal) com um nome de nó."""
+    token = _current_node.set(name)
+    try:
+        yield
+    finally:
+        _current_node.reset(token)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Percentil *q* (0-100) com interpolação linear entre os ranks vizinhos."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    pos = (len(ordered) - 1) * q / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+class MetricsRegistry:
+    """Registro em memória de eventos de latência e uso de LLM."""
+
+    def __init__(self, max_events: int = 50_000):
+        self._lock = threading.Lock()
+        self._events: deque[dict] = deque(maxlen=max_events)
+        self._seq = 0
+        self._flushed_seq = 0
+        self._listeners: list = []
+        self._flush_lock = threading.Lock()
+
+    # ── Registro ─────────────────────────────────────────────────
+
+    def _add(self, event: dict) -> None:
+        event.setdefault("ts", time.time())
+        with self._lock:
+            self._seq += 1
+            event["seq"] = self._seq
+            self._events.append(event)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(event)
+
+    def add_listener(self, fn) -> None:
+        """Registra um callback chamado a cada evento novo (ex: persistência em lote)."""
+        with self._lock:
+            if fn not in self._listeners:
+                self._listeners.append(fn)
+
+    def record_node(self, node: str, duration_s: float, error: bool = False) -> None:
+        self._add(
+            {
+                "kind": "node",
+                "node": node,
+                "duration_ms": round(duration_s * 1000, 3),
+                "error": error,
+            }
+        )
+
+    def record_llm_call(
+        self,
+        *,
+        node: str | None,
+        call: str,
+        model: str | None,
+        duration_s: float,
+        input_tokens: int = 0,
+        cached_tokens: int = 0,
+        output_tokens: int = 0,
+        iteration: int | None = None,
+        error: bool = False,
+    ) -> None:
+        self._add(
+            {
+                "kind": "llm",
+                "node": node or "-",
+                "call": call,
+                "model": model or "-",
+                "thread_id": current_thread(),
+                "input_tokens": input_tokens,
+                "cached_tokens": cached_tokens,
+                "output_tokens": output_tokens,
+                "iteration": iteration,
+                "duration_ms": round(duration_s * 1000, 3),
+                "error": error,
+            }
+        )
+
+    def record_tool_loop(self, node: str | None, iterations: int) -> None:
+        self._add({"kind": "tool_loop", "node": node or "-", "iterations": iterations})
+
+    def incr(self, name: str, value: float = 1, **labels: str) -> None:
+        """Incrementa um contador nomeado (ex: ``fast_path``) com rótulos livres."""
+        self._add({"kind": "counter", "name": name, "value": value, "labels": labels})
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Registra uma amostra (ex: tempo de espera na fila, em ms) para percentis."""
+        self._add({"kind": "observation", "name": name, "value": value, "labels": labels})
+
+    def gauge(self, name: str, value: float, **labels: str) -> None:
+        """Registra o valor atual de um gauge (ex: profundidade da fila)."""
+        self._add({"kind": "gauge", "name": name, "value": value, "labels": labels})
+
+    # ── Consulta ─────────────────────────────────────────────────
+
+    def events(self, kind: str | None = None) -> list[dict]:
+        with self._lock:
+            events = list(self._events)
+        if kind:
+            events = [e for e in events if e["kind"] == kind]
+        return events
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events.clear()
+            self._flushed_seq = self._seq
+
+    def node_summary(self) -> dict[str, dict]:
+        """Latência por nó: count, média e p50/p95/p99 em milissegundos."""
+        by_node: dict[str, list[float]] = {}
+        for e in self.events("node"):
+            by_node.setdefault(e["node"], []).append(e["duration_ms"])
+        return {node: _summarize(values) for node, values in sorted(by_node.items())}
+
+    def llm_summary(self) -> dict[tuple[str, str], dict]:
+        """Uso de LLM agrupado por (nó, modelo)."""
+        groups: dict[tuple[str, str], dict] = {}
+        for e in self.events("llm"):
+            key = (e["node"], e["model"])
+            g = groups.setdefault(
+                key,
+                {
+                    "calls": 0,
+                    "errors": 0,
+                    "input_tokens": 0,
+                    "cached_tokens": 0,
+                    "output_tokens": 0,
+                    "durations": [],
+                },
+            )
+            g["calls"] += 1
+            g["errors"] += 1 if e.get("error") else 0
+            g["input_tokens"] += e.get("input_tokens") or 0
+            g["cached_tokens"] += e.get("cached_tokens") or 0
+            g["output_tokens"] += e.get("output_tokens") or 0
+            g["durations"].append(e["duration_ms"])
+        for g in groups.values():
+            g.update(_summarize(g.pop("durations")))
+            g["cache_hit_rate"] = (
+                round(g["cached_tokens"] / g["input_tokens"], 4) if g["input_tokens"] else 0.0
+            )
+        return dict(sorted(groups.items()))
+
+    def counter_summary(self) -> dict[tuple[str, tuple], float]:
+        """Totais por (nome, rótulos ordenados)."""
+        totals: dict[tuple[str, tuple], float] = {}
+        for e in self.events("counter"):
+            key = (e["name"], tuple(sorted(e.get("labels", {}).items())))
+            totals[key] = totals.get(key, 0) + e["value"]
+        return dict(sorted(totals.items()))
+
+    def observation_summary(self) -> dict[tuple[str, tuple], dict]:
+        """Percentis das amostras por (nome, rótulos ordenados)."""
+        groups: dict[tuple[str, tuple], list[float]] = {}
+        for e in self.events("observation"):
+            key = (e["name"], tuple(sorted(e.get("labels", {}).items())))
+            groups.setdefault(key, []).append(e["value"])
+        return {key: _summarize(values) for key, values in sorted(groups.items())}
+
+    def gauge_summary(self) -> dict[tuple[str, tuple], float]:
+        """Último valor de cada gauge por (nome, rótulos ordenados)."""
+        latest: dict[tuple[str, tuple], float] = {}
+        for e in self.events("gauge"):
+            latest[(e["name"], tuple(sorted(e.get("labels", {}).items())))] = e["value"]
+        return dict(sorted(latest.items()))
+
+    def tool_loop_summary(self) -> dict[str, dict]:
+        """Iterações do loop de tools por nó."""
+        by_node: dict[str, list[float]] = {}
+        for e in self.events("tool_loop"):
+            by_node.setdefault(e["node"], []).append(e["iterations"])
+        return {node: _summarize(values) for node, values in sorted(by_node.items())}
+
+    # ── Exportação ───────────────────────────────────────────────
+
+    def to_jsonl(self) -> str:
+        return "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in self.events())
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP negotiator_node_duration_ms Latência dos nós do grafo.",
+            "# TYPE negotiator_node_duration_ms summary",
+        ]
+        for node, s in self.node_summary().items():
+            for q, key in _QUANTILES:
+                lines.append(f'negotiator_node_duration_ms{{node="{node}",quantile="{q}"}} {s[key]}')
+            lines.append(f'negotiator_node_duration_ms_sum{{node="{node}"}} {s["sum"]}')
+            lines.append(f'negotiator_node_duration_ms_count{{node="{node}"}} {s["count"]}')
+
+        llm = self.llm_summary()
+        lines += [
+            "# HELP negotiator_llm_calls_total Chamadas à Responses API.",
+            "# TYPE negotiator_llm_calls_total counter",
+        ]
+        for (node, model), s in llm.items():
+            lines.append(f'negotiator_llm_calls_total{{node="{node}",model="{model}"}} {s["calls"]}')
+        lines += [
+            "# HELP negotiator_llm_tokens_total Tokens consumidos nas chamadas LLM.",
+            "# TYPE negotiator_llm_tokens_total counter",
+        ]
+        for (node, model), s in llm.items():
+            for kind in ("input", "cached", "output"):
+                lines.append(
+                    f'negotiator_llm_tokens_total{{node="{node}",model="{model}",kind="{kind}"}} '
+                    f'{s[kind + "_tokens"]}'
+                )
+        lines += [
+            "# HELP negotiator_llm_cache_hit_ratio Fração dos tokens de entrada servidos do cache de prompt.",
+            "# TYPE negotiator_llm_cache_hit_ratio gauge",
+        ]
+        for (node, model), s in llm.items():
+            lines.append(
+                f'negotiator_llm_cache_hit_ratio{{node="{node}",model="{model}"}} {s["cache_hit_rate"]}'
+            )
+        lines += [
+            "# HELP negotiator_llm_duration_ms Latência das chamadas LLM.",
+            "# TYPE negotiator_llm_duration_ms summary",
+        ]
+        for (node, model), s in llm.items():
+            labels = f'node="{node}",model="{model}"'
+            for q, key in _QUANTILES:
+                lines.append(f'negotiator_llm_duration_ms{{{labels},quantile="{q}"}} {s[key]}')
+            lines.append(f"negotiator_llm_duration_ms_sum{{{labels}}} {s['sum']}")
+            lines.append(f"negotiator_llm_duration_ms_count{{{labels}}} {s['count']}")
+
+        lines += [
+            "# HELP negotiator_tool_loop_iterations Iterações do loop de tools por turno.",
+            "# TYPE negotiator_tool_loop_iterations summary",
+        ]
+        for node, s in self.tool_loop_summary().items():
+            lines.append(f'negotiator_tool_loop_iterations_sum{{node="{node}"}} {s["sum"]}')
+            lines.append(f'negotiator_tool_loop_iterations_count{{node="{node}"}} {s["count"]}')
+
+        declared = set()
+        for (name, labels), total in self.counter_summary().items():
+            metric = f"negotiator_{name}_total"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{metric}{{{label_str}}} {total}")
+
+        for (name, labels), value in self.gauge_summary().items():
+            metric = f"negotiator_{name}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} gauge")
+                declared.add(metric)
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{metric}{{{label_str}}} {value}")
+
+        for (name, labels), s in self.observation_summary().items():
+            metric = f"negotiator_{name}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} summary")
+                declared.add(metric)
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+            sep = "," if label_str else ""
+            for q, key in _QUANTILES:
+                lines.append(f'{metric}{{{label_str}{sep}quantile="{q}"}} {s[key]}')
+            lines.append(f"{metric}_sum{{{label_str}}} {s['sum']}")
+            lines.append(f"{metric}_count{{{label_str}}} {s['count']}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self, path: str | None = None) -> int:
+        """Anexa ao arquivo JSONL os eventos ainda não exportados. Retorna quantos."""
+        path = path if path is not None else METRICS_FILE
+        if not path:
+            return 0
+        with self._lock:
+            pending = [e for e in self._events if e["seq"] > self._flushed_seq]
+            self._flushed_seq = self._seq
+        if not pending:
+            return 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Vários workers podem exportar ao mesmo tempo: uma escrita por vez
+        with self._flush_lock, open(path, "a", encoding="utf-8") as fh:
+            fh.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in pending))
+        return len(pending)
+
+    @classmethod
+    def load_jsonl(cls, path: str) -> "MetricsRegistry":
+        """Cria um registro a partir de um arquivo JSONL exportado."""
+        reg = cls(max_events=None)
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if line:
+                    reg._add(json.loads(line))
+        reg._flushed_seq = reg._seq
+        return reg
+
+
+def _summarize(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "sum": round(sum(values), 3),
+        "mean": round(sum(values) / len(values), 3) if values else 0.0,
+        "p50": round(percentile(values, 50), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+    }
+
+
+metrics = MetricsRegistry()
+
+
+def timed_node(name: str, fn):
+    """Envolve um nó do LangGraph registrando sua latência em ``metrics``.
+
+    Interrupções do grafo (``interrupt()`` no nó de aprovação) não contam como erro.
+    """
+    from langgraph.errors import GraphBubbleUp
+
+    @wraps(fn)
+    def wrapper(state):
+        token = _current_node.set(name)
+        start = time.perf_counter()
+        error = False
+        try:
+            return fn(state)
+        except GraphBubbleUp:
+            raise
+        except Exception:
+            error = True
+            raise
+        finally:
+            _current_node.reset(token)
+            metrics.record_node(name, time.perf_counter() - start, error=error)
+
+    return wrapper
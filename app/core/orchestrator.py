@@ -1,20 +1,21 @@
 """Orquestrador: ponte entre CLI e LangGraph."""
 
-import os
-from pathlib import Path
-
+import openai
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage
-from langgraph.checkpoint.sqlite import SqliteSaver
 
 from app.agents.negotiator import (
-    PERSONAL_INFO_FIELDS,
-    build_graph,
     extract_personal_info,
-    generate_greeting,
     generate_post_deal_response,
+    post_deal_turn,
 )
-from app.core.registry import registry
+from app.core.accounting import llm_calls
+from app.core.greetings import resolve_greeting, start_greeting
+from app.core.locks import thread_locks
+from app.core.metrics import metrics, node_scope, thread_scope
+from app.core.resilience import LlmUnavailable
+from app.core.resources import SharedResources, load_resources
+from app.core.routing import ModelRouter, router_scope
 from app.core.store import (
     create_conversation,
     get_active_conversation,
@@ -23,32 +24,48 @@ from app.core.store import (
     get_or_create_influencer,
     save_deal,
     save_message,
+    save_user_message,
     update_conversation_owner,
     update_conversation_status,
     update_influencer_profile,
 )
-from app.db.session import SessionLocal, init_db
 from app.tools.guardrails import check_human_handoff, check_sensitive_data, SENSITIVE_RESPONSE
+from app.tools.personal_info import (
+    PERSONAL_INFO_FIELDS,
+    clean_personal_fields,
+    parse_personal_info,
+    render_post_deal_reply,
+)
 
 load_dotenv()
 
-CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", "data/checkpoints.sqlite")
+FALLBACK_RESPONSE = "Desculpe, não consegui processar sua mensagem. Pode repetir?"
+
+# Falhas do LLM que terminam o turno com FALLBACK_RESPONSE: prazo/retries
+# esgotados e erros da API que não valem retry (4xx, autenticação)
+LLM_ERRORS = (LlmUnavailable, openai.APIError)
 
 
 class Orchestrator:
     """Gerencia o ciclo de vida das conversas entre CLI e LangGraph."""
 
-    def __init__(self, agent_id: str = "negotiator"):
-        init_db()
-        self.agent_config = registry.get(agent_id)
-        if not self.agent_config:
-            raise ValueError(f"Agent '{agent_id}' not found in registry")
-
-        Path(CHECKPOINT_DB).parent.mkdir(parents=True, exist_ok=True)
-        self._checkpointer_ctx = SqliteSaver.from_conn_string(CHECKPOINT_DB)
-        self.checkpointer = self._checkpointer_ctx.__enter__()
-        self.graph = build_graph(checkpointer=self.checkpointer)
-        self.db_session = SessionLocal()
+    def __init__(
+        self, agent_id: str = "negotiator", resources: SharedResources | None = None
+    ):
+        # Sem recursos compartilhados: checa schema, compila o grafo e abre
+        # um checkpointer só para esta instância (uso interativo).
+        self._owns_resources = resources is None
+        if resources is None:
+            resources = load_resources(agent_id, warm=False)
+        self.resources = resources
+        self.agent_config = resources.agent_config
+        self.checkpointer = resources.checkpointer
+        self.graph = resources.graph
+        # Rotas de modelo para chamadas fora do grafo (saudação, pós-deal)
+        self.router = ModelRouter(self.agent_config.config.get("model_routing"))
+        self.db_session = resources.session_factory()
+        # conversation_id → (Future da saudação, nome do influenciador)
+        self._pending_greetings: dict[int, tuple] = {}
 
         self.agent = get_or_create_agent(
             self.db_session, self.agent_config.agent_id, self.agent_config.name
@@ -64,7 +81,7 @@ class Orchestrator:
 
         if not new:
             conv = get_active_conversation(
-                self.db_session, self.agent.id, influencer.id
+                self.db_session, self.agent.id, influencer.id, phone=influencer_phone
             )
             if conv:
                 return {
@@ -84,6 +101,52 @@ class Orchestrator:
             "resumed": False,
         }
 
+    def start_greeting(
+        self,
+        conversation_id: int,
+        user_message: str | None = None,
+        influencer_name: str | None = None,
+    ) -> None:
+        """Dispara a geração da saudação em background, sem bloquear a interface.
+
+        A saudação só é persistida em ``finish_greeting`` — chamado pela
+        interface quando quiser exibi-la, ou automaticamente antes de processar
+        a primeira mensagem do influenciador, para manter a ordem no histórico.
+        """
+        from app.db.models import Conversation
+
+        conv = self.db_session.get(Conversation, conversation_id)
+        with router_scope(self.router):
+            future = start_greeting(
+                conv.thread_id if conv else None,
+                user_message=user_message,
+                influencer_name=influencer_name,
+            )
+        self._pending_greetings[conversation_id] = (future, influencer_name)
+
+    def greeting_ready(self, conversation_id: int) -> bool:
+        """True se há saudação pendente e ela já terminou de ser gerada."""
+        pending = self._pending_greetings.get(conversation_id)
+        return bool(pending and pending[0].done())
+
+    def finish_greeting(
+        self, conversation_id: int, timeout: float | None = None
+    ) -> str | None:
+        """Persiste e retorna a saudação pendente (ou ``None`` se não houver).
+
+        Espera no máximo *timeout* segundos (padrão ``GREETING_BUDGET_S``);
+        se a geração não terminar a tempo, usa o template de fallback.
+        """
+        pending = self._pending_greetings.pop(conversation_id, None)
+        if pending is None:
+            return None
+        future, influencer_name = pending
+        greeting = resolve_greeting(future, influencer_name, timeout=timeout)
+        save_message(self.db_session, conversation_id, "assistant", greeting)
+        self.db_session.commit()
+        self._flush_metrics()
+        return greeting
+
     def send_greeting(
         self,
         conversation_id: int,
@@ -96,19 +159,25 @@ class Orchestrator:
         auto-apresentação. Se *user_message* é fornecido, a saudação é
         adaptada para respondê-lo.
         """
-        greeting = generate_greeting(
-            user_message=user_message,
-            influencer_name=influencer_name,
+        self.start_greeting(
+            conversation_id, user_message=user_message, influencer_name=influencer_name
         )
-        save_message(self.db_session, conversation_id, "assistant", greeting)
-        self.db_session.commit()
-        return greeting
+        return self.finish_greeting(conversation_id)
+
+    def _flush_metrics(self) -> None:
+        """Exporta métricas do turno e grava as chamadas LLM em lote."""
+        metrics.flush()
+        llm_calls.flush(self.db_session)
 
     def _process_post_deal(
-        self, conversation_id: int, user_message: str, influencer_id: int | None
+        self,
+        conversation_id: int,
+        user_message: str,
+        influencer_id: int | None,
+        inbound_id: int | None = None,
     ) -> dict:
         """Trata mensagens após fechamento de deal — coleta dados pessoais."""
-        save_message(self.db_session, conversation_id, "user", user_message)
+        save_user_message(self.db_session, conversation_id, user_message, inbound_id)
         self.db_session.commit()
 
         # Carrega campos pessoais já conhecidos do influenciador
@@ -124,8 +193,16 @@ class Orchestrator:
                     if val:
                         known[f] = val
 
-        # Extrai novos dados pessoais da mensagem
-        extracted = extract_personal_info(user_message, known)
+        influencer_name = inf.name if inf else None
+        if self.agent_config.config.get("post_deal_mode") == "templates":
+            extracted, response = self._collect_personal_local(
+                conversation_id, user_message, known, influencer_name
+            )
+        else:
+            # Extrai novos dados pessoais da mensagem
+            with node_scope("post_deal"):
+                extracted = extract_personal_info(user_message, known)
+            response = None
 
         # Faz merge dos dados extraídos no registro do influenciador
         if extracted and influencer_id:
@@ -136,10 +213,11 @@ class Orchestrator:
         # Checa o que ainda falta
         missing = [f for f in PERSONAL_INFO_FIELDS if not known.get(f)]
 
-        influencer_name = inf.name if inf else None
-        response = generate_post_deal_response(
-            user_message, known, missing, influencer_name
-        )
+        if response is None:
+            with node_scope("post_deal"):
+                response = generate_post_deal_response(
+                    user_message, known, missing, influencer_name
+                )
 
         # Se todos os dados foram coletados, marca conversa como completa
         if not missing:
@@ -157,26 +235,113 @@ class Orchestrator:
             "approval_required": False,
         }
 
+    def _collect_personal_local(
+        self,
+        conversation_id: int,
+        user_message: str,
+        known: dict,
+        influencer_name: str | None,
+    ) -> tuple[dict, str | None]:
+        """Coleta pós-deal por validadores locais e templates.
+
+        O LLM só é chamado para perguntas livres (uma chamada combinada que
+        extrai e responde) ou quando a mensagem traz um dado que as regras não
+        conseguiram ler. Retorna ``(extracted, response)``.
+        """
+        parsed = parse_personal_info(user_message)
+        extracted = {k: v for k, v in parsed.fields.items() if k not in known}
+        reply = None
+
+        if parsed.is_question:
+            still_missing = [f for f in PERSONAL_INFO_FIELDS if f not in known and f not in extracted]
+            with node_scope("post_deal"):
+                combined = post_deal_turn(user_message, {**known, **extracted}, still_missing, influencer_name)
+            if combined:
+                llm_fields, reply = combined
+                extracted.update({k: v for k, v in llm_fields.items() if k not in known and k not in extracted})
+            metrics.incr("post_deal", path="question")
+        elif parsed.needs_llm(known):
+            with node_scope("post_deal"):
+                llm_fields = clean_personal_fields(extract_personal_info(user_message, known))
+            extracted.update({k: v for k, v in llm_fields.items() if k not in known and k not in extracted})
+            metrics.incr("post_deal", path="llm_extract")
+        else:
+            metrics.incr("post_deal", path="local")
+
+        missing = [f for f in PERSONAL_INFO_FIELDS if f not in known and f not in extracted]
+        if reply is None:
+            from app.db.models import Message
+
+            # Alterna as variações dos templates ao longo da conversa
+            turn = (
+                self.db_session.query(Message)
+                .filter_by(conversation_id=conversation_id)
+                .count()
+            )
+            reply = render_post_deal_reply(
+                influencer_name, list(extracted), missing, parsed.invalid, turn=turn
+            )
+        return extracted, reply
+
     def process_message(
         self,
         thread_id: str,
         conversation_id: int,
         user_message: str,
         influencer_id: int | None = None,
+        inbound_id: int | None = None,
     ) -> dict:
-        """Processa uma mensagem do usuário pelo grafo."""
+        """Processa uma mensagem do usuário pelo grafo.
+
+        Turnos da mesma conversa são serializados pelo lock do ``thread_id``
+        (em processo e entre processos); conversas diferentes não se bloqueiam.
+        Se o LLM não responder dentro do prazo, ou recusar a chamada, o turno
+        termina com ``FALLBACK_RESPONSE`` em vez de propagar o erro. *inbound_id* (mensagem
+        da fila de entrada) torna o retry de um turno que falhou idempotente:
+        a mensagem não é gravada de novo no histórico nem no estado do grafo.
+        """
+        with thread_locks.hold(thread_id), thread_scope(thread_id), router_scope(self.router):
+            try:
+                result = self._process_message(
+                    thread_id, conversation_id, user_message, influencer_id, inbound_id
+                )
+            except LLM_ERRORS as exc:
+                result = self._fallback(conversation_id, exc)
+        self._flush_metrics()
+        return result
+
+    def _fallback(self, conversation_id: int | None, exc: Exception) -> dict:
+        """Desfaz o turno e responde com ``FALLBACK_RESPONSE``."""
+        self.db_session.rollback()
+        metrics.incr("llm_fallback", reason=type(exc).__name__)
+        if conversation_id:
+            save_message(self.db_session, conversation_id, "assistant", FALLBACK_RESPONSE)
+            self.db_session.commit()
+        return {"response": FALLBACK_RESPONSE, "owner": "agent", "approval_required": False}
+
+    def _process_message(
+        self,
+        thread_id: str,
+        conversation_id: int,
+        user_message: str,
+        influencer_id: int | None,
+        inbound_id: int | None = None,
+    ) -> dict:
+        # Saudação ainda em geração: persiste antes da mensagem do influenciador
+        self.finish_greeting(conversation_id)
+
         # Fase pós-deal: coleta dados pessoais ao invés de rodar o grafo
         from app.db.models import Conversation
 
         conv = self.db_session.query(Conversation).get(conversation_id)
         if conv and conv.status == "closed_deal":
             return self._process_post_deal(
-                conversation_id, user_message, influencer_id
+                conversation_id, user_message, influencer_id, inbound_id
             )
 
         # Guardrails
         if check_sensitive_data(user_message):
-            save_message(self.db_session, conversation_id, "user", user_message)
+            save_user_message(self.db_session, conversation_id, user_message, inbound_id)
             save_message(
                 self.db_session, conversation_id, "assistant", SENSITIVE_RESPONSE
             )
@@ -189,7 +354,7 @@ class Orchestrator:
 
         handoff = check_human_handoff(user_message)
 
-        save_message(self.db_session, conversation_id, "user", user_message)
+        save_user_message(self.db_session, conversation_id, user_message, inbound_id)
         self.db_session.commit()
 
         if handoff:
@@ -239,7 +404,13 @@ class Orchestrator:
             "approval_required": False,
             "qualification_complete": False,
             "deal_accepted": False,
-            "messages": [HumanMessage(content=user_message)],
+            # Id fixo por mensagem da fila: no retry, add_messages substitui em vez de repetir
+            "messages": [
+                HumanMessage(
+                    content=user_message,
+                    id=f"inbound-{inbound_id}" if inbound_id is not None else None,
+                )
+            ],
             "current_node": "",
             "conversation_history": history,
             "influencer_id": influencer_id,
@@ -274,7 +445,7 @@ class Orchestrator:
                     break
 
         if not response:
-            response = "Desculpe, não consegui processar sua mensagem. Pode repetir?"
+            response = FALLBACK_RESPONSE
 
         save_message(self.db_session, conversation_id, "assistant", response)
         self.db_session.commit()
@@ -288,11 +459,28 @@ class Orchestrator:
     def handle_approval(
         self, thread_id: str, decision: dict, conversation_id: int | None = None
     ) -> dict:
-        """Retoma o grafo após interrupção de aprovação."""
+        """Retoma o grafo após interrupção de aprovação (sob o lock da conversa).
+
+        Contraproposta ou recusa voltam ao ``negotiate``, que chama o LLM: sem
+        resposta, o turno termina com ``FALLBACK_RESPONSE`` como em
+        ``process_message``.
+        """
+        with thread_locks.hold(thread_id):
+            try:
+                result = self._handle_approval(thread_id, decision, conversation_id)
+            except LLM_ERRORS as exc:
+                result = self._fallback(conversation_id, exc)
+        self._flush_metrics()
+        return result
+
+    def _handle_approval(
+        self, thread_id: str, decision: dict, conversation_id: int | None
+    ) -> dict:
         from langgraph.types import Command
 
         config = {"configurable": {"thread_id": thread_id}}
-        result = self.graph.invoke(Command(resume=decision), config)
+        with thread_scope(thread_id):
+            result = self.graph.invoke(Command(resume=decision), config)
 
         # Persiste deal(s) se aprovação levou ao fechamento
         if result.get("deal_to_save") and conversation_id:
@@ -324,4 +512,5 @@ class Orchestrator:
     def close(self):
         """Libera recursos."""
         self.db_session.close()
-        self._checkpointer_ctx.__exit__(None, None, None)
+        if self._owns_resources:
+            self.resources.close()
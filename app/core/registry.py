@@ -28,7 +28,29 @@ class AgentRegistry:
                     "para uma agência de marketing de influenciadores. "
                     "Negocia contratos de forma justa usando dados de mercado."
                 ),
-                config={"default_cpm_brl": 40.0},
+                config={
+                    "default_cpm_brl": 40.0,
+                    # "single_call": extração + resposta numa chamada; "two_call": fallback
+                    "qualify_mode": "single_call",
+                    # aceite explícito ("fechado") pula o LLM em negotiate
+                    "intent_fast_path": True,
+                    # pós-deal por validadores locais + templates; LLM só se falharem
+                    "post_deal_mode": "templates",
+                    # prazo/retries/hedging por nó; o default vem de LLM_* (app/core/resilience.py)
+                    "llm_policies": {"negotiate": {"hedge": True}},
+                    # negotiate encadeado por previous_response_id (guarda as respostas
+                    # no provedor, store=True); desligado = reenvia o histórico inteiro
+                    "response_chaining": False,
+                    # "local": faixa/aprovação pré-calculadas no contexto, fora do loop de tools
+                    "pure_tools": "local",
+                    # rodadas de tools por turno antes de forçar a resposta em texto
+                    "max_tool_rounds": 2,
+                    # modelo/limites por tipo de chamada ou nó; o default vem de OPENAI_MODEL
+                    "model_routing": {
+                        "extract_fields": {"model": "gpt-4.1-nano", "max_output_tokens": 512},
+                        "extract_personal": {"model": "gpt-4.1-nano", "max_output_tokens": 512},
+                    },
+                },
             )
         )
 
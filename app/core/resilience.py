@@ -0,0 +1,223 @@
+"""Política de chamadas LLM: prazos por nó, retries com jitter e hedging.
+
+Cada nó do grafo roda dentro de ``policy_scope``: um prazo total para todas
+as chamadas LLM do nó. Dentro dele, ``call_with_policy`` faz cada tentativa
+com timeout próprio (nunca além do prazo), repete erros transitórios
+(timeout, conexão, 429, 5xx) com backoff exponencial e jitter e, com
+``hedge`` ligado, dispara uma segunda requisição igual quando a primeira
+passa do p95 observado para aquela chamada — vale a que responder primeiro.
+
+O SDK síncrono não cancela uma requisição em andamento: a perdedora do
+hedge é abandonada (resultado descartado) e termina pelo próprio timeout.
+
+Estourado o prazo, ou esgotados os retries, sobe ``LlmUnavailable`` — o
+orquestrador responde com a mensagem de fallback em vez de derrubar o turno.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass, fields, replace
+from functools import wraps
+
+from dotenv import load_dotenv
+
+from app.core.metrics import current_node, metrics, percentile
+
+load_dotenv()
+
+
+class LlmUnavailable(RuntimeError):
+    """Chamada LLM sem resposta utilizável (retries esgotados ou prazo estourado)."""
+
+
+class LlmDeadlineExceeded(LlmUnavailable, TimeoutError):
+    """O prazo do nó acabou antes de uma resposta."""
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    deadline_s: float = float(os.getenv("LLM_DEADLINE_S", "45"))
+    attempt_timeout_s: float = float(os.getenv("LLM_ATTEMPT_TIMEOUT_S", "20"))
+    max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    backoff_base_s: float = 0.5
+    backoff_max_s: float = 4.0
+    hedge: bool = os.getenv("LLM_HEDGE", "").lower() in ("1", "true", "yes")
+    # Amostras mínimas antes de confiar no p95 para disparar o hedge
+    hedge_min_samples: int = 20
+
+    def backoff(self, attempt: int, rng=random) -> float:
+        """Espera antes da tentativa ``attempt + 1`` (jitter completo)."""
+        return rng.uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2**attempt))
+
+
+DEFAULT_POLICY = CallPolicy()
+
+_POLICY_FIELDS = {f.name for f in fields(CallPolicy)}
+
+
+def build_policies(settings: dict | None) -> dict[str, CallPolicy]:
+    """Políticas por nó a partir de ``config["llm_policies"]`` do agente.
+
+    ``{"default": {...}, "negotiate": {"hedge": True}}`` — cada nó herda do
+    ``default``, que herda dos valores de ambiente.
+    """
+    settings = settings or {}
+    unknown = {k for overrides in settings.values() for k in overrides} - _POLICY_FIELDS
+    if unknown:
+        raise ValueError(f"campos de política desconhecidos: {', '.join(sorted(unknown))}")
+    default = replace(DEFAULT_POLICY, **settings.get("default", {}))
+    policies = {"default": default}
+    for node, overrides in settings.items():
+        if node != "default":
+            policies[node] = replace(default, **overrides)
+    return policies
+
+
+# (política, instante monotônico do prazo) do nó em execução
+_active: ContextVar[tuple[CallPolicy, float] | None] = ContextVar("llm_policy", default=None)
+
+
+@contextmanager
+def policy_scope(policy: CallPolicy):
+    """Aplica *policy* às chamadas LLM do bloco, com prazo contado a partir de agora."""
+    token = _active.set((policy, time.monotonic() + policy.deadline_s))
+    try:
+        yield
+    finally:
+        _active.reset(token)
+
+
+def with_policy(policy: CallPolicy, fn):
+    """Envolve um nó do LangGraph em ``policy_scope``."""
+
+    @wraps(fn)
+    def wrapper(state):
+        with policy_scope(policy):
+            return fn(state)
+
+    return wrapper
+
+
+class LatencyTracker:
+    """Janela das latências recentes por chamada, para o limiar do hedge."""
+
+    def __init__(self, window: int = 200):
+        self._window = window
+        self._samples: dict[tuple, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: tuple, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self._window)).append(seconds)
+
+    def p95(self, key: tuple, min_samples: int = 1) -> float | None:
+        with self._lock:
+            samples = list(self._samples.get(key, ()))
+        if len(samples) < min_samples:
+            return None
+        return percentile(samples, 95)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+latencies = LatencyTracker()
+
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Timeout, falha de conexão, 408/409/429 e 5xx valem nova tentativa."""
+    import openai
+
+    if isinstance(exc, (TimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+    return False
+
+
+def _submit(fn, timeout: float):
+    ctx = copy_context()
+    return _hedge_executor.submit(ctx.run, fn, timeout)
+
+
+def _hedged(fn, timeout: float, hedge_after: float, labels: dict):
+    """Primeira tentativa; passado *hedge_after* sem resposta, dispara a segunda."""
+    primary = _submit(fn, timeout)
+    done, _ = wait([primary], timeout=hedge_after)
+    if done:
+        return primary.result()
+
+    remaining = max(0.0, timeout - hedge_after)
+    backup = _submit(fn, remaining)
+    metrics.incr("llm_hedges", **labels)
+    pending = {primary, backup}
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=remaining + 0.1, return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            if future.exception() is None:
+                for loser in pending:
+                    loser.cancel()  # só tem efeito se ainda não começou
+                metrics.incr("llm_hedge_wins", winner="hedge" if future is backup else "primary", **labels)
+                return future.result()
+            error = future.exception()
+    raise error or TimeoutError("tempo esgotado na chamada LLM")
+
+
+def call_with_policy(fn, call: str, policy: CallPolicy | None = None, sleep=time.sleep):
+    """Executa ``fn(timeout)`` sob a política do nó atual.
+
+    *fn* recebe o timeout da tentativa em segundos (repassado ao SDK).
+    """
+    active = _active.get()
+    if policy is None:
+        policy = active[0] if active else DEFAULT_POLICY
+    now = time.monotonic()
+    deadline = active[1] if active else now + policy.deadline_s
+    node = current_node()
+    labels = {"node": node or "-", "call": call}
+    key = (node, call)
+
+    for attempt in range(policy.max_retries + 1):
+        budget = deadline - time.monotonic()
+        if budget <= 0:
+            metrics.incr("llm_deadline_exceeded", **labels)
+            raise LlmDeadlineExceeded(f"prazo de {policy.deadline_s:.0f}s esgotado em {call}")
+        timeout = min(policy.attempt_timeout_s, budget)
+        hedge_after = latencies.p95(key, policy.hedge_min_samples) if policy.hedge else None
+
+        start = time.monotonic()
+        try:
+            if hedge_after is not None and hedge_after < timeout:
+                result = _hedged(fn, timeout, hedge_after, labels)
+            else:
+                result = fn(timeout)
+        except Exception as exc:
+            if not is_retryable(exc):
+                # 4xx, auth etc.: sobe como veio (o orquestrador responde com fallback)
+                metrics.incr("llm_errors", reason=type(exc).__name__, **labels)
+                raise
+            if attempt == policy.max_retries:
+                metrics.incr("llm_retries_exhausted", **labels)
+                raise LlmUnavailable(f"{call}: {type(exc).__name__}: {exc}") from exc
+            delay = policy.backoff(attempt)
+            if time.monotonic() + delay >= deadline:
+                metrics.incr("llm_deadline_exceeded", **labels)
+                raise LlmDeadlineExceeded(f"prazo esgotado em {call} após {attempt + 1} tentativas") from exc
+            metrics.incr("llm_retries", reason=type(exc).__name__, **labels)
+            sleep(delay)
+            continue
+
+        latencies.record(key, time.monotonic() - start)
+        return result
@@ -0,0 +1,122 @@
+"""Recursos pesados compartilhados entre orquestradores de um mesmo processo.
+
+Um ``Orchestrator`` avulso roda ``init_db``, compila o grafo e abre o próprio
+checkpointer. Em serviço, ``load_resources`` faz isso uma vez — e aquece os
+dados de benchmark e o cliente LLM — e ``OrchestratorPool`` distribui
+orquestradores leves (uma sessão de banco cada) que reutilizam tudo.
+"""
+
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from dotenv import load_dotenv
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+from app.agents.negotiator import build_graph, get_client
+from app.core.checkpoints import open_checkpointer
+from app.core.registry import AgentConfig, registry
+from app.db.session import SessionLocal, init_db
+
+load_dotenv()
+
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", "data/checkpoints.sqlite")
+
+
+@dataclass
+class SharedResources:
+    """Grafo compilado, checkpointer e fábrica de sessões de um agente."""
+
+    agent_config: AgentConfig
+    checkpointer: BaseCheckpointSaver
+    graph: object
+    session_factory: object = SessionLocal
+    _checkpointer_ctx: object = field(default=None, repr=False)
+
+    def close(self) -> None:
+        if self._checkpointer_ctx is not None:
+            self._checkpointer_ctx.__exit__(None, None, None)
+            self._checkpointer_ctx = None
+
+
+def _warm_benchmarks(session_factory) -> int:
+    """Lê a tabela de deals uma vez para aquecer o cache de páginas do SQLite."""
+    from sqlalchemy import func, select
+
+    from app.db.models import Deal
+
+    session = session_factory()
+    try:
+        return session.execute(select(func.count(Deal.id), func.avg(Deal.cpm_brl))).one()[0]
+    finally:
+        session.close()
+
+
+def load_resources(agent_id: str = "negotiator", warm: bool = True) -> SharedResources:
+    """Checa o schema, compila o grafo e abre o checkpointer (uma vez por processo)."""
+    init_db()
+    agent_config = registry.get(agent_id)
+    if not agent_config:
+        raise ValueError(f"Agent '{agent_id}' not found in registry")
+
+    Path(CHECKPOINT_DB).parent.mkdir(parents=True, exist_ok=True)
+    # SqliteSaver serializa o acesso à conexão com um lock: seguro entre threads
+    ctx = open_checkpointer(CHECKPOINT_DB)
+    checkpointer = ctx.__enter__()
+    graph = build_graph(checkpointer=checkpointer, agent_config=agent_config)
+    if warm:
+        _warm_benchmarks(SessionLocal)
+        get_client()
+    return SharedResources(
+        agent_config=agent_config,
+        checkpointer=checkpointer,
+        graph=graph,
+        _checkpointer_ctx=ctx,
+    )
+
+
+class OrchestratorPool:
+    """Pool de orquestradores pré-inicializados sobre os mesmos ``SharedResources``."""
+
+    def __init__(self, resources: SharedResources, size: int = 4):
+        from app.core.orchestrator import Orchestrator
+
+        self.resources = resources
+        self.size = size
+        self._idle: queue.Queue = queue.Queue()
+        self._all = [Orchestrator(resources=resources) for _ in range(size)]
+        for orch in self._all:
+            self._idle.put(orch)
+        self._closed = threading.Event()
+
+    @contextmanager
+    def lease(self, timeout: float | None = None):
+        """Empresta um orquestrador exclusivo durante o bloco.
+
+        Em caso de erro a sessão é revertida antes de voltar ao pool.
+        """
+        try:
+            orch = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("nenhum orquestrador livre no pool") from None
+        try:
+            yield orch
+        except BaseException:
+            orch.db_session.rollback()
+            raise
+        finally:
+            self._idle.put(orch)
+
+    def available(self) -> int:
+        return self._idle.qsize()
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        for orch in self._all:
+            orch.close()
+        self.resources.close()
@@ -0,0 +1,92 @@
+"""Roteamento de modelo por nó ou tipo de chamada LLM.
+
+``config["model_routing"]`` do agente define modelo, ``max_output_tokens`` e
+``reasoning`` (modelos de raciocínio) por tipo de chamada (ex:
+``extract_fields``) ou por nó (ex: ``negotiate``); a chamada tem prioridade
+sobre o nó, que herda do ``default``. Sem configuração vale ``OPENAI_MODEL``.
+
+O negociador monta o ``ModelRouter`` ao compilar o grafo e cada nó roda
+dentro de ``router_scope``; chamadas fora do grafo (saudação, pós-deal) usam
+o router do orquestrador.
+"""
+
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, fields, replace
+from functools import wraps
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    model: str = DEFAULT_MODEL
+    max_output_tokens: int | None = None
+    # ex: {"effort": "minimal"} — só para modelos de raciocínio
+    reasoning: dict | None = None
+
+    def request_kwargs(self) -> dict:
+        """Parâmetros extras de ``responses.create`` definidos na rota."""
+        kwargs = {}
+        if self.max_output_tokens:
+            kwargs["max_output_tokens"] = self.max_output_tokens
+        if self.reasoning:
+            kwargs["reasoning"] = dict(self.reasoning)
+        return kwargs
+
+
+_ROUTE_FIELDS = {f.name for f in fields(ModelRoute)}
+
+
+class ModelRouter:
+    """Resolve a rota de cada chamada: tipo de chamada > nó > default."""
+
+    def __init__(self, settings: dict | None = None):
+        settings = settings or {}
+        unknown = {k for overrides in settings.values() for k in overrides} - _ROUTE_FIELDS
+        if unknown:
+            raise ValueError(f"campos de rota desconhecidos: {', '.join(sorted(unknown))}")
+        self.default = replace(ModelRoute(), **settings.get("default", {}))
+        self._routes = {
+            key: replace(self.default, **overrides)
+            for key, overrides in settings.items()
+            if key != "default"
+        }
+
+    def route(self, node: str | None, call: str | None) -> ModelRoute:
+        return self._routes.get(call) or self._routes.get(node) or self.default
+
+
+default_router = ModelRouter()
+
+_router: ContextVar[ModelRouter | None] = ContextVar("model_router", default=None)
+
+
+def current_router() -> ModelRouter:
+    return _router.get() or default_router
+
+
+@contextmanager
+def router_scope(router: ModelRouter):
+    """Aplica *router* às chamadas LLM feitas dentro do bloco."""
+    token = _router.set(router)
+    try:
+        yield
+    finally:
+        _router.reset(token)
+
+
+def with_router(router: ModelRouter, fn):
+    """Envolve um nó do LangGraph em ``router_scope``."""
+
+    @wraps(fn)
+    def wrapper(state):
+        with router_scope(router):
+            return fn(state)
+
+    return wrapper
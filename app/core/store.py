@@ -1,10 +1,15 @@
 """Operações CRUD para dados de negócio."""
 
-import uuid
+import heapq
+from datetime import datetime
+from itertools import islice
 
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import Session
 
 from app.db.models import Agent, Conversation, Deal, Influencer, Message, Offer
+from app.db.shards import data_shards, execute_on, new_thread_id, shard_count, shard_for
+from app.tools.retrieval import bump_benchmark_generation
 
 
 def get_conversation_messages(
@@ -65,7 +70,8 @@ def get_or_create_influencer(session: Session, phone: str) -> Influencer:
 def create_conversation(
     session: Session, agent: Agent, influencer: Influencer
 ) -> Conversation:
-    thread_id = str(uuid.uuid4())
+    # Com shards, o thread_id cai no mesmo shard do telefone
+    thread_id = new_thread_id(influencer.phone, shard_count(session))
     conv = Conversation(
         thread_id=thread_id,
         agent_id=agent.id,
@@ -79,24 +85,55 @@ def create_conversation(
 
 
 def get_active_conversation(
-    session: Session, agent_id: int, influencer_id: int
+    session: Session, agent_id: int, influencer_id: int, phone: str | None = None
 ) -> Conversation | None:
-    return (
-        session.query(Conversation)
+    """Conversa ativa do influenciador; com shards, *phone* leva a consulta a um shard só."""
+    stmt = (
+        select(Conversation)
         .filter_by(agent_id=agent_id, influencer_id=influencer_id, status="active")
-        .first()
+        .limit(1)
     )
+    shard = None
+    if phone and shard_count(session) > 1:
+        # As conversas de um telefone moram no shard dele
+        shard = shard_for(phone, shard_count(session))
+    return execute_on(session, stmt, shard).scalars().first()
 
 
 def save_message(
-    session: Session, conversation_id: int, role: str, content: str
+    session: Session,
+    conversation_id: int,
+    role: str,
+    content: str,
+    inbound_id: int | None = None,
 ) -> Message:
-    msg = Message(conversation_id=conversation_id, role=role, content=content)
+    msg = Message(
+        conversation_id=conversation_id, role=role, content=content, inbound_id=inbound_id
+    )
     session.add(msg)
     session.flush()
     return msg
 
 
+def save_user_message(
+    session: Session, conversation_id: int, content: str, inbound_id: int | None = None
+) -> bool:
+    """Grava a mensagem do influenciador; com *inbound_id*, só uma vez por mensagem da fila.
+
+    Retorna False se a mensagem já estava gravada (retry de um turno que falhou).
+    """
+    if inbound_id is not None:
+        saved = session.scalar(
+            select(Message.id).where(
+                Message.conversation_id == conversation_id, Message.inbound_id == inbound_id
+            )
+        )
+        if saved is not None:
+            return False
+    save_message(session, conversation_id, "user", content, inbound_id)
+    return True
+
+
 def save_offer(
     session: Session,
     conversation_id: int,
@@ -119,8 +156,187 @@ def save_offer(
     return offer
 
 
-def list_conversations(session: Session) -> list[Conversation]:
-    return session.query(Conversation).order_by(Conversation.created_at.desc()).all()
+def encode_cursor(created_at: datetime, conversation_id: int) -> str:
+    """Cursor de paginação: posição da última conversa listada."""
+    return f"{created_at.isoformat()}_{conversation_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    created_at, _, conversation_id = cursor.rpartition("_")
+    return datetime.fromisoformat(created_at), int(conversation_id)
+
+
+def _page_filters(page, status, owner, since, until, after):
+    """Filtros e keyset da listagem de conversas (comuns aos dois caminhos)."""
+    if status:
+        page = page.where(Conversation.status == status)
+    if owner:
+        page = page.where(Conversation.owner == owner)
+    if since:
+        page = page.where(Conversation.created_at >= since)
+    if until:
+        page = page.where(Conversation.created_at < until)
+    if after:
+        page = page.where(
+            tuple_(Conversation.created_at, Conversation.id) < tuple_(*decode_cursor(after))
+        )
+    return page
+
+
+def iter_conversation_summaries(
+    session: Session,
+    *,
+    status: str | None = None,
+    owner: str | None = None,
+    phone: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    after: str | None = None,
+    limit: int | None = 50,
+    batch_size: int = 500,
+):
+    """Conversas da mais recente para a mais antiga, com agregados, em streaming.
+
+    Uma única query: a página é recortada primeiro (filtros + keyset em
+    ``(created_at, id)``) e só então agrupada com ``messages`` (total e última
+    atividade) e com o valor dos deals (subquery correlacionada por
+    ``thread_id``, que usa o índice de ``deals``). Para a próxima página,
+    passe em *after* o ``cursor`` da última linha recebida. Com ``limit=None`` percorre tudo, em
+    lotes de *batch_size* linhas (``yield_per``). Com shards, ver
+    ``_iter_sharded_summaries``.
+    """
+    shards = data_shards(session, Conversation.__tablename__)
+    if shards != [None]:
+        yield from _iter_sharded_summaries(
+            session, shards, status, owner, phone, since, until, after, limit, batch_size
+        )
+        return
+
+    # 1) Página de conversas: filtros + keyset, resolvidos pelo índice de created_at
+    page = (
+        select(
+            Conversation.id,
+            Conversation.thread_id,
+            Conversation.status,
+            Conversation.owner,
+            Conversation.created_at,
+            Influencer.phone,
+            Influencer.name,
+        )
+        .join(Influencer, Influencer.id == Conversation.influencer_id)
+        .order_by(Conversation.created_at.desc(), Conversation.id.desc())
+    )
+    page = _page_filters(page, status, owner, since, until, after)
+    if phone:
+        page = page.where(Influencer.phone == phone)
+    if limit is not None:
+        page = page.limit(limit)
+    page = page.subquery()
+
+    # 2) Agregados só das conversas da página, na mesma query
+    deal_value = (
+        select(func.sum(Deal.final_price_brl))
+        .where(Deal.thread_id == page.c.thread_id)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(
+            page,
+            func.count(Message.id).label("messages"),
+            func.max(Message.created_at).label("last_message_at"),
+            deal_value.label("deal_value_brl"),
+        )
+        .outerjoin(Message, Message.conversation_id == page.c.id)
+        .group_by(*page.c)
+        .order_by(page.c.created_at.desc(), page.c.id.desc())
+    )
+
+    result = session.execute(stmt.execution_options(yield_per=batch_size))
+    for row in result:
+        item = dict(row._mapping)
+        item["cursor"] = encode_cursor(row.created_at, row.id)
+        yield item
+
+
+def _iter_sharded_summaries(session, shards, status, owner, phone, since, until, after, limit, batch_size):
+    """Scatter-gather da listagem: uma query por shard, intercaladas pelo keyset.
+
+    Cada shard devolve a sua página já agregada com ``messages``, na mesma
+    ordem ``(created_at, id)``; as páginas são intercaladas (ids são globais,
+    o cursor vale para todos os shards) e os dados do catálogo — telefone e
+    nome do influenciador, valor dos deals — entram em lote a cada
+    *batch_size* linhas.
+    """
+    influencer_id = None
+    if phone:
+        influencer_id = session.scalar(select(Influencer.id).where(Influencer.phone == phone))
+        if influencer_id is None:
+            return
+        # As conversas de um telefone moram no shard dele
+        shards = [shard_for(phone, shard_count(session))]
+
+    page = select(
+        Conversation.id,
+        Conversation.thread_id,
+        Conversation.status,
+        Conversation.owner,
+        Conversation.created_at,
+        Conversation.influencer_id,
+    ).order_by(Conversation.created_at.desc(), Conversation.id.desc())
+    page = _page_filters(page, status, owner, since, until, after)
+    if influencer_id is not None:
+        page = page.where(Conversation.influencer_id == influencer_id)
+    if limit is not None:
+        page = page.limit(limit)
+    page = page.subquery()
+    stmt = (
+        select(
+            page,
+            func.count(Message.id).label("messages"),
+            func.max(Message.created_at).label("last_message_at"),
+        )
+        .outerjoin(Message, Message.conversation_id == page.c.id)
+        .group_by(*page.c)
+        .order_by(page.c.created_at.desc(), page.c.id.desc())
+        .execution_options(yield_per=batch_size)
+    )
+
+    merged = heapq.merge(
+        *(execute_on(session, stmt, shard) for shard in shards),
+        key=lambda row: (row.created_at, row.id),
+        reverse=True,
+    )
+    rows = islice(merged, limit)
+    while batch := list(islice(rows, batch_size)):
+        influencers = {
+            r.id: r
+            for r in session.execute(
+                select(Influencer.id, Influencer.phone, Influencer.name)
+                .where(Influencer.id.in_({row.influencer_id for row in batch}))
+            )
+        }
+        deals = dict(
+            session.execute(
+                select(Deal.thread_id, func.sum(Deal.final_price_brl))
+                .where(Deal.thread_id.in_([row.thread_id for row in batch]))
+                .group_by(Deal.thread_id)
+            ).all()
+        )
+        for row in batch:
+            influencer = influencers.get(row.influencer_id)
+            yield {
+                "id": row.id,
+                "thread_id": row.thread_id,
+                "status": row.status,
+                "owner": row.owner,
+                "created_at": row.created_at,
+                "phone": influencer.phone if influencer else None,
+                "name": influencer.name if influencer else None,
+                "messages": row.messages,
+                "last_message_at": row.last_message_at,
+                "deal_value_brl": deals.get(row.thread_id),
+                "cursor": encode_cursor(row.created_at, row.id),
+            }
 
 
 def update_conversation_owner(
@@ -144,9 +360,11 @@ def save_deal(session: Session, deal_data: dict) -> Deal:
         avg_views=deal_data.get("avg_views", 0),
         final_price_brl=deal_data.get("final_price_brl", 0.0),
         cpm_brl=deal_data.get("cpm_brl", 0.0),
+        thread_id=deal_data.get("thread_id"),
     )
     session.add(deal)
     session.flush()
+    bump_benchmark_generation(session)
     return deal
 
 
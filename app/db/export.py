@@ -0,0 +1,234 @@
+"""Exportação em streaming das tabelas de negócio para CSV ou Parquet.
+
+Cada lote é lido numa transação curta, por keyset em ``(marca d'água, id)``,
+e gravado antes do próximo — a memória fica constante e a leitura nunca
+segura o SQLite por toda a exportação (o writer do agente continua livre).
+Com ``DB_SHARDS`` > 1 cada shard é lido pelo seu keyset e os lotes são
+intercalados na ordem global.
+Exportações incrementais guardam a última posição de cada tabela em
+``_watermarks.json`` no diretório de saída e só trazem linhas novas.
+
+Parquet requer o extra opcional ``parquet`` (``pip install -e ".[parquet]"``).
+"""
+
+import csv
+import heapq
+import json
+import os
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, select, tuple_
+
+from app.db.models import Conversation, Deal, Message, Offer
+from app.db.session import SessionLocal
+from app.db.shards import data_shards, execute_on
+
+# Tabela → coluna de marca d'água. Deals usam o id: ``closed_at`` é data de
+# negócio e chega retroativa pelo import/gerador, ficando atrás da marca.
+# Offers não têm data e também usam o id.
+EXPORT_TABLES = {
+    "deals": (Deal, "id"),
+    "conversations": (Conversation, "created_at"),
+    "messages": (Message, "created_at"),
+    "offers": (Offer, "id"),
+}
+
+WATERMARK_FILE = "_watermarks.json"
+
+
+def _arrow_schema(table):
+    import pyarrow as pa
+
+    fields = []
+    for column in table.columns:
+        if isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+class _CsvSink:
+    def __init__(self, path: Path, columns: list[str]):
+        self._fh = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._fh)
+        self._writer.writerow(columns)
+
+    def write(self, rows: list[tuple]) -> None:
+        self._writer.writerows(
+            [None if v is None else v.isoformat() if isinstance(v, datetime) else v for v in row]
+            for row in rows
+        )
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class _ParquetSink:
+    def __init__(self, path: Path, table):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise RuntimeError(
+                'Exportar em Parquet requer pyarrow: pip install -e ".[parquet]"'
+            ) from exc
+        self._pa = pa
+        self._schema = _arrow_schema(table)
+        self._writer = pq.ParquetWriter(str(path), self._schema)
+
+    def write(self, rows: list[tuple]) -> None:
+        columns = list(zip(*rows))
+        batch = self._pa.RecordBatch.from_arrays(
+            [self._pa.array(col, type=f.type) for col, f in zip(columns, self._schema)],
+            schema=self._schema,
+        )
+        self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def load_watermarks(out_dir: str) -> dict:
+    path = Path(out_dir) / WATERMARK_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save_watermarks(out_dir: str, watermarks: dict) -> None:
+    path = Path(out_dir) / WATERMARK_FILE
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(watermarks, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _decode_mark(mark: dict | None, is_datetime: bool) -> tuple | None:
+    if not mark:
+        return None
+    value = mark["value"]
+    if is_datetime and value is not None:
+        value = datetime.fromisoformat(value)
+    return value, mark["id"]
+
+
+def _encode_mark(value, row_id: int) -> dict:
+    return {"value": value.isoformat() if isinstance(value, datetime) else value, "id": row_id}
+
+
+def _scan(base, mark_col, id_col, position, chunk_size, session_factory, shard):
+    """Linhas de um shard por keyset, um lote (e uma sessão) por vez."""
+    while True:
+        stmt = base
+        if position is not None:
+            stmt = stmt.where(tuple_(mark_col, id_col) > tuple_(*position))
+        # Transação curta por lote: não segura o banco entre lotes
+        session = session_factory()
+        try:
+            rows = execute_on(session, stmt, shard).all()
+        finally:
+            session.close()
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1]._mapping
+        position = (last[mark_col.name], last["id"])
+
+
+def export_table(
+    name: str,
+    out_dir: str,
+    fmt: str = "csv",
+    chunk_size: int = 10_000,
+    since=None,
+    session_factory=SessionLocal,
+    on_chunk=None,
+) -> tuple[int, dict | None]:
+    """Exporta as linhas de *name* posteriores à marca *since* ``(valor, id)``.
+
+    Grava ``<out_dir>/<name>/part-<timestamp>.<fmt>`` e retorna
+    ``(linhas, nova marca)``. Sem linhas novas, nenhum arquivo é criado.
+    """
+    model, mark_attr = EXPORT_TABLES[name]
+    table = model.__table__
+    mark_col = table.c[mark_attr]
+    id_col = table.c.id
+    columns = [c.name for c in table.columns]
+
+    session = session_factory()
+    try:
+        shards = data_shards(session, table.name)
+    finally:
+        session.close()
+    base = select(table).order_by(mark_col, id_col).limit(chunk_size)
+    streams = [
+        _scan(base, mark_col, id_col, since, chunk_size, session_factory, shard) for shard in shards
+    ]
+    # Com shards, intercala os keysets de cada um na ordem global (ids são únicos)
+    rows = streams[0] if len(streams) == 1 else heapq.merge(
+        *streams, key=lambda r: (r._mapping[mark_attr], r.id)
+    )
+    position = since
+    sink = None
+    path = None
+    total = 0
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            if sink is None:
+                stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+                path = Path(out_dir) / name / f"part-{stamp}.{fmt}"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                sink = _CsvSink(path, columns) if fmt == "csv" else _ParquetSink(path, table)
+            sink.write([tuple(r) for r in chunk])
+            total += len(chunk)
+            last = chunk[-1]._mapping
+            position = (last[mark_attr], last["id"])
+            if on_chunk:
+                on_chunk(name, total)
+    finally:
+        if sink is not None:
+            sink.close()
+    return total, _encode_mark(*position) if position is not None else None
+
+
+def export_tables(
+    out_dir: str,
+    tables: list[str] | None = None,
+    fmt: str = "csv",
+    chunk_size: int = 10_000,
+    incremental: bool = False,
+    session_factory=SessionLocal,
+    on_chunk=None,
+) -> dict[str, int]:
+    """Exporta várias tabelas; no modo incremental parte das marcas salvas."""
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"formato não suportado: {fmt}")
+    tables = tables or list(EXPORT_TABLES)
+    unknown = set(tables) - set(EXPORT_TABLES)
+    if unknown:
+        raise ValueError(f"tabelas desconhecidas: {', '.join(sorted(unknown))}")
+
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    watermarks = load_watermarks(out_dir)
+    counts = {}
+    for name in tables:
+        model, mark_attr = EXPORT_TABLES[name]
+        is_datetime = isinstance(model.__table__.c[mark_attr].type, DateTime)
+        since = _decode_mark(watermarks.get(name), is_datetime) if incremental else None
+        counts[name], mark = export_table(
+            name, out_dir, fmt, chunk_size, since, session_factory, on_chunk
+        )
+        if mark is not None:
+            watermarks[name] = mark
+            # Salva a cada tabela: uma falha adiante não re-exporta as anteriores
+            _save_watermarks(out_dir, watermarks)
+    return counts
@@ -0,0 +1,215 @@
+"""Importação em lote de deals históricos (CSV ou JSONL).
+
+Cada linha é validada e normalizada (plataforma, nicho e entregável em
+minúsculas, CPM calculado como no seed) e ganha um ``source_key`` — hash dos
+campos normalizados — usado para descartar duplicatas, tanto dentro do
+arquivo quanto contra o que já está no banco. As linhas entram em lotes via
+``insert`` com ``executemany``, um commit por lote: memória e transações
+limitadas mesmo com milhões de linhas.
+"""
+
+import csv
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import insert, select
+
+from app.db.models import Deal
+from app.db.session import SessionLocal
+from app.tools.retrieval import bump_benchmark_generation
+
+REQUIRED_FIELDS = ("influencer_name", "platform", "niche", "deliverable_type", "avg_views", "final_price_brl")
+
+# Quantos erros de validação guardar para o relatório
+MAX_REPORTED_ERRORS = 20
+
+
+class InvalidDeal(ValueError):
+    """Linha de deal que não passou na validação."""
+
+
+@dataclass
+class ImportReport:
+    read: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    elapsed_s: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.read / self.elapsed_s if self.elapsed_s else 0.0
+
+
+def deal_cpm(price: float, views: int, qty: int) -> float:
+    """CPM do deal: preço por mil views entregues."""
+    return round((price / (views * qty)) * 1000, 2)
+
+
+def deal_key(row: dict) -> str:
+    """Hash estável dos campos normalizados que identificam um deal."""
+    closed_at = row.get("closed_at")
+    parts = [
+        row["influencer_name"].casefold(),
+        row["platform"],
+        row["niche"],
+        row["deliverable_type"],
+        str(row["qty"]),
+        str(row["avg_views"]),
+        f"{row['final_price_brl']:.2f}",
+        closed_at.isoformat() if closed_at else "",
+    ]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _to_int(value, name: str) -> int:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise InvalidDeal(f"{name} inválido: {value!r}") from None
+    if not number.is_integer() or number <= 0:
+        raise InvalidDeal(f"{name} deve ser inteiro positivo: {value!r}")
+    return int(number)
+
+
+def _to_datetime(value) -> datetime | None:
+    if value in (None, ""):
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise InvalidDeal(f"closed_at inválido: {value!r}") from None
+    if parsed.tzinfo is not None:
+        # O banco guarda datas ingênuas em UTC
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def normalize_deal(raw: dict) -> dict:
+    """Valida uma linha bruta e devolve o mapeamento pronto para inserir."""
+    missing = [f for f in REQUIRED_FIELDS if raw.get(f) in (None, "")]
+    if missing:
+        raise InvalidDeal(f"campos obrigatórios ausentes: {', '.join(missing)}")
+
+    try:
+        price = round(float(raw["final_price_brl"]), 2)
+    except (TypeError, ValueError):
+        raise InvalidDeal(f"final_price_brl inválido: {raw['final_price_brl']!r}") from None
+    if price <= 0:
+        raise InvalidDeal(f"final_price_brl deve ser positivo: {raw['final_price_brl']!r}")
+
+    views = _to_int(raw["avg_views"], "avg_views")
+    qty = _to_int(raw.get("qty") or 1, "qty")
+    phone = str(raw.get("influencer_phone") or "").strip() or None
+    row = {
+        "influencer_name": " ".join(str(raw["influencer_name"]).split()),
+        "influencer_phone": phone,
+        "platform": str(raw["platform"]).strip().lower(),
+        "niche": str(raw["niche"]).strip().lower(),
+        "deliverable_type": str(raw["deliverable_type"]).strip().lower(),
+        "qty": qty,
+        "avg_views": views,
+        "final_price_brl": price,
+        "cpm_brl": deal_cpm(price, views, qty),
+        "closed_at": _to_datetime(raw.get("closed_at")),
+        "thread_id": str(raw.get("thread_id") or "").strip() or None,
+    }
+    row["source_key"] = deal_key(row)
+    if row["closed_at"] is None:
+        row["closed_at"] = datetime.now(timezone.utc).replace(tzinfo=None)
+    return row
+
+
+def read_rows(path: str, fmt: str | None = None):
+    """Itera ``(linha, dict)`` de um CSV com cabeçalho ou de um JSONL."""
+    fmt = fmt or ("jsonl" if Path(path).suffix in (".jsonl", ".ndjson") else "csv")
+    with open(path, newline="", encoding="utf-8") as fh:
+        if fmt == "csv":
+            # Linha 1 é o cabeçalho
+            for line_no, raw in enumerate(csv.DictReader(fh), start=2):
+                yield line_no, raw
+        elif fmt == "jsonl":
+            for line_no, line in enumerate(fh, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    raw = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield line_no, InvalidDeal(f"JSON inválido: {exc.msg}")
+                    continue
+                yield line_no, raw if isinstance(raw, dict) else InvalidDeal("linha não é um objeto")
+        else:
+            raise ValueError(f"formato não suportado: {fmt}")
+
+
+def _flush(session_factory, chunk: dict[str, dict], report: ImportReport) -> None:
+    if not chunk:
+        return
+    session = session_factory()
+    try:
+        existing = set(
+            session.execute(
+                select(Deal.source_key).where(Deal.source_key.in_(list(chunk)))
+            ).scalars()
+        )
+        rows = [row for key, row in chunk.items() if key not in existing]
+        if rows:
+            # insert do Core: o bulk do ORM não roda sobre a ShardedSession
+            session.execute(insert(Deal.__table__), rows)
+            bump_benchmark_generation(session)
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    report.inserted += len(rows)
+    report.duplicates += len(existing)
+    chunk.clear()
+
+
+def import_deals(
+    path: str,
+    fmt: str | None = None,
+    chunk_size: int = 5_000,
+    session_factory=SessionLocal,
+    on_progress=None,
+) -> ImportReport:
+    """Importa deals de *path* em lotes de *chunk_size*, um commit por lote.
+
+    Linhas inválidas são contadas e puladas (as primeiras vão para
+    ``report.errors``); duplicatas são descartadas pelo ``source_key``.
+    """
+    report = ImportReport()
+    chunk: dict[str, dict] = {}
+    started = time.perf_counter()
+    for line_no, raw in read_rows(path, fmt):
+        report.read += 1
+        try:
+            if isinstance(raw, Exception):
+                raise raw
+            row = normalize_deal(raw)
+        except InvalidDeal as exc:
+            report.invalid += 1
+            if len(report.errors) < MAX_REPORTED_ERRORS:
+                report.errors.append(f"linha {line_no}: {exc}")
+            continue
+
+        if row["source_key"] in chunk:
+            report.duplicates += 1
+            continue
+        chunk[row["source_key"]] = row
+        if len(chunk) >= chunk_size:
+            _flush(session_factory, chunk, report)
+            report.elapsed_s = time.perf_counter() - started
+            if on_progress:
+                on_progress(report)
+
+    _flush(session_factory, chunk, report)
+    report.elapsed_s = time.perf_counter() - started
+    return report
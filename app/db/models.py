@@ -52,6 +52,8 @@ class Influencer(Base):
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    # Ids globais entre shards (faixa semeada em app/db/shards.py)
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     thread_id: Mapped[str] = mapped_column(String(128), unique=True, nullable=False)
@@ -64,7 +66,7 @@ class Conversation(Base):
     )
     owner: Mapped[str] = mapped_column(String(16), nullable=False, default="agent")
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=lambda: datetime.now(timezone.utc)
+        DateTime, default=lambda: datetime.now(timezone.utc), index=True
     )
 
     agent: Mapped["Agent"] = relationship(back_populates="conversations")
@@ -75,13 +77,18 @@ class Conversation(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    # Ids globais entre shards (faixa semeada em app/db/shards.py)
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     conversation_id: Mapped[int] = mapped_column(
-        ForeignKey("conversations.id"), nullable=False
+        ForeignKey("conversations.id"), nullable=False, index=True
     )
     role: Mapped[str] = mapped_column(String(16), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
+    # Mensagem da fila de entrada (app/core/inbox.py) que originou a linha:
+    # um retry não grava a mesma mensagem de novo
+    inbound_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime, default=lambda: datetime.now(timezone.utc)
     )
@@ -102,13 +109,20 @@ class Deal(Base):
     avg_views: Mapped[int] = mapped_column(Integer, nullable=False)
     final_price_brl: Mapped[float] = mapped_column(Float, nullable=False)
     cpm_brl: Mapped[float] = mapped_column(Float, nullable=False)
+    thread_id: Mapped[str | None] = mapped_column(String(128), nullable=True, index=True)
     closed_at: Mapped[datetime] = mapped_column(
-        DateTime, default=lambda: datetime.now(timezone.utc)
+        DateTime, default=lambda: datetime.now(timezone.utc), index=True
+    )
+    # Hash dos campos normalizados (app/db/importer.py): deduplica importações
+    source_key: Mapped[str | None] = mapped_column(
+        String(40), nullable=True, unique=True, index=True
     )
 
 
 class Offer(Base):
     __tablename__ = "offers"
+    # Ids globais entre shards (faixa semeada em app/db/shards.py)
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     conversation_id: Mapped[int] = mapped_column(
@@ -121,3 +135,30 @@ class Offer(Base):
     accepted: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
 
     conversation: Mapped["Conversation"] = relationship(back_populates="offers")
+
+
+class LlmCall(Base):
+    __tablename__ = "llm_calls"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    thread_id: Mapped[str | None] = mapped_column(String(128), nullable=True, index=True)
+    node: Mapped[str] = mapped_column(String(64), nullable=False)
+    call_type: Mapped[str] = mapped_column(String(64), nullable=False)
+    model: Mapped[str] = mapped_column(String(64), nullable=False)
+    input_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cached_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    output_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duration_ms: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    cost_usd: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=lambda: datetime.now(timezone.utc)
+    )
+
+
+class Counter(Base):
+    """Contadores globais (ex: geração dos benchmarks, para invalidar caches)."""
+
+    __tablename__ = "counters"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
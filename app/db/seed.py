@@ -2,6 +2,7 @@
 
 from datetime import datetime, timedelta, timezone
 
+from app.db.importer import deal_cpm
 from app.db.models import Deal
 from app.db.session import SessionLocal, init_db
 
@@ -40,7 +41,6 @@ def seed() -> int:
 
         now = datetime.now(timezone.utc)
         for i, (name, plat, niche, dtype, qty, views, price) in enumerate(SEED_DEALS):
-            cpm = (price / (views * qty)) * 1000
             deal = Deal(
                 influencer_name=name,
                 platform=plat,
@@ -49,7 +49,7 @@ def seed() -> int:
                 qty=qty,
                 avg_views=views,
                 final_price_brl=price,
-                cpm_brl=round(cpm, 2),
+                cpm_brl=deal_cpm(price, views, qty),
                 closed_at=now - timedelta(days=30 - i),
             )
             session.add(deal)
@@ -1,37 +1,128 @@
-"""Engine + fábrica de sessões."""
+"""Engine + fábrica de sessões.
+
+Com ``DB_SHARDS`` > 1 o engine de ``DATABASE_URL`` é o catálogo e as
+conversas ficam nos engines de ``get_shard_engines`` (ver ``app/db/shards.py``);
+``SessionLocal`` passa a abrir ``ShardedSession``.
+"""
 
 import os
+import threading
 from pathlib import Path
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 
 from app.db.models import Base
+from app.db.shards import DB_SHARDS, catalog_tables, init_shard, shard_path, sharded_sessionmaker
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///data/negotiator.db")
 
 
-def _ensure_data_dir() -> None:
+def _ensure_data_dir(url: str = DATABASE_URL) -> None:
     """Create data/ directory if it doesn't exist (for SQLite)."""
-    if DATABASE_URL.startswith("sqlite:///"):
-        db_path = DATABASE_URL.replace("sqlite:///", "")
+    if url.startswith("sqlite:///"):
+        db_path = url.replace("sqlite:///", "")
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
 
 
+_engine = None
+_shard_engines = None
+_engine_lock = threading.Lock()
+
+
 def get_engine():
-    _ensure_data_dir()
-    return create_engine(DATABASE_URL, echo=False)
+    """Engine do processo, criado na primeira chamada (não no import)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _ensure_data_dir()
+                _engine = create_engine(DATABASE_URL, echo=False)
+    return _engine
+
+
+def get_shard_engines() -> list:
+    """Engines dos shards de conversa (``DATABASE_URL`` com ``.shard<i>``); vazio sem sharding."""
+    global _shard_engines
+    if _shard_engines is None:
+        with _engine_lock:
+            if _shard_engines is None:
+                urls = [shard_path(DATABASE_URL, i) for i in range(DB_SHARDS)] if DB_SHARDS > 1 else []
+                for url in urls:
+                    _ensure_data_dir(url)
+                _shard_engines = [create_engine(url, echo=False) for url in urls]
+    return _shard_engines
+
+
+def _add_missing_columns(engine, tables=None) -> None:
+    """Adiciona colunas anuláveis novas a tabelas já existentes.
+
+    ``create_all`` só cria tabelas que não existem; bancos criados por versões
+    anteriores ganham aqui as colunas opcionais adicionadas depois.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in tables or Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(
+                    text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}')
+                )
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
 
 
 def init_db(engine=None):
-    """Create all tables."""
+    """Create all tables (com shards: catálogo aqui, conversas em cada shard)."""
+    if engine is None and get_shard_engines():
+        engine = get_engine()
+        _add_missing_columns(engine, catalog_tables())
+        Base.metadata.create_all(engine, tables=catalog_tables())
+        for index, shard in enumerate(get_shard_engines()):
+            _add_missing_columns(shard)
+            init_shard(shard, index)
+        return engine
     engine = engine or get_engine()
+    _add_missing_columns(engine)
     Base.metadata.create_all(engine)
     return engine
 
 
-engine = get_engine()
-SessionLocal = sessionmaker(bind=engine)
+class _LazySessionmaker:
+    """``sessionmaker`` que só cria o engine ao abrir a primeira sessão."""
+
+    def __init__(self):
+        self._factory = None
+
+    def _get(self) -> sessionmaker:
+        if self._factory is None:
+            shards = get_shard_engines()
+            self._factory = (
+                sharded_sessionmaker(get_engine(), shards) if shards else sessionmaker(bind=get_engine())
+            )
+        return self._factory
+
+    def __call__(self, **kwargs):
+        return self._get()(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+
+SessionLocal = _LazySessionmaker()
+
+
+def __getattr__(name):
+    # ``from app.db.session import engine`` continua funcionando, sob demanda
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,210 @@
+"""Sharding das conversas entre vários arquivos SQLite.
+
+Com ``DB_SHARDS=N`` (N > 1) as tabelas de conversa (``conversations``,
+``messages``, ``offers``) e os checkpoints ficam em N arquivos; o catálogo
+(``agents``, ``influencers``, ``deals``, ``llm_calls``, ``counters``) segue no
+banco de ``DATABASE_URL``. Cada arquivo tem o seu writer: conversas em shards
+diferentes gravam em paralelo.
+
+Roteamento:
+
+- conversas pelo hash estável do ``thread_id``; ``new_thread_id`` sorteia ids
+  que caem no shard do telefone do influenciador, então telefone e
+  ``thread_id`` levam ao mesmo arquivo;
+- ids de ``conversations``, ``messages`` e ``offers`` são globais: o shard
+  ``i`` numera a partir de ``i * ID_SPAN`` (``AUTOINCREMENT`` semeado em
+  ``init_shard``) e ``shard_of_id`` recupera o shard do próprio id;
+- consultas com ``thread_id``, ``id`` ou ``conversation_id`` (igualdade ou
+  ``IN``) vão só aos shards desses valores; as demais vão a todos
+  (scatter-gather) e os resultados são concatenados.
+
+Com ``DB_SHARDS=1`` (padrão) nada disso entra: um banco só, como antes.
+"""
+
+import hashlib
+import os
+import uuid
+from pathlib import PurePosixPath
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BindParameter, BooleanClauseList
+from sqlalchemy.sql.selectable import AliasedReturnsRows
+from sqlalchemy.sql.util import find_tables
+
+from app.db.models import Base, Conversation, Message, Offer
+
+load_dotenv()
+
+DB_SHARDS = int(os.getenv("DB_SHARDS", "1"))
+
+CATALOG = "catalog"
+SHARD_TABLES = frozenset({"conversations", "messages", "offers"})
+# Faixa de ids de cada shard (2^40 linhas por tabela e shard)
+ID_SPAN = 1 << 40
+
+
+def shard_for(key: str, shards: int) -> int:
+    """Shard de *key* (``thread_id`` ou telefone): hash estável entre processos."""
+    if shards <= 1:
+        return 0
+    digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+def shard_of_id(row_id: int) -> int:
+    """Shard de uma linha de ``conversations``/``messages``/``offers`` pelo id."""
+    return int(row_id) // ID_SPAN
+
+
+def new_thread_id(phone: str, shards: int) -> str:
+    """``thread_id`` novo no mesmo shard de *phone* (~N sorteios)."""
+    target = shard_for(phone, shards)
+    while True:
+        thread_id = str(uuid.uuid4())
+        if shard_for(thread_id, shards) == target:
+            return thread_id
+
+
+def shard_path(path: str, index: int) -> str:
+    """Arquivo (ou URL SQLite) do shard *index*: ``x.db`` → ``x.shard<index>.db``."""
+    head, sep, name = path.rpartition("/")
+    suffix = PurePosixPath(name).suffix
+    stem = name[: len(name) - len(suffix)] if suffix else name
+    return f"{head}{sep}{stem}.shard{index}{suffix}"
+
+
+def catalog_tables() -> list:
+    return [t for t in Base.metadata.sorted_tables if t.name not in SHARD_TABLES]
+
+
+def shard_tables() -> list:
+    return [t for t in Base.metadata.sorted_tables if t.name in SHARD_TABLES]
+
+
+def init_shard(engine, index: int) -> None:
+    """Cria as tabelas de conversa no shard e semeia a faixa de ids dele."""
+    Base.metadata.create_all(engine, tables=shard_tables())
+    with engine.begin() as conn:
+        for table in shard_tables():
+            conn.execute(
+                text(
+                    "INSERT INTO sqlite_sequence (name, seq) SELECT :name, :seq "
+                    "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"
+                ),
+                {"name": table.name, "seq": index * ID_SPAN},
+            )
+
+
+# ── Roteamento das consultas ─────────────────────────────────────
+
+
+def _conjuncts(clause):
+    """Termos de um WHERE ligados por AND (um OR não restringe o shard)."""
+    if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_:
+        for c in clause.clauses:
+            yield from _conjuncts(c)
+    elif clause is not None:
+        yield clause
+
+
+def _where_terms(statement):
+    yield from _conjuncts(getattr(statement, "whereclause", None))
+    # count() e afins embrulham a consulta numa subquery
+    for from_ in getattr(statement, "get_final_froms", lambda: [])():
+        inner = from_
+        while isinstance(inner, AliasedReturnsRows):
+            inner = inner.element
+        if inner is not from_:
+            yield from _where_terms(inner)
+
+
+def _routed_shards(statement, params, shards: int) -> set | None:
+    """Shards das comparações por ``thread_id``/``id``/``conversation_id``; ``None`` se não há."""
+    params = params if isinstance(params, dict) else {}
+    found = None
+    for term in _where_terms(statement):
+        left, op, right = (getattr(term, a, None) for a in ("left", "operator", "right"))
+        table = getattr(left, "table", None)
+        if getattr(table, "name", None) not in SHARD_TABLES or not isinstance(right, BindParameter):
+            continue
+        # Carga por identidade e lazy loads passam o valor nos parâmetros
+        value = params.get(right.key, right.effective_value)
+        if value is None or op not in (operators.eq, operators.in_op):
+            continue
+        values = list(value) if op is operators.in_op else [value]
+        if left.name == "thread_id":
+            route = {shard_for(v, shards) for v in values}
+        elif left.name in ("id", "conversation_id"):
+            route = {shard_of_id(v) for v in values}
+        else:
+            continue
+        found = route if found is None else found & route
+    return found
+
+
+def sharded_sessionmaker(catalog_engine, shard_engines: list, **kwargs) -> sessionmaker:
+    """``sessionmaker`` de ``ShardedSession`` sobre o catálogo e os shards.
+
+    ``session.info["shards"]`` guarda o número de shards (ver ``shard_count``).
+    """
+    shards = len(shard_engines)
+    data = list(range(shards))
+
+    def shard_chooser(mapper, instance, clause=None):
+        if mapper.local_table.name not in SHARD_TABLES:
+            return CATALOG
+        if isinstance(instance, Conversation):
+            return shard_for(instance.thread_id, shards)
+        if isinstance(instance, (Message, Offer)):
+            return shard_of_id(instance.conversation_id)
+        raise ValueError(f"sem shard para {mapper.class_.__name__}")
+
+    def identity_chooser(mapper, primary_key, **kw):
+        if mapper.local_table.name not in SHARD_TABLES:
+            return [CATALOG]
+        return [shard_of_id(primary_key[0])]
+
+    def execute_chooser(context):
+        names = {t.name for t in find_tables(context.statement, include_crud=True)}
+        if not names & SHARD_TABLES:
+            return [CATALOG]
+        parent = context.lazy_loaded_from
+        if parent is not None and parent.identity_token in data:
+            return [parent.identity_token]
+        routed = _routed_shards(context.statement, context.parameters, shards)
+        return data if routed is None else sorted(routed)
+
+    return sessionmaker(
+        class_=ShardedSession,
+        shards={CATALOG: catalog_engine, **dict(enumerate(shard_engines))},
+        shard_chooser=shard_chooser,
+        identity_chooser=identity_chooser,
+        execute_chooser=execute_chooser,
+        info={"shards": shards},
+        **kwargs,
+    )
+
+
+def shard_count(session) -> int:
+    """Número de shards de conversa da sessão (1 sem sharding)."""
+    return session.info.get("shards", 1)
+
+
+def data_shards(session, table: str) -> list:
+    """Shards onde *table* mora: todos os de conversa, o catálogo ou ``[None]`` sem sharding."""
+    if shard_count(session) <= 1 or not isinstance(session, ShardedSession):
+        return [None]
+    if table not in SHARD_TABLES:
+        return [CATALOG]
+    return list(range(shard_count(session)))
+
+
+def execute_on(session, statement, shard):
+    """Executa *statement* num shard só (``None``: roteamento normal da sessão)."""
+    if shard is None:
+        return session.execute(statement)
+    return session.execute(statement, bind_arguments={"shard_id": shard})
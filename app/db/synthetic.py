@@ -0,0 +1,92 @@
+"""Gerador de deals sintéticos em escala, calibrado pelos ``SEED_DEALS``.
+
+As distribuições vêm do seed: mistura de plataforma × entregável e de nicho
+pelas frequências observadas, quantidade pela mesma mistura, views e CPM
+log-normais com média e desvio dos logs do seed, ``closed_at`` uniforme na
+janela pedida. Cada lote é gerado coluna a coluna e inserido com um único
+``executemany`` — usado para medir como o retrieval escala com o histórico.
+"""
+
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from statistics import fmean, pstdev
+
+from sqlalchemy import insert
+
+from app.db.importer import deal_cpm
+from app.db.models import Deal
+from app.db.seed import SEED_DEALS
+from app.db.session import SessionLocal
+from app.tools.retrieval import bump_benchmark_generation
+
+
+class SeedProfile:
+    """Parâmetros das distribuições extraídos dos ``SEED_DEALS``."""
+
+    def __init__(self, deals=SEED_DEALS):
+        self.channels = [(plat, dtype) for _, plat, _, dtype, *_ in deals]
+        self.niches = [niche for _, _, niche, *_ in deals]
+        self.qtys = [qty for *_, qty, _, _ in deals]
+        log_views = [math.log(views) for *_, views, _ in deals]
+        log_cpms = [math.log(price / (views * qty) * 1000) for *_, qty, views, price in deals]
+        self.views_mu, self.views_sigma = fmean(log_views), pstdev(log_views)
+        self.cpm_mu, self.cpm_sigma = fmean(log_cpms), pstdev(log_cpms)
+
+
+def generate_rows(n: int, rng: random.Random, profile: SeedProfile, now: datetime,
+                  days: int = 730, start: int = 0) -> list[dict]:
+    """Gera *n* mapeamentos de deal prontos para ``insert``."""
+    channels = rng.choices(profile.channels, k=n)
+    niches = rng.choices(profile.niches, k=n)
+    qtys = rng.choices(profile.qtys, k=n)
+    views = [max(1_000, round(rng.lognormvariate(profile.views_mu, profile.views_sigma))) for _ in range(n)]
+    cpms = [rng.lognormvariate(profile.cpm_mu, profile.cpm_sigma) for _ in range(n)]
+    offsets = [rng.random() * days * 86_400 for _ in range(n)]
+
+    rows = []
+    for i in range(n):
+        price = round(cpms[i] * views[i] * qtys[i] / 1000, 2)
+        rows.append({
+            "influencer_name": f"Sintético {start + i}",
+            "platform": channels[i][0],
+            "niche": niches[i],
+            "deliverable_type": channels[i][1],
+            "qty": qtys[i],
+            "avg_views": views[i],
+            "final_price_brl": price,
+            "cpm_brl": deal_cpm(price, views[i], qtys[i]),
+            "closed_at": now - timedelta(seconds=offsets[i]),
+        })
+    return rows
+
+
+def generate_deals(
+    n: int,
+    seed: int | None = None,
+    chunk_size: int = 50_000,
+    days: int = 730,
+    session_factory=SessionLocal,
+    on_progress=None,
+) -> float:
+    """Insere *n* deals sintéticos em lotes; retorna o tempo total em segundos."""
+    rng = random.Random(seed)
+    profile = SeedProfile()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    stmt = insert(Deal.__table__)
+    started = time.perf_counter()
+    done = 0
+    while done < n:
+        rows = generate_rows(min(chunk_size, n - done), rng, profile, now, days, start=done)
+        session = session_factory()
+        try:
+            session.execute(stmt, rows)
+            bump_benchmark_generation(session)
+            session.commit()
+        finally:
+            session.close()
+        done += len(rows)
+        if on_progress:
+            on_progress(done, time.perf_counter() - started)
+    return time.perf_counter() - started
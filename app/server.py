@@ -0,0 +1,231 @@
+"""Serviço HTTP JSON: ``python -m app serve``.
+
+Endpoints:
+
+- ``GET  /healthz`` — processo vivo;
+- ``GET  /readyz`` — 200 só depois do preload (schema, benchmarks, grafo);
+- ``POST /conversations`` ``{"phone", "new"?}`` — inicia ou retoma conversa;
+- ``POST /conversations/<id>/greeting`` ``{"user_message"?}`` — saudação inicial;
+- ``POST /conversations/<id>/messages`` ``{"message"}`` — processa um turno;
+- ``POST /conversations/<id>/approval`` ``{"approved", "counter_offer_brl"?}`` — decisão do operador.
+
+As requisições são atendidas por um ``OrchestratorPool``: orquestradores
+pré-inicializados que compartilham o grafo compilado, o checkpointer, o
+engine e o cliente LLM.
+"""
+
+import json
+import re
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.core.resources import OrchestratorPool, load_resources
+
+# Tempo máximo esperando um orquestrador livre antes de responder 503
+LEASE_TIMEOUT_S = 30.0
+
+
+class NotReady(RuntimeError):
+    """O serviço ainda está no preload."""
+
+
+class BadRequest(ValueError):
+    """Corpo da requisição inválido (400); outros ``ValueError`` são erro interno."""
+
+
+class NotFound(LookupError):
+    """Conversa inexistente (404); outros ``LookupError`` são erro interno."""
+
+
+class NegotiatorService:
+    """Regras dos endpoints, independentes do transporte HTTP."""
+
+    def __init__(self, agent_id: str = "negotiator", pool_size: int = 4):
+        self.agent_id = agent_id
+        self.pool_size = pool_size
+        self.pool: OrchestratorPool | None = None
+        self.ready = threading.Event()
+        self.error: str | None = None
+
+    def preload(self) -> None:
+        """Carrega recursos compartilhados e aquece o pool; sinaliza prontidão no fim."""
+        try:
+            resources = load_resources(self.agent_id)
+            self.pool = OrchestratorPool(resources, size=self.pool_size)
+        except Exception as exc:
+            self.error = f"{type(exc).__name__}: {exc}"
+            raise
+        self.ready.set()
+
+    def _lease(self):
+        if not self.ready.is_set():
+            raise NotReady(self.error or "preload em andamento")
+        return self.pool.lease(timeout=LEASE_TIMEOUT_S)
+
+    @staticmethod
+    def _conversation(orch, conversation_id: int):
+        from app.db.models import Conversation
+
+        conv = orch.db_session.get(Conversation, conversation_id)
+        if conv is None:
+            raise NotFound(f"conversa {conversation_id} não encontrada")
+        return conv
+
+    def start_conversation(self, body: dict) -> dict:
+        phone = body.get("phone")
+        if not phone:
+            raise BadRequest("campo 'phone' é obrigatório")
+        with self._lease() as orch:
+            result = orch.start_or_resume_conversation(phone, new=bool(body.get("new")))
+            return {
+                "conversation_id": result["conversation"].id,
+                "thread_id": result["thread_id"],
+                "influencer_id": result["influencer"].id,
+                "influencer_name": result["influencer"].name,
+                "resumed": result["resumed"],
+            }
+
+    def greeting(self, conversation_id: int, body: dict) -> dict:
+        with self._lease() as orch:
+            conv = self._conversation(orch, conversation_id)
+            text = orch.send_greeting(
+                conv.id,
+                user_message=body.get("user_message"),
+                influencer_name=conv.influencer.name,
+            )
+            return {"response": text}
+
+    def message(self, conversation_id: int, body: dict) -> dict:
+        text = body.get("message")
+        if not text or not str(text).strip():
+            raise BadRequest("campo 'message' é obrigatório")
+        with self._lease() as orch:
+            conv = self._conversation(orch, conversation_id)
+            return orch.process_message(
+                conv.thread_id, conv.id, str(text), influencer_id=conv.influencer_id
+            )
+
+    def approval(self, conversation_id: int, body: dict) -> dict:
+        if "approved" not in body:
+            raise BadRequest("campo 'approved' é obrigatório")
+        decision = {"approved": bool(body["approved"])}
+        if body.get("counter_offer_brl") is not None:
+            try:
+                decision["counter_offer_brl"] = float(body["counter_offer_brl"])
+            except (TypeError, ValueError):
+                raise BadRequest("campo 'counter_offer_brl' deve ser numérico") from None
+        with self._lease() as orch:
+            conv = self._conversation(orch, conversation_id)
+            return orch.handle_approval(conv.thread_id, decision, conversation_id=conv.id)
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+
+
+_ROUTES = [
+    ("POST", re.compile(r"^/conversations$"), "start_conversation"),
+    ("POST", re.compile(r"^/conversations/(\d+)/greeting$"), "greeting"),
+    ("POST", re.compile(r"^/conversations/(\d+)/messages$"), "message"),
+    ("POST", re.compile(r"^/conversations/(\d+)/approval$"), "approval"),
+]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service: NegotiatorService
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: HTTPStatus, payload: dict) -> None:
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._send(HTTPStatus.OK, {"status": "ok"})
+        elif self.path == "/readyz":
+            if self.service.ready.is_set():
+                self._send(HTTPStatus.OK, {"status": "ready", "pool_available": self.service.pool.available()})
+            else:
+                self._send(
+                    HTTPStatus.SERVICE_UNAVAILABLE,
+                    {"status": "error" if self.service.error else "loading", "error": self.service.error},
+                )
+        else:
+            self._send(HTTPStatus.NOT_FOUND, {"error": "rota não encontrada"})
+
+    def do_POST(self):
+        for method, pattern, name in _ROUTES:
+            match = pattern.match(self.path)
+            if method == "POST" and match:
+                break
+        else:
+            self._send(HTTPStatus.NOT_FOUND, {"error": "rota não encontrada"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("corpo deve ser um objeto JSON")
+        except ValueError as exc:
+            self._send(HTTPStatus.BAD_REQUEST, {"error": f"JSON inválido: {exc}"})
+            return
+
+        handler = getattr(self.service, name)
+        args = [int(g) for g in match.groups()] + [body]
+        try:
+            self._send(HTTPStatus.OK, handler(*args))
+        except NotReady as exc:
+            self._send(HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(exc)})
+        except TimeoutError as exc:
+            self._send(HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(exc) or "tempo esgotado"})
+        except NotFound as exc:
+            self._send(HTTPStatus.NOT_FOUND, {"error": str(exc)})
+        except BadRequest as exc:
+            self._send(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+        except Exception as exc:
+            self.log_error("erro em %s: %r", self.path, exc)
+            self._send(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "erro interno"})
+
+
+def make_server(service: NegotiatorService, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    """Cria o servidor HTTP (ainda sem atender) ligado a *service*."""
+    handler = type("NegotiatorHandler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    agent_id: str = "negotiator",
+    pool_size: int = 4,
+    on_ready=None,
+) -> None:
+    """Sobe o servidor, faz o preload em background e atende até Ctrl+C.
+
+    ``/healthz`` responde desde o início; ``/readyz`` e os endpoints de
+    negócio só depois que o preload termina.
+    """
+    service = NegotiatorService(agent_id=agent_id, pool_size=pool_size)
+    server = make_server(service, host, port)
+
+    def preload():
+        service.preload()
+        if on_ready:
+            on_ready(service)
+
+    threading.Thread(target=preload, name="preload", daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,108 @@
+"""Classificador de intenção por regras: aceite ou recusa explícitos de uma proposta."""
+
+import re
+from dataclasses import dataclass
+
+# Confiança mínima para agir sem consultar o LLM
+ACCEPT_THRESHOLD = 0.85
+REJECT_THRESHOLD = 0.85
+
+# Frases que, sozinhas, aceitam a proposta
+STRONG_ACCEPT_PHRASES = (
+    "fechado", "fechou", "fechamos", "aceito", "aceitamos", "combinado", "topo", "topei",
+    "vamos fechar", "bora fechar", "pode fechar", "vamos nesse valor", "negócio fechado",
+    "de acordo",
+)
+
+WEAK_ACCEPT_PHRASES = (
+    "ok", "okay", "pode ser", "tá bom", "ta bom", "está bom", "esta bom", "beleza", "blz",
+    "sim", "perfeito", "show", "claro", "com certeza", "bora", "vamos",
+)
+
+# Enchimento que pode acompanhar o aceite sem mudar o sentido
+FILLER_PHRASES = (
+    "então", "entao", "pra mim", "por mim", "opa", "ótimo", "otimo", "valeu", "obrigado",
+    "obrigada",
+)
+
+
+def _phrase_sequence(phrases: tuple[str, ...]) -> re.Pattern:
+    """Regex que casa um texto composto só por *phrases* separadas por espaço."""
+    alternatives = "|".join(sorted(map(re.escape, phrases), key=len, reverse=True))
+    return re.compile(rf"(?:{alternatives})(?: (?:{alternatives}))*")
+
+
+ACCEPT_ONLY = _phrase_sequence(STRONG_ACCEPT_PHRASES + WEAK_ACCEPT_PHRASES + FILLER_PHRASES)
+
+STRONG_ACCEPT_PATTERNS = re.compile(
+    r"\b(" + "|".join(map(re.escape, STRONG_ACCEPT_PHRASES)) + r")\b"
+)
+
+# Adiamentos: "ok, vou pensar" não é aceite
+DEFER_PATTERNS = re.compile(
+    r"\b(pensar|ver|vejo|aviso|avisar|depois|analisar|recebi|conversar|falo|retorno)\b",
+    re.IGNORECASE,
+)
+
+REJECT_PATTERNS = re.compile(
+    r"\b(n[ãa]o aceito|n[ãa]o d[áa]|n[ãa]o rola|n[ãa]o topo|n[ãa]o fecho|n[ãa]o consigo|"
+    r"n[ãa]o vale|muito baixo|muito pouco|recuso|sem chance|nem pensar|de jeito nenhum)\b",
+    re.IGNORECASE,
+)
+
+NEGATION_PATTERNS = re.compile(r"\b(n[ãa]o|nem|nunca|jamais)\b", re.IGNORECASE)
+
+# Condicionais e pedidos que transformam um "ok" em contraproposta/dúvida
+HEDGE_PATTERNS = re.compile(
+    r"\b(mas|por[ée]m|s[óo] se|desde que|talvez|acho que|ser[áa]|e se|"
+    r"consegue|d[áa] pra|poderia|melhorar|aumentar|subir|antes)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class Intent:
+    label: str  # "accept" | "reject" | "ambiguous"
+    confidence: float
+
+    def is_accept(self) -> bool:
+        return self.label == "accept" and self.confidence >= ACCEPT_THRESHOLD
+
+    def is_reject(self) -> bool:
+        return self.label == "reject" and self.confidence >= REJECT_THRESHOLD
+
+
+def classify_offer_reply(message: str) -> Intent:
+    """Classifica a resposta do influenciador a uma proposta de preço.
+
+    Aceite exige que a mensagem inteira, tirando pontuação, seja composta
+    por frases de aceite e enchimento ("Fechado!", "ok, pode ser"). Números
+    (novo valor), perguntas, condicionais e adiamentos ficam para o LLM.
+    """
+    text = message.strip().lower()
+    if not text:
+        return Intent("ambiguous", 0.0)
+
+    words = re.findall(r"\w+", text)
+    penalty = 0.0
+    if "?" in text:
+        penalty += 0.4
+    if re.search(r"\d", text):
+        penalty += 0.5
+    if HEDGE_PATTERNS.search(text):
+        penalty += 0.4
+    if len(words) > 12:
+        penalty += 0.2
+
+    if REJECT_PATTERNS.search(text):
+        return Intent("reject", round(max(0.95 - penalty, 0.0), 2))
+
+    if NEGATION_PATTERNS.search(text) or DEFER_PATTERNS.search(text):
+        return Intent("ambiguous", 0.3)
+
+    # Aceite só quando a mensagem inteira, sem pontuação, é frase de aceite
+    if penalty or not ACCEPT_ONLY.fullmatch(" ".join(words)):
+        return Intent("ambiguous", 0.0)
+    if STRONG_ACCEPT_PATTERNS.search(text):
+        return Intent("accept", 0.95)
+    return Intent("accept", 0.9)
@@ -0,0 +1,251 @@
+"""Validadores locais e templates para a coleta de dados pessoais pós-deal.
+
+Email, CPF (com dígitos verificadores), endereço (CEP + logradouro) e modelo
+de celular são reconhecidos por regras. O LLM só entra quando a mensagem
+parece conter um dado que as regras não conseguiram interpretar, ou quando
+o influenciador faz uma pergunta livre.
+"""
+
+import re
+from dataclasses import dataclass, field
+
+PERSONAL_INFO_FIELDS = ["email", "cpf", "address", "phone_model"]
+
+EMAIL_PATTERN = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")
+
+CPF_PATTERN = re.compile(r"(?<![\d.])\d{3}\.?\d{3}\.?\d{3}-?\d{2}(?![\d-])")
+
+CEP_PATTERN = re.compile(r"\b\d{5}-?\d{3}\b")
+
+# Logradouro seguido, na mesma linha, de um número
+STREET_PATTERN = re.compile(
+    r"\b(?:rua|r\.|avenida|av\.?|travessa|tv\.|alameda|al\.|estrada|rodovia|"
+    r"pra[çc]a|largo|quadra|qd\.?)\s+[^\n\d]{2,}?\d+[^\n]*",
+    re.IGNORECASE,
+)
+
+PHONE_MODEL_PATTERN = re.compile(
+    r"\b("
+    r"iphone\s*(?:se|x[rs]?|\d{1,2})(?:\s*(?:pro\s*max|pro|plus|mini))?"
+    r"|(?:samsung\s*)?galaxy\s*[a-z]?\d{1,3}(?:\s*(?:ultra|plus|fe))?"
+    r"|samsung\s*[sazm]\d{1,3}(?:\s*(?:ultra|plus|fe))?"
+    r"|(?:xiaomi\s*)?redmi\s*(?:note\s*)?\d{1,2}(?:\s*pro)?"
+    r"|(?:xiaomi\s*)?poco\s*[xfm]\d(?:\s*pro)?"
+    r"|(?:motorola\s*)?moto\s*[ge]\d{1,3}(?:\s*(?:power|plus|play))?"
+    r"|(?:motorola\s*)?edge\s*\d{2}(?:\s*(?:pro|ultra))?"
+    r"|(?:google\s*)?pixel\s*\d{1,2}a?(?:\s*pro)?"
+    r")\b",
+    re.IGNORECASE,
+)
+
+_PHONE_TOKENS = {
+    "iphone": "iPhone",
+    "se": "SE",
+    "xr": "XR",
+    "xs": "XS",
+    "fe": "FE",
+}
+
+# Indícios de que a mensagem traz (ou tenta trazer) cada campo
+FIELD_HINTS = {
+    "email": re.compile(r"@|\be-?mail\b", re.IGNORECASE),
+    "cpf": re.compile(r"\bcpf\b|\b\d{3}\.?\d{3}\.?\d{3}-?\d{2}\b", re.IGNORECASE),
+    "address": re.compile(
+        r"\b(endere[çc]o|rua|avenida|av|cep|bairro|apto|apartamento|condom[íi]nio)\b|\b\d{5}-?\d{3}\b",
+        re.IGNORECASE,
+    ),
+    "phone_model": re.compile(
+        r"\b(celular|aparelho|smartphone|iphone|samsung|galaxy|xiaomi|redmi|poco|"
+        r"motorola|moto|pixel)\b",
+        re.IGNORECASE,
+    ),
+}
+
+FIELD_LABELS = {
+    "email": "seu email",
+    "cpf": "seu CPF",
+    "address": "seu endereço completo (com CEP)",
+    "phone_model": "o modelo do seu celular",
+}
+
+INVALID_MESSAGES = {
+    "email": "O email parece incompleto — pode conferir?",
+    "cpf": "O CPF informado não passou na validação — pode conferir os números?",
+    "address": "Pode me mandar o endereço completo, com rua, número e CEP?",
+}
+
+THANKS_TEMPLATES = [
+    "Recebi aqui{name}, obrigada! ",
+    "Anotado{name}, muito obrigada! ",
+    "Perfeito{name}, já registrei! ",
+]
+
+ASK_TEMPLATES = [
+    "Agora só falta {missing}. Pode me enviar?",
+    "Para finalizar o cadastro, ainda preciso de {missing}.",
+    "Pode me passar {missing}? Assim já deixo tudo pronto para o envio.",
+]
+
+NUDGE_TEMPLATES = [
+    "Sem problemas{name}! ",
+    "Tudo certo{name}! ",
+    "Combinado{name}! ",
+]
+
+DONE_TEMPLATE = (
+    "Perfeito, {name}! Recebi todos os dados. "
+    "Muito obrigada! Em breve entraremos em contato com os próximos passos. "
+    "Tenha um ótimo dia! 😊"
+)
+
+
+@dataclass
+class PersonalInfoParse:
+    """Resultado da leitura local de uma mensagem pós-deal."""
+
+    fields: dict[str, str] = field(default_factory=dict)
+    invalid: list[str] = field(default_factory=list)
+    unresolved: list[str] = field(default_factory=list)
+    is_question: bool = False
+
+    def needs_llm(self, known: dict) -> bool:
+        """True se a mensagem indica um campo ainda desconhecido que as regras não leram."""
+        return any(f not in known for f in self.unresolved)
+
+
+def valid_cpf(value: str) -> bool:
+    """Valida os dois dígitos verificadores do CPF."""
+    digits = re.sub(r"\D", "", value)
+    if len(digits) != 11 or digits == digits[0] * 11:
+        return False
+    for n in (9, 10):
+        total = sum(int(d) * (n + 1 - i) for i, d in enumerate(digits[:n]))
+        if (total * 10) % 11 % 10 != int(digits[n]):
+            return False
+    return True
+
+
+def format_cpf(value: str) -> str:
+    digits = re.sub(r"\D", "", value)
+    return f"{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}"
+
+
+def format_phone_model(raw: str) -> str:
+    """Normaliza o modelo ("iphone 15 pro" → "iPhone 15 Pro", "galaxy s24" → "Galaxy S24")."""
+    tokens = re.findall(r"[a-z]+\d*|\d+[a-z]?", raw.lower())
+    out = []
+    for tok in tokens:
+        if tok in _PHONE_TOKENS:
+            out.append(_PHONE_TOKENS[tok])
+        elif re.fullmatch(r"[a-z]\d+", tok):
+            out.append(tok.upper())
+        else:
+            out.append(tok.capitalize())
+    return " ".join(out)
+
+
+def _extract_address(text: str) -> str | None:
+    street = STREET_PATTERN.search(text)
+    if not street:
+        return None
+    address = re.sub(r"^(meu )?endere[çc]o( é)?\s*:?\s*", "", street.group(0).strip(), flags=re.IGNORECASE)
+    address = address.rstrip(" .;")
+    cep = CEP_PATTERN.search(text)
+    if not cep:
+        return None
+    if cep.group(0) not in address:
+        address = f"{address}, CEP {cep.group(0)}"
+    return address
+
+
+def parse_personal_info(message: str) -> PersonalInfoParse:
+    """Extrai email, CPF, endereço e modelo de celular sem chamar o LLM."""
+    result = PersonalInfoParse(is_question="?" in message)
+
+    email = EMAIL_PATTERN.search(message)
+    if email:
+        result.fields["email"] = email.group(0).lower()
+    # Texto sem o email, para os números do email não virarem CPF/CEP
+    rest = EMAIL_PATTERN.sub(" ", message)
+
+    cpf = CPF_PATTERN.search(rest)
+    if cpf:
+        if valid_cpf(cpf.group(0)):
+            result.fields["cpf"] = format_cpf(cpf.group(0))
+        else:
+            result.invalid.append("cpf")
+
+    address = _extract_address(rest)
+    if address:
+        result.fields["address"] = address
+    elif STREET_PATTERN.search(rest) or CEP_PATTERN.search(rest):
+        # Só rua ou só CEP: pede o endereço completo em vez de adivinhar
+        result.invalid.append("address")
+
+    phone = PHONE_MODEL_PATTERN.search(rest)
+    if phone:
+        result.fields["phone_model"] = format_phone_model(phone.group(0))
+
+    if "@" in rest and "email" not in result.fields:
+        result.invalid.append("email")
+
+    for f, pattern in FIELD_HINTS.items():
+        if f in result.fields or f in result.invalid:
+            continue
+        if pattern.search(message):
+            result.unresolved.append(f)
+    return result
+
+
+def clean_personal_fields(fields: dict) -> dict:
+    """Descarta valores inválidos vindos do LLM e normaliza os válidos."""
+    cleaned = {}
+    for f, value in fields.items():
+        if f not in PERSONAL_INFO_FIELDS or not value or not isinstance(value, str):
+            continue
+        value = value.strip()
+        if f == "email":
+            if not EMAIL_PATTERN.fullmatch(value):
+                continue
+            value = value.lower()
+        elif f == "cpf":
+            if not valid_cpf(value):
+                continue
+            value = format_cpf(value)
+        cleaned[f] = value
+    return cleaned
+
+
+def _join_labels(fields: list[str]) -> str:
+    labels = [FIELD_LABELS.get(f, f) for f in fields]
+    if len(labels) == 1:
+        return labels[0]
+    return ", ".join(labels[:-1]) + " e " + labels[-1]
+
+
+def render_post_deal_reply(
+    name: str | None,
+    received: list[str],
+    missing: list[str],
+    invalid: list[str] | None = None,
+    turn: int = 0,
+) -> str:
+    """Monta a resposta pós-deal a partir de templates, alternando as variações por *turn*."""
+    if not missing:
+        return DONE_TEMPLATE.format(name=name or "você")
+
+    name_part = f", {name}" if name else ""
+    parts = []
+    if received:
+        parts.append(THANKS_TEMPLATES[turn % len(THANKS_TEMPLATES)].format(name=name_part))
+    elif not invalid:
+        parts.append(NUDGE_TEMPLATES[turn % len(NUDGE_TEMPLATES)].format(name=name_part))
+
+    for f in invalid or []:
+        if f in missing:
+            parts.append(INVALID_MESSAGES[f] + " ")
+
+    still_missing = [f for f in missing if f not in (invalid or [])]
+    if still_missing:
+        parts.append(ASK_TEMPLATES[turn % len(ASK_TEMPLATES)].format(missing=_join_labels(still_missing)))
+    return "".join(parts).strip()
@@ -2,11 +2,67 @@
 
 from statistics import median
 
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
 
-from app.db.models import Deal
+from app.db.models import Counter, Deal
 from app.db.session import SessionLocal
 
+BENCHMARK_GENERATION = "benchmark_generation"
+
+# Consultas distintas guardadas por conversa
+MEMO_MAX_ENTRIES = 16
+
+
+def _sample(deal: Deal) -> dict:
+    return {
+        "influencer": deal.influencer_name,
+        "avg_views": deal.avg_views,
+        "price_brl": deal.final_price_brl,
+        "cpm_brl": deal.cpm_brl,
+        "niche": deal.niche,
+    }
+
+
+def _retrieve(session, platform, deliverable_type, avg_views, niche=None, k=5) -> tuple[dict, list[int]]:
+    """Resultado de ``retrieve_benchmarks`` + ids dos deals das amostras."""
+    query = session.query(Deal).filter(
+        Deal.platform == platform.lower(),
+        Deal.deliverable_type == deliverable_type.lower(),
+    )
+
+    if niche:
+        niche_query = query.filter(Deal.niche == niche.lower())
+        if niche_query.count() > 0:
+            query = niche_query
+
+    deals = query.all()
+
+    if not deals:
+        return {
+            "count": 0,
+            "avg_cpm": None,
+            "median_price": None,
+            "min_price": None,
+            "max_price": None,
+            "samples": [],
+        }, []
+
+    deals_sorted = sorted(deals, key=lambda d: abs(d.avg_views - avg_views))
+    top_k = deals_sorted[:k]
+
+    prices = [d.final_price_brl for d in deals]
+    cpms = [d.cpm_brl for d in deals]
+
+    return {
+        "count": len(deals),
+        "avg_cpm": round(sum(cpms) / len(cpms), 2),
+        "median_price": round(median(prices), 2),
+        "min_price": min(prices),
+        "max_price": max(prices),
+        "samples": [_sample(d) for d in top_k],
+    }, [d.id for d in top_k]
+
 
 def retrieve_benchmarks(
     platform: str,
@@ -25,51 +81,125 @@ def retrieve_benchmarks(
         session = SessionLocal()
 
     try:
-        query = session.query(Deal).filter(
-            Deal.platform == platform.lower(),
-            Deal.deliverable_type == deliverable_type.lower(),
-        )
-
-        if niche:
-            niche_query = query.filter(Deal.niche == niche.lower())
-            if niche_query.count() > 0:
-                query = niche_query
-
-        deals = query.all()
-
-        if not deals:
-            return {
-                "count": 0,
-                "avg_cpm": None,
-                "median_price": None,
-                "min_price": None,
-                "max_price": None,
-                "samples": [],
-            }
-
-        deals_sorted = sorted(deals, key=lambda d: abs(d.avg_views - avg_views))
-        top_k = deals_sorted[:k]
-
-        prices = [d.final_price_brl for d in deals]
-        cpms = [d.cpm_brl for d in deals]
+        return _retrieve(session, platform, deliverable_type, avg_views, niche, k)[0]
+    finally:
+        if own_session:
+            session.close()
 
-        return {
-            "count": len(deals),
-            "avg_cpm": round(sum(cpms) / len(cpms), 2),
-            "median_price": round(median(prices), 2),
-            "min_price": min(prices),
-            "max_price": max(prices),
-            "samples": [
-                {
-                    "influencer": d.influencer_name,
-                    "avg_views": d.avg_views,
-                    "price_brl": d.final_price_brl,
-                    "cpm_brl": d.cpm_brl,
-                    "niche": d.niche,
-                }
-                for d in top_k
-            ],
-        }
+
+def load_samples(ids: list[int], session) -> list[dict]:
+    """Amostras dos deals *ids*, na ordem dada (consulta por chave primária)."""
+    if not ids:
+        return []
+    deals = {d.id: d for d in session.execute(select(Deal).where(Deal.id.in_(ids))).scalars()}
+    return [_sample(deals[i]) for i in ids if i in deals]
+
+
+def bump_benchmark_generation(session) -> None:
+    """Invalida memos de benchmarks: chamar na mesma transação que grava deals."""
+    stmt = insert(Counter).values(name=BENCHMARK_GENERATION, value=1)
+    session.execute(
+        stmt.on_conflict_do_update(index_elements=["name"], set_={"value": Counter.value + 1})
+    )
+
+
+def benchmark_generation(session=None) -> int:
+    """Geração atual dos benchmarks (muda sempre que deals são gravados)."""
+    own_session = session is None
+    if own_session:
+        session = SessionLocal()
+    try:
+        value = session.execute(
+            select(Counter.value).where(Counter.name == BENCHMARK_GENERATION)
+        ).scalar()
+        return value or 0
     finally:
         if own_session:
             session.close()
+
+
+def benchmark_args(
+    platform: str,
+    deliverable_type: str,
+    avg_views: int,
+    niche: str | None = None,
+    k: int = 5,
+) -> dict:
+    """Argumentos normalizados de ``retrieve_benchmarks`` (chave do memo)."""
+    return {
+        "platform": platform.strip().lower(),
+        "deliverable_type": deliverable_type.strip().lower(),
+        "avg_views": int(avg_views),
+        "niche": niche.strip().lower() if niche else None,
+        "k": int(k),
+    }
+
+
+class BenchmarkMemo:
+    """Memo de ``retrieve_benchmarks`` de uma conversa, guardado no estado do grafo.
+
+    Vale enquanto a geração dos benchmarks for a mesma com que foi montado;
+    a geração é lida uma vez por instância, na primeira consulta. O estado
+    guarda só as estatísticas e os ids das amostras (nada de listas de
+    amostras no checkpoint): com ``samples=True`` elas voltam do banco por
+    chave primária, uma vez por instância.
+    """
+
+    def __init__(self, data: dict | None = None, max_entries: int = MEMO_MAX_ENTRIES):
+        data = data or {}
+        self.generation = data.get("generation")
+        # Entradas sem ``sample_ids`` são do formato antigo (amostras inteiras)
+        self.entries = {k: v for k, v in (data.get("entries") or {}).items() if "sample_ids" in v}
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._validated = False
+        self._samples: dict[str, list] = {}
+
+    def _validate(self, session) -> None:
+        if self._validated:
+            return
+        current = benchmark_generation(session)
+        if current != self.generation:
+            self.generation = current
+            self.entries = {}
+        self._validated = True
+
+    def get(self, session=None, samples: bool = True, **arguments) -> dict:
+        args = benchmark_args(**arguments)
+        own_session = session is None
+        if own_session:
+            session = SessionLocal()
+        try:
+            return self._get(session, samples, args)
+        finally:
+            if own_session:
+                session.close()
+
+    def _get(self, session, samples: bool, args: dict) -> dict:
+        self._validate(session)
+        key = "|".join(str(args[f]) for f in ("platform", "deliverable_type", "niche", "avg_views", "k"))
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            result, ids = _retrieve(session, **args)
+            self._samples[key] = result.pop("samples")
+            if len(self.entries) >= self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+            entry = self.entries[key] = {**result, "sample_ids": ids}
+
+        stats = {k: v for k, v in entry.items() if k != "sample_ids"}
+        if not samples:
+            return stats
+        if key not in self._samples:
+            self._samples[key] = load_samples(entry["sample_ids"], session)
+        return {**stats, "samples": self._samples[key]}
+
+    @property
+    def changed(self) -> bool:
+        return self.misses > 0
+
+    def to_state(self) -> dict:
+        return {"generation": self.generation, "entries": self.entries}
@@ -0,0 +1,139 @@
+"""Tamanho e custo dos checkpoints: serializador padrão × compacto.
+
+Roda conversas completas com o LLM de ``benchmarks/stub_llm.py`` num
+diretório temporário, lê de volta todos os checkpoints gravados e, para cada
+serializador, mede bytes por checkpoint, ``dumps_typed``/``loads_typed`` e a
+ida e volta pelo ``SqliteSaver`` (``put`` + ``get_tuple``).
+
+    python benchmarks/checkpoint_serde.py
+    python benchmarks/checkpoint_serde.py --conversations 20 --json out.json
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import uuid
+from contextlib import closing
+from pathlib import Path
+from statistics import fmean
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.suite import _setup_env, measure  # noqa: E402
+
+MESSAGES = [
+    "Oi, sou a Maria, faço 2 reels no instagram de fitness, 100k views, prazo 30 dias",
+    "quero 9 mil",
+    "faz 8500?",
+    "fechado",
+]
+
+
+def _record_checkpoints(tmp: str, conversations: int) -> list:
+    """Checkpoints reais (já desserializados) de *conversations* conversas."""
+    from benchmarks.stub_llm import install
+
+    install()
+
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+    from app.core.orchestrator import Orchestrator
+    from app.db.session import init_db
+    from app.db.synthetic import generate_deals
+
+    init_db()
+    generate_deals(2_000, seed=7)
+    orch = Orchestrator()
+    for i in range(conversations):
+        started = orch.start_or_resume_conversation(f"+55119{i:08d}", new=True)
+        for message in MESSAGES:
+            orch.process_message(
+                started["thread_id"], started["conversation"].id, message,
+                influencer_id=started["influencer"].id,
+            )
+    orch.close()
+
+    serde = JsonPlusSerializer()
+    conn = sqlite3.connect(f"{tmp}/checkpoints.sqlite")
+    rows = conn.execute("SELECT type, checkpoint FROM checkpoints").fetchall()
+    conn.close()
+    return [serde.loads_typed((type_, blob)) for type_, blob in rows]
+
+
+def _roundtrip(saver, checkpoints: list):
+    """``put`` + ``get_tuple`` de cada checkpoint numa thread nova."""
+    config = {"configurable": {"thread_id": str(uuid.uuid4()), "checkpoint_ns": ""}}
+
+    def run():
+        nonlocal config
+        for checkpoint in checkpoints:
+            config = saver.put(config, {**checkpoint, "id": str(uuid.uuid4())}, {"step": 1}, {})
+            saver.get_tuple({"configurable": {**config["configurable"], "checkpoint_id": None}})
+
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=5, help="Conversas gravadas como amostra")
+    parser.add_argument("--repeat", type=int, default=7, help="Amostras por medição")
+    parser.add_argument("--json", help="Grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _setup_env(tmp)
+        os.environ["CHECKPOINT_SERDE"] = "default"
+        checkpoints = _record_checkpoints(tmp, args.conversations)
+
+        from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        from app.core.checkpoints import CompactSerializer
+
+        n = len(checkpoints)
+        print(f"{n} checkpoints de {args.conversations} conversas\n")
+        results = {}
+        serdes = {
+            "default": JsonPlusSerializer(),
+            "compact": CompactSerializer(),
+            "compact+zlib": CompactSerializer(compress=True),
+        }
+        for name, serde in serdes.items():
+            encoded = [serde.dumps_typed(c) for c in checkpoints]
+            assert [serde.loads_typed(e) for e in encoded] == checkpoints
+            sizes = [len(blob) for _, blob in encoded]
+            dumps = measure(lambda: [serde.dumps_typed(c) for c in checkpoints], args.repeat)
+            loads = measure(lambda: [serde.loads_typed(e) for e in encoded], args.repeat)
+            with closing(sqlite3.connect(f"{tmp}/{name}.sqlite", check_same_thread=False)) as conn:
+                saver = SqliteSaver(conn, serde=serde)
+                saver.setup()
+                io = measure(_roundtrip(saver, checkpoints), args.repeat, number=1)
+            results[name] = {
+                "bytes_mean": round(fmean(sizes)),
+                "bytes_max": max(sizes),
+                "dumps_us": round(dumps["p50_ms"] / n * 1000, 1),
+                "loads_us": round(loads["p50_ms"] / n * 1000, 1),
+                "put_get_us": round(io["p50_ms"] / n * 1000, 1),
+            }
+            r = results[name]
+            print(
+                f"  {name:<12} {r['bytes_mean']:>7} B/checkpoint (máx {r['bytes_max']:>6})"
+                f"   dumps {r['dumps_us']:>7.1f} µs   loads {r['loads_us']:>7.1f} µs"
+                f"   put+get {r['put_get_us']:>7.1f} µs"
+            )
+
+    print()
+    for name in ("compact", "compact+zlib"):
+        ratio = results["default"]["bytes_mean"] / results[name]["bytes_mean"]
+        print(f"{name}: {ratio:.1f}× menor que o padrão")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"Resultados em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
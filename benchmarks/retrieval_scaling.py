@@ -0,0 +1,95 @@
+"""Latência do retrieval conforme o histórico de deals cresce.
+
+Cria um SQLite temporário, vai inserindo deals sintéticos até cada tamanho
+pedido e, em cada patamar, mede ``retrieve_benchmarks``,
+``retrieve_benchmarks_node`` (mono e multi-plataforma) e ``price_node``.
+
+    python benchmarks/retrieval_scaling.py --sizes 10000,100000,1000000
+    python benchmarks/retrieval_scaling.py --sizes 10000 --repeat 50 --json out.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from statistics import median, quantiles
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+STATE = {
+    "platform": "instagram",
+    "deliverable_type": "reel",
+    "niche": "fitness",
+    "avg_views": 80_000,
+    "qty": 1,
+}
+MULTI_STATE = {
+    **STATE,
+    "platform_details": {
+        "instagram": {"avg_views": 80_000, "qty": 1},
+        "tiktok": {"avg_views": 50_000, "qty": 1},
+    },
+}
+
+
+def _measure(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    p95 = quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0]
+    return {"p50_ms": round(median(samples), 3), "p95_ms": round(p95, 3)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Tamanhos da tabela, separados por vírgula")
+    parser.add_argument("--repeat", type=int, default=20, help="Repetições por medição")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Grava os resultados neste arquivo")
+    args = parser.parse_args()
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+
+    tmp = tempfile.TemporaryDirectory()
+    # Precisa valer antes do primeiro import de app.db.session
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}/bench.db"
+
+    from app.agents.negotiator import price_node, retrieve_benchmarks_node
+    from app.db.session import init_db
+    from app.db.synthetic import generate_deals
+    from app.tools.retrieval import retrieve_benchmarks
+
+    init_db()
+    priced_state = {**STATE, **retrieve_benchmarks_node(STATE)}
+    cases = {
+        "retrieve_benchmarks": lambda: retrieve_benchmarks("instagram", "reel", 80_000, niche="fitness"),
+        "retrieve_benchmarks_node": lambda: retrieve_benchmarks_node(STATE),
+        "retrieve_benchmarks_node[multi]": lambda: retrieve_benchmarks_node(MULTI_STATE),
+        "price_node": lambda: price_node(priced_state),
+    }
+
+    results = []
+    rows = 0
+    for size in sizes:
+        elapsed = generate_deals(size - rows, seed=args.seed + size)
+        rows = size
+        print(f"\n{size:,} deals (+{elapsed:.1f}s para inserir)")
+        priced_state = {**STATE, **retrieve_benchmarks_node(STATE)}
+        for name, fn in cases.items():
+            stats = _measure(fn, args.repeat)
+            results.append({"rows": size, "case": name, **stats})
+            print(f"  {name:<34} p50 {stats['p50_ms']:>10.2f} ms   p95 {stats['p95_ms']:>10.2f} ms")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResultados em {args.json}")
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Cliente OpenAI falso e determinístico para medir o overhead do nosso código.
+
+Responde sem rede nem espera: qualificação completa quando ``qualify_turn``
+(ou ``extract_info``) está liberada, texto com proposta nos demais casos.
+"""
+
+import itertools
+import json
+from types import SimpleNamespace
+
+_ids = itertools.count()
+
+QUALIFIED = {
+    "name": "Maria",
+    "platform": ["instagram"],
+    "deliverable_type": "reel",
+    "avg_views": 100_000,
+    "qty": 2,
+    "deadline": "30 dias",
+    "niche": "fitness",
+}
+
+_USAGE = SimpleNamespace(
+    input_tokens=1200,
+    output_tokens=60,
+    input_tokens_details=SimpleNamespace(cached_tokens=1024),
+)
+
+
+class _Item(SimpleNamespace):
+    def to_dict(self) -> dict:
+        return {"type": self.type, "name": self.name, "arguments": self.arguments, "call_id": self.call_id}
+
+
+def _function_call(name: str, arguments: dict) -> _Item:
+    return _Item(type="function_call", name=name, arguments=json.dumps(arguments), call_id=f"call_{next(_ids)}")
+
+
+def _text(text: str) -> _Item:
+    return _Item(type="message", content=[SimpleNamespace(text=text)])
+
+
+def _allowed(tool_choice) -> list[str]:
+    if isinstance(tool_choice, dict) and tool_choice.get("type") == "allowed_tools":
+        return [t["name"] for t in tool_choice["tools"]]
+    return []
+
+
+class _Responses:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        allowed = _allowed(kwargs.get("tool_choice"))
+        answered = any(
+            isinstance(i, dict) and i.get("type") == "function_call_output" for i in kwargs.get("input", [])
+        )
+        if "qualify_turn" in allowed and not answered:
+            output = [_function_call("qualify_turn", {**QUALIFIED, "reply": "Perfeito, Maria!"})]
+        elif "extract_info" in allowed and not answered:
+            output = [_function_call("extract_info", QUALIFIED)]
+        else:
+            output = [_text("Maria, para 2 reels conseguimos R$ 8.000,00. Podemos fechar?")]
+        return SimpleNamespace(id=f"resp_{next(_ids)}", output=output, usage=_USAGE)
+
+
+class StubClient:
+    def __init__(self, *args, **kwargs):
+        self.responses = _Responses()
+
+
+def install() -> StubClient:
+    """Troca ``openai.OpenAI`` por uma fábrica que devolve sempre o mesmo stub."""
+    import openai
+
+    client = StubClient()
+    openai.OpenAI = lambda *a, **k: client
+    return client
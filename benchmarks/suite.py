@@ -0,0 +1,232 @@
+"""Suíte de microbenchmarks: tools, contexto, store e um turno completo.
+
+    python benchmarks/suite.py                    # roda, grava results/latest.json e compara
+    python benchmarks/suite.py --save-baseline    # grava o resultado como baseline.json
+    python benchmarks/suite.py --quick            # menos repetições, tabelas menores
+
+Tudo roda num diretório temporário (banco, checkpoints, locks, métricas) e o
+LLM é o stub de ``benchmarks/stub_llm.py``: os números medem só o nosso
+código. Um caso é regressão quando o p50 passa do baseline por mais que
+``--threshold`` (e por mais que ``MIN_DELTA_MS``, para não acusar ruído em
+casos de microssegundos). Com regressões o processo sai com código 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+from statistics import fmean, median, quantiles
+
+ROOT = Path(__file__).resolve().parent.parent
+HERE = Path(__file__).resolve().parent
+BASELINE_FILE = HERE / "baseline.json"
+RESULTS_FILE = HERE / "results" / "latest.json"
+
+# Diferença absoluta mínima para contar como regressão
+MIN_DELTA_MS = 0.005
+
+STATE = {
+    "thread_id": "bench",
+    "name": "Maria",
+    "platform": "instagram",
+    "deliverable_type": "reel",
+    "niche": "fitness",
+    "avg_views": 100_000,
+    "qty": 2,
+    "deadline": "30 dias",
+    "current_offer_brl": 9000.0,
+    "last_agent_offer_brl": 8000.0,
+    "suggested_range": {"floor": 6000.0, "target": 8000.0, "ceiling": 10000.0},
+    "benchmarks": {"count": 12, "avg_cpm": 38.5, "median_price": 7800.0},
+    "platform_details": {
+        "instagram": {"avg_views": 100_000, "qty": 2},
+        "tiktok": {"avg_views": 60_000, "qty": 1},
+    },
+}
+
+
+def measure(fn, repeat: int, number: int | None = None) -> dict:
+    """Tempo por chamada em ms: *repeat* amostras de *number* chamadas cada.
+
+    Sem *number*, calibra com ``autorange`` (amostras de ~0,2 s).
+    """
+    timer = timeit.Timer(fn)
+    if number is None:
+        number, _ = timer.autorange()
+    samples = [t / number * 1000 for t in timer.repeat(repeat=repeat, number=number)]
+    p95 = quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0]
+    return {
+        "p50_ms": round(median(samples), 4),
+        "p95_ms": round(p95, 4),
+        "mean_ms": round(fmean(samples), 4),
+        "samples": len(samples),
+        "number": number,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[dict]:
+    """Casos cujo p50 piorou mais que *threshold* (fração) em relação ao baseline."""
+    regressions = []
+    for case, current in results.items():
+        before = baseline.get(case)
+        if not before:
+            continue
+        delta = current["p50_ms"] - before["p50_ms"]
+        if delta > MIN_DELTA_MS and current["p50_ms"] > before["p50_ms"] * (1 + threshold):
+            regressions.append({
+                "case": case,
+                "baseline_ms": before["p50_ms"],
+                "current_ms": current["p50_ms"],
+                "change": round(delta / before["p50_ms"], 3),
+            })
+    return regressions
+
+
+def _setup_env(tmp: str) -> None:
+    # Precisa valer antes do primeiro import de app.*
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    os.environ["CHECKPOINT_DB"] = f"{tmp}/checkpoints.sqlite"
+    os.environ["LOCK_FILE"] = f"{tmp}/threads.lock"
+    os.environ["INBOX_DB"] = f"{tmp}/inbox.sqlite"
+    os.environ["METRICS_FILE"] = f"{tmp}/metrics.jsonl"
+    sys.path.insert(0, str(ROOT))
+
+
+def run(sizes: list[int], repeat: int, turns: int) -> dict:
+    from benchmarks.stub_llm import install
+
+    install()
+
+    from app.agents.negotiator import _build_context
+    from app.core.metrics import metrics
+    from app.core.orchestrator import Orchestrator
+    from app.core.store import get_conversation_messages, save_message
+    from app.db.session import SessionLocal, init_db
+    from app.db.synthetic import generate_deals
+    from app.tools.guardrails import append_handoff_suffix, check_human_handoff, check_sensitive_data
+    from app.tools.pricing import approval_required, calculate_price_range
+    from app.tools.retrieval import retrieve_benchmarks
+
+    init_db()
+    results = {}
+
+    def bench(case: str, fn, number: int | None = None, samples: int = repeat) -> None:
+        results[case] = measure(fn, samples, number)
+        r = results[case]
+        print(f"  {case:<44} p50 {r['p50_ms']:>10.4f} ms   p95 {r['p95_ms']:>10.4f} ms")
+
+    print("tools")
+    price_range = calculate_price_range(avg_views=100_000, qty=2, target_cpm_brl=40.0, benchmarks=STATE["benchmarks"])
+    bench("calculate_price_range", lambda: calculate_price_range(
+        avg_views=100_000, qty=2, target_cpm_brl=40.0, benchmarks=STATE["benchmarks"]))
+    bench("approval_required", lambda: approval_required(9500.0, price_range, STATE["benchmarks"]))
+    message = "Oi! Meu cartão é 4111 1111 1111 1111, quero falar com um humano"
+    bench("check_sensitive_data", lambda: check_sensitive_data(message))
+    bench("check_human_handoff", lambda: check_human_handoff(message))
+    bench("append_handoff_suffix", lambda: append_handoff_suffix("Claro, vou te transferir."))
+    bench("_build_context", lambda: _build_context(STATE))
+
+    print("retrieval")
+    rows = 0
+    for size in sizes:
+        generate_deals(size - rows, seed=size)
+        rows = size
+        session = SessionLocal()
+        bench(f"retrieve_benchmarks[{size}]", lambda: retrieve_benchmarks(
+            "instagram", "reel", 100_000, niche="fitness", session=session), number=1)
+        session.close()
+
+    print("store")
+    orch = Orchestrator()
+    conv = orch.start_or_resume_conversation("+5500000000000", new=True)["conversation"]
+    for i in range(200):
+        save_message(orch.db_session, conv.id, "user" if i % 2 else "assistant", f"mensagem {i}")
+    orch.db_session.commit()
+    bench("get_conversation_messages[200]", lambda: get_conversation_messages(orch.db_session, conv.id))
+
+    print("orchestrator")
+    metrics.clear()
+
+    last = {}
+
+    def turn():
+        started = orch.start_or_resume_conversation(f"+55{time.perf_counter_ns()}", new=True)
+        last["thread_id"] = started["thread_id"]
+        orch.process_message(
+            started["thread_id"],
+            started["conversation"].id,
+            "Oi, sou a Maria, faço 2 reels no instagram de fitness, 100k views, prazo 30 dias",
+            influencer_id=started["influencer"].id,
+        )
+
+    bench("process_message[qualify→negotiate]", turn, number=1, samples=turns)
+
+    print("checkpoints")
+    # O CachedSaver embrulha o serializador para contar bytes
+    serde = getattr(orch.checkpointer.serde, "serde", orch.checkpointer.serde)
+    config = {"configurable": {"thread_id": last["thread_id"], "checkpoint_ns": ""}}
+    checkpoint = orch.checkpointer.get_tuple(config).checkpoint
+    blob = serde.dumps_typed(checkpoint)
+    bench("checkpoint_dumps", lambda: serde.dumps_typed(checkpoint))
+    bench("checkpoint_loads", lambda: serde.loads_typed(blob))
+    bench("checkpoint_get_tuple", lambda: orch.checkpointer.get_tuple(config))
+    orch.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,50000", help="Tamanhos da tabela de deals")
+    parser.add_argument("--repeat", type=int, default=7, help="Amostras por caso")
+    parser.add_argument("--turns", type=int, default=20, help="Turnos completos medidos")
+    parser.add_argument("--quick", action="store_true", help="Tabelas menores e menos amostras")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Piora relativa tolerada no p50")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE))
+    parser.add_argument("--output", default=str(RESULTS_FILE))
+    parser.add_argument("--save-baseline", action="store_true", help="Gravar o resultado como baseline")
+    args = parser.parse_args()
+    if args.quick:
+        args.sizes, args.repeat, args.turns = "1000,5000", 3, 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _setup_env(tmp)
+        results = run(sorted(int(s) for s in args.sizes.split(",")), args.repeat, args.turns)
+
+    payload = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    print(f"\nResultados em {output}")
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"Baseline gravado em {args.baseline}")
+        return
+
+    baseline_path = Path(args.baseline)
+    if not baseline_path.exists():
+        print("Sem baseline para comparar (use --save-baseline).")
+        return
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+    regressions = compare(results, baseline, args.threshold)
+    if not regressions:
+        print(f"Sem regressões acima de {args.threshold:.0%} em relação ao baseline.")
+        return
+    print(f"\nRegressões acima de {args.threshold:.0%}:")
+    for r in regressions:
+        print(f"  {r['case']:<44} {r['baseline_ms']:.4f} → {r['current_ms']:.4f} ms (+{r['change']:.0%})")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
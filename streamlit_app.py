@@ -38,24 +38,21 @@ st.set_page_config(
 # ---------------------------------------------------------------------------
 
 from app.core.orchestrator import Orchestrator  # noqa: E402
+from app.core.resources import SharedResources, load_resources  # noqa: E402
 from app.db.seed import seed as seed_db  # noqa: E402
-from app.db.session import SessionLocal, init_db  # noqa: E402
-from app.db.models import Deal  # noqa: E402
 
 # ---------------------------------------------------------------------------
-# Auto-seed: populate benchmarks if the DB is empty
+# Process-wide resources: schema check, auto-seed, compiled graph,
+# checkpointer and LLM client are created once and shared by every session
 # ---------------------------------------------------------------------------
 
-def _auto_seed():
-    init_db()
-    session = SessionLocal()
-    try:
-        if session.query(Deal).count() == 0:
-            seed_db()
-    finally:
-        session.close()
+@st.cache_resource(show_spinner="Carregando agente...")
+def _shared_resources() -> SharedResources:
+    # seed() creates the schema and is a no-op when deals already exist
+    seed_db()
+    return load_resources("negotiator")
 
-_auto_seed()
+_shared_resources()
 
 # ---------------------------------------------------------------------------
 # Session state defaults
@@ -69,6 +66,7 @@ _DEFAULTS = {
     "influencer_id": None,
     "approval_pending": False,
     "conversation_started": False,
+    "greeting_pending": False,
 }
 
 for key, val in _DEFAULTS.items():
@@ -76,12 +74,13 @@ for key, val in _DEFAULTS.items():
         st.session_state[key] = val
 
 # ---------------------------------------------------------------------------
-# Helper: get or create orchestrator (one per browser session)
+# Helper: get or create orchestrator (one light handle per browser session —
+# only a DB session; graph and checkpointer come from the shared resources)
 # ---------------------------------------------------------------------------
 
 def _get_orchestrator() -> Orchestrator:
     if st.session_state.orchestrator is None:
-        st.session_state.orchestrator = Orchestrator(agent_id="negotiator")
+        st.session_state.orchestrator = Orchestrator(resources=_shared_resources())
     return st.session_state.orchestrator
 
 # ---------------------------------------------------------------------------
@@ -101,13 +100,25 @@ def _start_conversation(phone: str):
     st.session_state.approval_pending = False
     st.session_state.conversation_started = True
 
-    # Generate greeting
-    greeting = orch.send_greeting(
+    # Greeting is generated in the background; the user can type meanwhile
+    orch.start_greeting(
         result["conversation"].id,
         influencer_name=result["influencer"].name,
     )
+    st.session_state.greeting_pending = True
 
-    st.session_state.messages.append({"role": "assistant", "content": greeting})
+
+def _collect_greeting(timeout: float | None = None) -> str | None:
+    """Insert the pending greeting at the top of the chat once available."""
+    if not st.session_state.greeting_pending:
+        return None
+    greeting = _get_orchestrator().finish_greeting(
+        st.session_state.conversation_id, timeout=timeout
+    )
+    st.session_state.greeting_pending = False
+    if greeting:
+        st.session_state.messages.insert(0, {"role": "assistant", "content": greeting})
+    return greeting
 
 # ---------------------------------------------------------------------------
 # Sidebar
@@ -143,6 +154,11 @@ st.caption("Negocie precos de conteudo com a Raimunda, agente virtual da Gocase.
 # Chat history
 # ---------------------------------------------------------------------------
 
+if st.session_state.greeting_pending and _get_orchestrator().greeting_ready(
+    st.session_state.conversation_id
+):
+    _collect_greeting()
+
 for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])
@@ -212,6 +228,13 @@ if not st.session_state.conversation_started:
     st.stop()
 
 if user_input := st.chat_input("Digite sua mensagem..."):
+    # Greeting must come before the first user message
+    if st.session_state.greeting_pending:
+        greeting = _collect_greeting()
+        if greeting:
+            with st.chat_message("assistant"):
+                st.markdown(greeting)
+
     # Show user message
     st.session_state.messages.append({"role": "user", "content": user_input})
     with st.chat_message("user"):
@@ -242,3 +265,9 @@ if user_input := st.chat_input("Digite sua mensagem..."):
     if response["approval_required"]:
         st.session_state.approval_pending = True
         st.rerun()
+
+# The chat input is already on screen: wait for the greeting (bounded by the
+# latency budget) without blocking the user, then redraw with it.
+if st.session_state.greeting_pending:
+    _collect_greeting()
+    st.rerun()
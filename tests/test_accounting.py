@@ -0,0 +1,104 @@
+"""Tests for LLM token/cost accounting."""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.accounting import (
+    LlmCallBuffer,
+    conversation_costs,
+    deal_costs,
+    estimate_cost_usd,
+    node_costs,
+)
+from app.db.models import Base, Conversation, Deal, LlmCall
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _event(thread_id, node, input_tokens=1000, cached=0, output=100, model="gpt-4o-mini"):
+    return {
+        "kind": "llm", "thread_id": thread_id, "node": node, "call": node,
+        "model": model, "input_tokens": input_tokens, "cached_tokens": cached,
+        "output_tokens": output, "duration_ms": 500.0,
+    }
+
+
+class TestEstimateCost:
+    def test_known_model(self):
+        # 1M input a 0.15 + 1M output a 0.60
+        assert estimate_cost_usd("gpt-4o-mini", 1_000_000, 0, 1_000_000) == pytest.approx(0.75)
+
+    def test_cached_tokens_are_cheaper(self):
+        full = estimate_cost_usd("gpt-4o-mini", 1_000_000, 0, 0)
+        cached = estimate_cost_usd("gpt-4o-mini", 1_000_000, 1_000_000, 0)
+        assert cached == pytest.approx(full / 2)
+
+    def test_snapshot_suffix(self):
+        assert estimate_cost_usd("gpt-4o-mini-2024-07-18", 1_000_000, 0, 0) == pytest.approx(0.15)
+
+    def test_unknown_model(self):
+        assert estimate_cost_usd("modelo-x", 1000, 0, 1000) == 0.0
+
+
+class TestLlmCallBuffer:
+    def test_ignores_non_llm_events(self):
+        buf = LlmCallBuffer()
+        buf.add_event({"kind": "node", "node": "price", "duration_ms": 1.0})
+        assert len(buf) == 0
+
+    def test_flush_inserts_batch(self, db_session):
+        buf = LlmCallBuffer()
+        buf.add_event(_event("t1", "qualify"))
+        buf.add_event(_event("t1", "negotiate"))
+        assert buf.flush(db_session) == 2
+        assert buf.flush(db_session) == 0
+        assert db_session.query(LlmCall).count() == 2
+
+
+class TestReports:
+    def _populate(self, session):
+        session.add_all([
+            Conversation(thread_id="cheap", agent_id=1, influencer_id=1, status="active"),
+            Conversation(thread_id="pricey", agent_id=1, influencer_id=1, status="closed_deal"),
+            Deal(influencer_name="A", platform="instagram", niche="fitness",
+                 deliverable_type="reel", avg_views=1000, final_price_brl=3000,
+                 cpm_brl=1.0, thread_id="pricey"),
+            Deal(influencer_name="A", platform="tiktok", niche="fitness",
+                 deliverable_type="reel", avg_views=1000, final_price_brl=1000,
+                 cpm_brl=1.0, thread_id="pricey"),
+        ])
+        session.commit()
+        buf = LlmCallBuffer()
+        buf.add_event(_event("cheap", "qualify", input_tokens=100, output=10))
+        for _ in range(3):
+            buf.add_event(_event("pricey", "negotiate", input_tokens=5000, output=500))
+        buf.flush(session)
+
+    def test_conversation_ranking(self, db_session):
+        self._populate(db_session)
+        rows = conversation_costs(db_session)
+        assert [r["thread_id"] for r in rows] == ["pricey", "cheap"]
+        assert rows[0]["calls"] == 3
+        assert rows[0]["deals"] == 2
+        assert rows[0]["deal_value_brl"] == 4000
+        assert rows[1]["deal_value_brl"] is None
+
+    def test_node_ranking(self, db_session):
+        self._populate(db_session)
+        rows = node_costs(db_session)
+        assert rows[0]["node"] == "negotiate"
+
+    def test_deal_cost_split_by_price(self, db_session):
+        self._populate(db_session)
+        rows = deal_costs(db_session)
+        total = sum(r["llm_cost_usd"] for r in rows)
+        assert rows[0]["final_price_brl"] == 3000
+        assert rows[0]["llm_cost_usd"] == pytest.approx(total * 0.75)
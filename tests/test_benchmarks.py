@@ -0,0 +1,30 @@
+"""Tests for the benchmark suite helpers (timing and baseline comparison)."""
+
+from benchmarks.suite import compare, measure
+
+
+def _r(p50):
+    return {"p50_ms": p50}
+
+
+class TestCompare:
+    def test_flags_regression_above_threshold(self):
+        regressions = compare({"a": _r(1.5), "b": _r(1.1)}, {"a": _r(1.0), "b": _r(1.0)}, 0.25)
+        assert [r["case"] for r in regressions] == ["a"]
+        assert regressions[0]["change"] == 0.5
+
+    def test_ignores_noise_on_tiny_cases(self):
+        # +100%, mas só 1 µs: abaixo de MIN_DELTA_MS
+        assert compare({"a": _r(0.002)}, {"a": _r(0.001)}, 0.25) == []
+
+    def test_new_cases_and_improvements_pass(self):
+        assert compare({"new": _r(5.0), "a": _r(0.5)}, {"a": _r(1.0)}, 0.25) == []
+
+
+class TestMeasure:
+    def test_fixed_number(self):
+        calls = []
+        result = measure(lambda: calls.append(1), repeat=3, number=4)
+        assert len(calls) == 12
+        assert result["samples"] == 3 and result["number"] == 4
+        assert result["p50_ms"] >= 0
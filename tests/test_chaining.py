@@ -0,0 +1,127 @@
+"""Tests for chaining negotiate calls by previous_response_id."""
+
+import itertools
+import json
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app.agents import negotiator
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/responses")
+
+
+class _Item(SimpleNamespace):
+    def to_dict(self):
+        return {"type": self.type, "name": self.name, "arguments": self.arguments, "call_id": self.call_id}
+
+
+class _ChainingResponses:
+    """Servidor falso: guarda respostas por id e rejeita ids desconhecidos."""
+
+    def __init__(self, tool_calls: int = 0):
+        self.calls = []
+        self.known = set()
+        self.tool_calls = tool_calls
+        self._ids = itertools.count(1)
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        prev = kwargs.get("previous_response_id")
+        if prev and prev not in self.known:
+            raise openai.BadRequestError(
+                "Previous response not found",
+                response=httpx.Response(400, request=REQUEST),
+                body={"param": "previous_response_id"},
+            )
+        rid = f"resp_{next(self._ids)}"
+        self.known.add(rid)
+        if self.tool_calls:
+            self.tool_calls -= 1
+            args = {"avg_views": 100000, "qty": 1, "target_cpm_brl": 40.0}
+            output = [_Item(type="function_call", name="calculate_price_range",
+                            arguments=json.dumps(args), call_id=f"c{rid}")]
+        else:
+            output = [SimpleNamespace(type="message", content=[SimpleNamespace(text="Podemos fechar em R$ 4.000,00?")])]
+        return SimpleNamespace(id=rid, output=output, usage=None)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    responses = _ChainingResponses()
+    client = SimpleNamespace(responses=responses)
+    monkeypatch.setattr(negotiator.openai, "OpenAI", lambda *a, **k: client)
+    return responses
+
+
+def _state(history, message, response_chain=None):
+    return {
+        "thread_id": "t1",
+        "last_user_message": message,
+        "current_node": "price",
+        "current_offer_brl": None,
+        "operator_counter_offer_brl": None,
+        "suggested_range": {"floor": 3000.0, "target": 4000.0, "ceiling": 5000.0},
+        "benchmarks": None,
+        "conversation_history": history,
+        "response_chain": response_chain,
+    }
+
+
+def _texts(items):
+    return [i.get("content") for i in items if "role" in i]
+
+
+class TestChainDelta:
+    def test_messages_after_anchor(self):
+        conv = [{"role": "user", "content": "a"}, {"role": "assistant", "content": "x"},
+                {"role": "user", "content": "b"}]
+        assert negotiator._chain_delta(conv, {"id": "r1", "anchor": "x"}) == [{"role": "user", "content": "b"}]
+
+    def test_missing_anchor_or_id(self):
+        conv = [{"role": "user", "content": "a"}]
+        assert negotiator._chain_delta(conv, {"id": "r1", "anchor": "x"}) is None
+        assert negotiator._chain_delta(conv, None) is None
+
+
+class TestNegotiateChaining:
+    def test_second_turn_sends_only_new_messages(self, server):
+        history = [{"role": "user", "content": f"msg {i}"} for i in range(10)]
+        first = negotiator.negotiate(_state(history, "quero 5 mil"), chain_responses=True)
+        chain = first["response_chain"]
+        assert chain["id"] == "resp_1"
+        assert server.calls[0]["store"] is True
+        assert "previous_response_id" not in server.calls[0]
+
+        history = history + [{"role": "user", "content": "quero 5 mil"},
+                             {"role": "assistant", "content": chain["anchor"]}]
+        second = negotiator.negotiate(_state(history, "faz 4500?", chain), chain_responses=True)
+        sent = server.calls[1]
+        assert sent["previous_response_id"] == "resp_1"
+        assert _texts(sent["input"])[0] == "faz 4500?"
+        assert len(sent["input"]) == 2  # mensagem nova + dados da sessão
+        assert second["response_chain"]["id"] == "resp_2"
+
+    def test_tool_loop_sends_only_outputs(self, server):
+        server.tool_calls = 2
+        negotiator.negotiate(_state([], "quanto vocês pagam?"), chain_responses=True)
+        loop = server.calls[1:]
+        assert [c["previous_response_id"] for c in loop] == ["resp_1", "resp_2"]
+        assert all(len(c["input"]) == 1 and c["input"][0]["type"] == "function_call_output" for c in loop)
+
+    def test_invalid_chain_falls_back_to_full_resend(self, server):
+        history = [{"role": "assistant", "content": "antiga"}]
+        result = negotiator.negotiate(
+            _state(history, "oi", {"id": "resp_expirada", "anchor": "antiga"}), chain_responses=True
+        )
+        retry = server.calls[1]
+        assert "previous_response_id" not in retry
+        assert _texts(retry["input"])[:2] == ["antiga", "oi"]
+        assert result["response_chain"]["id"] == "resp_1"
+
+    def test_disabled_keeps_full_resend(self, server):
+        result = negotiator.negotiate(_state([], "oi", {"id": "resp_1", "anchor": "x"}))
+        assert "store" not in server.calls[0] and "previous_response_id" not in server.calls[0]
+        assert "response_chain" not in result
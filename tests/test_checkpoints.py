@@ -0,0 +1,277 @@
+"""Tests for the compact checkpoint serializer and the checkpoint cache."""
+
+import operator
+from datetime import datetime
+from typing import Annotated, TypedDict
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Command, interrupt
+
+from app.core.checkpoints import (
+    COMPACT_TYPE,
+    COMPACT_ZLIB_TYPE,
+    CachedSaver,
+    CompactSerializer,
+    open_checkpointer,
+)
+from app.core.metrics import metrics
+
+VERSION = "00000000000000000000000000000004.0.6519292071087913"
+
+
+def _checkpoint():
+    return {
+        "v": 4,
+        "id": "1f1cb6ff-3773-6911-8010-dd289911e8e9",
+        "ts": "2026-10-19T03:48:31.168085+00:00",
+        "channel_values": {
+            "thread_id": "t1",
+            "current_node": "negotiate",
+            "suggested_range": {"floor": 5600.0, "target": 8000.0, "ceiling": 10400.0},
+            "benchmarks": {"count": 12, "avg_cpm": 38.5, "median_price": 7800.0},
+            "messages": [
+                HumanMessage(content="quero 9 mil", id="m1"),
+                AIMessage(content="Podemos fechar em R$ 8.000,00?", id="m2"),
+            ],
+            "conversation_history": [{"role": "user", "content": "quero 9 mil"}],
+            "canal_novo": [1, 2, 3],
+        },
+        "channel_versions": {"thread_id": VERSION, "messages": VERSION, "canal_novo": VERSION.replace("4", "5")},
+        "versions_seen": {"negotiate": {"branch:to:negotiate": VERSION}, "__input__": {}},
+        "updated_channels": ["messages"],
+    }
+
+
+class TestCompactSerializer:
+    def test_roundtrip_is_smaller(self):
+        serde = CompactSerializer()
+        checkpoint = _checkpoint()
+        type_, blob = serde.dumps_typed(checkpoint)
+        assert type_ == COMPACT_TYPE
+        assert serde.loads_typed((type_, blob)) == checkpoint
+        assert len(blob) < len(JsonPlusSerializer().dumps_typed(checkpoint)[1]) / 1.4
+        # channel_versions referencia a tabela; versions_seen segue por extenso
+        assert blob.count(VERSION.encode()) == 2
+        assert JsonPlusSerializer().dumps_typed(checkpoint)[1].count(VERSION.encode()) == 3
+
+    def test_zlib_roundtrip(self):
+        serde = CompactSerializer(compress=True)
+        checkpoint = _checkpoint()
+        type_, blob = serde.dumps_typed(checkpoint)
+        assert type_ == COMPACT_ZLIB_TYPE
+        assert serde.loads_typed((type_, blob)) == checkpoint
+
+    def test_reads_default_format(self):
+        checkpoint = _checkpoint()
+        old = JsonPlusSerializer().dumps_typed(checkpoint)
+        assert old[0] == "msgpack"
+        assert CompactSerializer().loads_typed(old) == checkpoint
+
+    def test_unsupported_values_fall_back_to_default(self):
+        serde = CompactSerializer()
+        rich = AIMessage(content="", id="m3", tool_calls=[{"name": "confirm_deal", "args": {}, "id": "c1"}])
+        for value in ({"closed_at": datetime(2026, 1, 2)}, [rich]):
+            type_, blob = serde.dumps_typed(value)
+            assert type_ == "msgpack"
+            assert serde.loads_typed((type_, blob)) == value
+
+    def test_plain_values(self):
+        serde = CompactSerializer()
+        for value in (8000.0, "negotiate", [HumanMessage(content="oi", id="m1")], None):
+            assert serde.loads_typed(serde.dumps_typed(value)) == value
+
+
+class TestOpenCheckpointer:
+    def test_reads_checkpoints_written_with_default_serde(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "checkpoints.sqlite")
+        config = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+        with SqliteSaver.from_conn_string(path) as saver:
+            saver.put(config, _checkpoint(), {"step": 1}, {})
+
+        monkeypatch.delenv("CHECKPOINT_SERDE", raising=False)
+        with open_checkpointer(path, max_bytes=0) as saver:
+            assert isinstance(saver.serde, CompactSerializer)
+            assert saver.get_tuple(config).checkpoint == _checkpoint()
+            # Checkpoints novos no formato compacto convivem com os antigos
+            new = {**_checkpoint(), "id": "1f1cb6ff-3773-6911-8010-dd289911e8ea"}
+            saver.put(config, new, {"step": 2}, {})
+            assert saver.get_tuple(config).checkpoint == new
+            types = {row[0] for row in saver.conn.execute("SELECT type FROM checkpoints")}
+            assert types == {"msgpack", COMPACT_TYPE}
+
+    def test_default_mode(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("CHECKPOINT_SERDE", "default")
+        with open_checkpointer(str(tmp_path / "c.sqlite"), max_bytes=0) as saver:
+            assert type(saver.serde) is JsonPlusSerializer
+
+    def test_cache_env(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("CHECKPOINT_CACHE_BYTES", "1024")
+        with open_checkpointer(str(tmp_path / "c.sqlite")) as saver:
+            assert isinstance(saver, CachedSaver)
+            assert saver.max_bytes == 1024
+            assert isinstance(saver.serde.serde, CompactSerializer)
+        monkeypatch.setenv("CHECKPOINT_CACHE_BYTES", "0")
+        with open_checkpointer(str(tmp_path / "c.sqlite")) as saver:
+            assert type(saver) is SqliteSaver
+
+
+def _config(thread_id="t1", checkpoint_id=None):
+    conf = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if checkpoint_id:
+        conf["checkpoint_id"] = checkpoint_id
+    return {"configurable": conf}
+
+
+def _numbered(n: int) -> dict:
+    return {**_checkpoint(), "id": f"1f1cb6ff-3773-6911-8010-dd289911e8{n:02d}"}
+
+
+def _plain(saver):
+    """``SqliteSaver`` sem cache, numa conexão própria sobre o mesmo arquivo."""
+    return open_checkpointer(saver.conn.execute("PRAGMA database_list").fetchone()[2], max_bytes=0)
+
+
+class TestCachedSaver:
+    def setup_method(self):
+        metrics.clear()
+
+    def _cache_results(self) -> dict:
+        return {
+            dict(labels)["result"]: value
+            for (name, labels), value in metrics.counter_summary().items()
+            if name == "checkpoint_cache"
+        }
+
+    def test_hit_skips_read_and_deserialize(self, tmp_path):
+        with open_checkpointer(str(tmp_path / "c.sqlite"), max_bytes=1 << 20) as saver:
+            config = saver.put(_config(), _numbered(1), {"step": 1}, {})
+            loads = []
+            real = saver.serde.serde.loads_typed
+            saver.serde.serde.loads_typed = lambda data: loads.append(data) or real(data)
+            saved = saver.get_tuple(_config())
+            assert loads == []
+            assert saved.config == config
+            assert saved.checkpoint == _numbered(1)
+            assert saved.metadata == {"step": 1}
+            # O grafo altera o checkpoint devolvido; o cache não pode mudar junto
+            saved.checkpoint["channel_versions"]["messages"] = "x"
+            assert saver.get_tuple(_config()).checkpoint == _numbered(1)
+        assert self._cache_results() == {"hit": 2}
+
+    def test_matches_sqlite_saver(self, tmp_path):
+        with open_checkpointer(str(tmp_path / "c.sqlite"), max_bytes=1 << 20) as saver:
+            first = saver.put(_config(), _numbered(1), {"step": 1}, {})
+            second = saver.put(first, _numbered(2), {"step": 2, "source": "loop"}, {})
+            # Escrita adiantada: chega antes do put do seu checkpoint
+            saver.put_writes(_config(checkpoint_id=_numbered(3)["id"]), [("messages", "cedo")], "task-c")
+            saver.put_writes(second, [("current_node", "qualify"), ("qty", 2)], "task-b", "~b")
+            saver.put_writes(second, [("current_node", "ignorado")], "task-b", "~b")
+            saver.put_writes(second, [("__interrupt__", "primeiro")], "task-a", "~a")
+            saver.put_writes(second, [("__interrupt__", "substituído")], "task-a", "~a")
+            cached = saver.get_tuple(_config())
+            with _plain(saver) as plain:
+                expected = plain.get_tuple(_config())
+            assert cached == expected
+            assert [w[2] for w in cached.pending_writes] == ["substituído", "qualify", 2]
+
+            third = saver.put(second, _numbered(3), {"step": 3}, {})
+            cached = saver.get_tuple(_config())
+            with _plain(saver) as plain:
+                assert cached == plain.get_tuple(_config())
+            assert cached.pending_writes == [("task-c", "messages", "cedo")]
+            assert cached.parent_config == second
+            assert cached.config == third
+        assert self._cache_results() == {"hit": 2}
+
+    def test_detects_writes_from_other_connections(self, tmp_path):
+        with open_checkpointer(str(tmp_path / "c.sqlite"), max_bytes=1 << 20) as saver:
+            first = saver.put(_config(), _numbered(1), {"step": 1}, {})
+            with _plain(saver) as other:
+                other.put_writes(first, [("__interrupt__", "de fora")], "task-x")
+            assert saver.get_tuple(_config()).pending_writes == [("task-x", "__interrupt__", "de fora")]
+            with _plain(saver) as other:
+                other.put(first, _numbered(2), {"step": 2}, {})
+            assert saver.get_tuple(_config()).checkpoint == _numbered(2)
+            assert saver.get_tuple(_config()).checkpoint == _numbered(2)
+        assert self._cache_results() == {"hit": 2, "stale": 1}
+
+    def test_write_from_other_connection_right_after_put(self, tmp_path, monkeypatch):
+        original = SqliteSaver.put
+        injected = []
+
+        def put_then_other_writes(saver, config, checkpoint, metadata, new_versions):
+            saved = original(saver, config, checkpoint, metadata, new_versions)
+            if isinstance(saver, CachedSaver) and not injected:
+                # Outro processo grava na mesma thread entre o nosso commit e a volta do put
+                injected.append(True)
+                with _plain(saver) as other:
+                    original(other, saved, _numbered(3), {"step": 3}, {})
+            return saved
+
+        with open_checkpointer(str(tmp_path / "c.sqlite"), max_bytes=1 << 20) as saver:
+            first = saver.put(_config(), _numbered(1), {"step": 1}, {})
+            monkeypatch.setattr(SqliteSaver, "put", put_then_other_writes)
+            saver.put(first, _numbered(2), {"step": 2}, {})
+            assert injected
+            assert saver.get_tuple(_config()).checkpoint == _numbered(3)
+        assert self._cache_results() == {"stale": 1}
+
+    def test_evicts_by_bytes(self, tmp_path):
+        with open_checkpointer(str(tmp_path / "c.sqlite"), max_bytes=1 << 20) as saver:
+            saver.put(_config("t1"), _numbered(1), {"step": 1}, {})
+            size = saver.cache_info()["bytes"]
+            saver.max_bytes = size * 2
+            saver.put(_config("t2"), _numbered(1), {"step": 1}, {})
+            saver.get_tuple(_config("t1"))
+            saver.put(_config("t3"), _numbered(1), {"step": 1}, {})
+            assert saver.cache_info()["entries"] == 2
+            assert saver.cache_info()["bytes"] <= saver.max_bytes
+            # t2 era o menos recente; volta do disco
+            assert saver.get_tuple(_config("t2")).checkpoint == _numbered(1)
+        assert self._cache_results() == {"hit": 1, "miss": 1}
+
+    def test_delete_thread(self, tmp_path):
+        with open_checkpointer(str(tmp_path / "c.sqlite"), max_bytes=1 << 20) as saver:
+            saver.put(_config(), _numbered(1), {"step": 1}, {})
+            saver.delete_thread("t1")
+            assert saver.get_tuple(_config()) is None
+            assert saver.cache_info()["entries"] == 0
+
+
+class _Counter(TypedDict):
+    total: Annotated[int, operator.add]
+    approved: bool
+
+
+def _graph(checkpointer):
+    def add(state):
+        return {"total": 1}
+
+    def approve(state):
+        return {"approved": interrupt({"total": state["total"]})}
+
+    builder = StateGraph(_Counter)
+    builder.add_node("add", add)
+    builder.add_node("approve", approve)
+    builder.add_edge(START, "add")
+    builder.add_conditional_edges("add", lambda s: "approve" if s["total"] >= 2 else END)
+    builder.add_edge("approve", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+class TestCachedGraph:
+    def test_same_results_as_sqlite_saver(self, tmp_path):
+        results = {}
+        for name, max_bytes in (("plain", 0), ("cached", 1 << 20)):
+            with open_checkpointer(str(tmp_path / f"{name}.sqlite"), max_bytes=max_bytes) as saver:
+                graph = _graph(saver)
+                config = {"configurable": {"thread_id": "t1"}}
+                runs = [graph.invoke({"total": 1}, config) for _ in range(2)]
+                runs.append(graph.invoke(Command(resume=True), config))
+                results[name] = [{k: v for k, v in r.items() if k != "__interrupt__"} for r in runs]
+                results[name].append(graph.get_state(config).values)
+        assert results["cached"] == results["plain"]
+        assert results["cached"][-1] == {"total": 4, "approved": True}
@@ -0,0 +1,84 @@
+"""Tests for the greeting cache, background generation and latency fallback."""
+
+from concurrent.futures import Future
+
+import pytest
+
+from app.core import greetings
+from app.core.greetings import (
+    NAME_PLACEHOLDER,
+    GreetingCache,
+    cached_greeting,
+    fallback_greeting,
+    name_shape,
+    resolve_greeting,
+)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    calls = []
+
+    def fake_generate(user_message=None, influencer_name=None):
+        calls.append((user_message, influencer_name))
+        return f"Oi {influencer_name}, que bom te ver de novo!"
+
+    monkeypatch.setattr(greetings, "generate_greeting", fake_generate)
+    monkeypatch.setattr(greetings, "greeting_cache", GreetingCache(ttl_s=60, max_variants=1))
+    return calls
+
+
+class TestNameShape:
+    def test_shapes(self):
+        assert name_shape(None) == "none"
+        assert name_shape("Ana") == "single"
+        assert name_shape("Ana Clara") == "compound"
+
+
+class TestGreetingCache:
+    def test_ttl_expires(self, monkeypatch):
+        cache = GreetingCache(ttl_s=10)
+        now = [100.0]
+        monkeypatch.setattr(greetings.time, "monotonic", lambda: now[0])
+        cache.put(("returning", "single"), "Oi [NOME]")
+        assert cache.get(("returning", "single")) == "Oi [NOME]"
+        now[0] += 11
+        assert cache.get(("returning", "single")) is None
+
+    def test_keeps_at_most_max_variants(self):
+        cache = GreetingCache(max_variants=2)
+        for text in ("a", "b", "c"):
+            cache.put(("returning", "single"), text)
+        assert not cache.needs_refill(("returning", "single"))
+        assert cache.get(("returning", "single")) in ("b", "c")
+
+
+class TestCachedGreeting:
+    def test_returning_greeting_is_reused_across_names(self, fake_llm):
+        assert cached_greeting(influencer_name="Ana") == "Oi Ana, que bom te ver de novo!"
+        assert cached_greeting(influencer_name="Bia") == "Oi Bia, que bom te ver de novo!"
+        assert fake_llm == [(None, NAME_PLACEHOLDER)]
+
+    def test_new_contact_uses_template(self, fake_llm):
+        assert cached_greeting() == greetings.GREETING_NEW
+        assert fake_llm == []
+
+    def test_reply_is_not_cached(self, fake_llm):
+        cached_greeting(user_message="oi!", influencer_name="Ana")
+        cached_greeting(user_message="oi!", influencer_name="Ana")
+        assert len(fake_llm) == 2
+
+
+class TestResolveGreeting:
+    def test_falls_back_when_budget_exceeded(self):
+        assert resolve_greeting(Future(), "Ana", timeout=0.01) == fallback_greeting("Ana")
+
+    def test_returns_generated_text(self):
+        future = Future()
+        future.set_result("Oi Ana!")
+        assert resolve_greeting(future, "Ana", timeout=0.01) == "Oi Ana!"
+
+    def test_generation_error_falls_back(self):
+        future = Future()
+        future.set_exception(RuntimeError("boom"))
+        assert resolve_greeting(future, None) == greetings.GREETING_NEW
@@ -0,0 +1,86 @@
+"""Tests for the bulk deal import."""
+
+import json
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.importer import InvalidDeal, deal_cpm, import_deals, normalize_deal
+from app.db.models import Base, Deal
+
+HEADER = "influencer_name,platform,niche,deliverable_type,qty,avg_views,final_price_brl,closed_at\n"
+
+
+@pytest.fixture
+def factory():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+class TestNormalizeDeal:
+    def test_normalizes_and_computes_cpm(self):
+        row = normalize_deal({
+            "influencer_name": "  Ana   Fitness ", "platform": "Instagram", "niche": " Fitness",
+            "deliverable_type": "REEL", "qty": "2", "avg_views": "80000.0",
+            "final_price_brl": "3200", "closed_at": "2025-01-02T10:00:00-03:00",
+        })
+        assert row["influencer_name"] == "Ana Fitness"
+        assert (row["platform"], row["niche"], row["deliverable_type"]) == ("instagram", "fitness", "reel")
+        assert row["avg_views"] == 80_000 and row["qty"] == 2
+        assert row["cpm_brl"] == deal_cpm(3200.0, 80_000, 2) == 20.0
+        assert row["closed_at"].isoformat() == "2025-01-02T13:00:00"
+
+    def test_same_deal_same_key(self):
+        base = {"influencer_name": "Ana", "platform": "tiktok", "niche": "moda",
+                "deliverable_type": "video", "avg_views": 1000, "final_price_brl": 100}
+        other = dict(base, platform="TikTok ", final_price_brl="100.00", qty="1")
+        assert normalize_deal(base)["source_key"] == normalize_deal(other)["source_key"]
+        assert normalize_deal(base)["source_key"] != normalize_deal(dict(base, avg_views=1001))["source_key"]
+
+    @pytest.mark.parametrize("change", [
+        {"avg_views": "abc"}, {"avg_views": 0}, {"qty": 1.5}, {"final_price_brl": -1},
+        {"niche": ""}, {"closed_at": "ontem"},
+    ])
+    def test_rejects_invalid(self, change):
+        raw = {"influencer_name": "Ana", "platform": "tiktok", "niche": "moda",
+               "deliverable_type": "video", "avg_views": 1000, "final_price_brl": 100}
+        with pytest.raises(InvalidDeal):
+            normalize_deal({**raw, **change})
+
+
+class TestImportDeals:
+    def test_csv_chunks_dedupe_and_invalid(self, factory, tmp_path):
+        path = tmp_path / "deals.csv"
+        path.write_text(
+            HEADER
+            + "".join(f"Inf {i},instagram,moda,reel,1,{1000 + i},100,2025-01-01\n" for i in range(7))
+            + "Inf 0,Instagram,Moda,Reel,1,1000,100.0,2025-01-01T00:00:00\n"
+            + "Ruim,instagram,moda,reel,1,,100,\n",
+            encoding="utf-8",
+        )
+        progress = []
+        report = import_deals(str(path), chunk_size=3, session_factory=factory,
+                              on_progress=lambda r: progress.append(r.inserted))
+        assert (report.read, report.inserted, report.duplicates, report.invalid) == (9, 7, 1, 1)
+        assert report.errors == ["linha 10: campos obrigatórios ausentes: avg_views"]
+        assert progress == [3, 6]
+
+        again = import_deals(str(path), chunk_size=3, session_factory=factory)
+        assert (again.inserted, again.duplicates) == (0, 8)
+        session = factory()
+        assert len(session.execute(select(Deal.id)).all()) == 7
+        session.close()
+
+    def test_jsonl(self, factory, tmp_path):
+        path = tmp_path / "deals.jsonl"
+        rows = [{"influencer_name": "Ana", "platform": "youtube", "niche": "tech",
+                 "deliverable_type": "video", "avg_views": 100_000, "final_price_brl": 6000}]
+        path.write_text("\n".join(json.dumps(r) for r in rows) + "\n{quebrado\n[]\n", encoding="utf-8")
+        report = import_deals(str(path), session_factory=factory)
+        assert (report.inserted, report.invalid) == (1, 2)
+        session = factory()
+        deal = session.execute(select(Deal)).scalar_one()
+        assert deal.cpm_brl == 60.0 and deal.closed_at is not None
+        session.close()
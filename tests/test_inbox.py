@@ -0,0 +1,133 @@
+"""Tests for the durable inbound queue and its worker pool."""
+
+import threading
+import time
+
+import pytest
+
+from app.core.inbox import InboundQueue, WorkerPool
+from app.core.metrics import metrics
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = InboundQueue(str(tmp_path / "inbox.sqlite"), max_attempts=2)
+    yield q
+    q.close()
+
+
+class TestInboundQueue:
+    def test_claim_blocks_same_key_until_complete(self, queue):
+        queue.enqueue("+5511", "primeira")
+        queue.enqueue("+5511", "segunda")
+        queue.enqueue("+5522", "outra conversa")
+
+        first = queue.claim()
+        other = queue.claim()
+        assert first.body == "primeira"
+        assert other.body == "outra conversa"
+        assert queue.claim() is None
+
+        queue.complete(first.id, {"response": "ok"})
+        assert queue.claim().body == "segunda"
+
+    def test_retry_keeps_order_and_backs_off(self, queue):
+        queue.enqueue("+5511", "primeira")
+        queue.enqueue("+5511", "segunda")
+        msg = queue.claim()
+        assert queue.fail(msg.id, "boom", msg.attempts) == "pending"
+        # Em backoff: nem ela nem a seguinte da mesma chave podem ser pegas
+        assert queue.claim() is None
+
+    def test_failed_after_max_attempts_releases_key(self, queue):
+        queue.enqueue("+5511", "primeira")
+        queue.enqueue("+5511", "segunda")
+        msg = queue.claim()
+        assert queue.fail(msg.id, "boom", attempts=2) == "failed"
+        assert queue.claim().body == "segunda"
+
+    def test_persists_across_instances(self, queue):
+        queue.enqueue("+5511", "oi")
+        reopened = InboundQueue(queue.path)
+        assert reopened.depth()["pending"] == 1
+        reopened.close()
+
+    def test_requeue_only_expired_leases(self, queue):
+        queue.enqueue("+5511", "viva")
+        queue.enqueue("+5522", "órfã")
+        assert queue.claim("pool-a").body == "viva"
+        assert queue.claim("pool-b").body == "órfã"
+        time.sleep(0.1)
+        assert queue.heartbeat("pool-a") == 1
+        assert queue.requeue_stale(lease_s=0.05) == 1
+        assert queue.claim("pool-c").body == "órfã"
+        assert queue.depth()["processing"] == 2
+
+    def test_depth_and_wait_metrics(self, queue):
+        metrics.clear()
+        queue.enqueue("+5511", "oi")
+        queue.claim()
+        counts = queue.record_depth()
+        assert counts["processing"] == 1
+        assert metrics.gauge_summary()[("inbox_depth", (("status", "processing"),))] == 1
+        assert ("inbox_wait_ms", (("agent", "negotiator"),)) in metrics.observation_summary()
+
+
+class TestWorkerPool:
+    def test_parallel_across_keys_ordered_within_key(self, queue):
+        for i in range(4):
+            for phone in ("a", "b", "c"):
+                queue.enqueue(phone, f"{phone}{i}")
+
+        lock = threading.Lock()
+        active: set[str] = set()
+        seen: dict[str, list[str]] = {}
+        max_parallel = []
+
+        def factory():
+            def handle(msg):
+                with lock:
+                    assert msg.ordering_key not in active
+                    active.add(msg.ordering_key)
+                    max_parallel.append(len(active))
+                time.sleep(0.01)
+                with lock:
+                    active.discard(msg.ordering_key)
+                    seen.setdefault(msg.phone, []).append(msg.body)
+                return {}
+
+            return handle
+
+        WorkerPool(queue, factory, workers=3, poll_interval_s=0.01).run_until_idle(idle_s=0.1)
+
+        assert seen == {p: [f"{p}{i}" for i in range(4)] for p in ("a", "b", "c")}
+        assert max(max_parallel) > 1
+        assert queue.depth()["done"] == 12
+
+    def test_start_does_not_steal_live_turns(self, queue):
+        queue.enqueue("+5511", "turno longo")
+        release = threading.Event()
+        calls = []
+
+        def factory():
+            def handle(msg):
+                calls.append(msg.body)
+                release.wait(5)
+                return {}
+
+            return handle
+
+        busy = WorkerPool(queue, factory, workers=1, poll_interval_s=0.01, lease_s=0.08)
+        busy.start()
+        # Turno bem mais longo que o lease: o heartbeat mantém a mensagem com o dono
+        time.sleep(0.3)
+        other_queue = InboundQueue(queue.path)
+        other = WorkerPool(other_queue, factory, workers=1, poll_interval_s=0.01, lease_s=0.08)
+        other.start()
+        time.sleep(0.1)
+        release.set()
+        busy.stop()
+        other.stop()
+        other_queue.close()
+        assert calls == ["turno longo"]
+        assert queue.depth()["done"] == 1
@@ -0,0 +1,128 @@
+"""Tests for the rule-based offer reply classifier and the negotiate fast path."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents import negotiator
+from app.core.metrics import metrics
+from app.tools.intent import classify_offer_reply
+
+
+class TestClassifyOfferReply:
+    @pytest.mark.parametrize(
+        "message", ["Fechado!", "aceito", "ok, pode ser", "combinado então", "tá bom", "Sim, fechado!! Valeu"]
+    )
+    def test_explicit_accept(self, message):
+        assert classify_offer_reply(message).is_accept()
+
+    @pytest.mark.parametrize("message", ["não aceito", "muito baixo pra mim", "não rola"])
+    def test_explicit_reject(self, message):
+        assert classify_offer_reply(message).is_reject()
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "ok mas consegue 5000?",
+            "fechado se for R$ 6.000",
+            "não sei, vou pensar",
+            "pode ser, mas preciso ver com minha agência antes",
+            "qual o prazo de entrega?",
+            "fechado?",
+            "",
+        ],
+    )
+    def test_ambiguous_goes_to_llm(self, message):
+        intent = classify_offer_reply(message)
+        assert not intent.is_accept()
+        assert not intent.is_reject()
+
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "ok vou pensar",
+            "vamos conversar",
+            "ok, deixa eu ver",
+            "beleza, te aviso",
+            "show, vou analisar",
+            "combinado, depois te falo",
+            "de acordo com minha agenda vejo",
+            "recebi, obrigado",
+        ],
+    )
+    def test_deferral_is_not_accept(self, message):
+        intent = classify_offer_reply(message)
+        assert intent.label == "ambiguous"
+        assert not intent.is_accept()
+
+
+class _ExplodingResponses:
+    def create(self, **kwargs):
+        raise AssertionError("LLM should not be called on the fast path")
+
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    client = SimpleNamespace(responses=_ExplodingResponses())
+    monkeypatch.setattr(negotiator.openai, "OpenAI", lambda *a, **k: client)
+
+
+def _state(message, offer=5000.0, suggested_range=None, benchmarks=None):
+    return {
+        "thread_id": "t1",
+        "last_user_message": message,
+        "current_node": "qualify",
+        "last_agent_offer_brl": offer,
+        "current_offer_brl": None,
+        "operator_counter_offer_brl": None,
+        "suggested_range": suggested_range,
+        "benchmarks": benchmarks,
+        "conversation_history": [
+            {"role": "assistant", "content": "Podemos fechar em R$ 5.000,00?"},
+            {"role": "user", "content": message},
+        ],
+    }
+
+
+class TestNegotiateFastPath:
+    def test_accept_skips_llm(self, no_llm):
+        metrics.clear()
+        result = negotiator.negotiate(_state("fechado!"), fast_path=True)
+        assert result["deal_accepted"] is True
+        assert result["agreed_price_brl"] == 5000.0
+        assert "messages" not in result
+        counters = metrics.counter_summary()
+        assert counters[("fast_path", (("intent", "accept"), ("node", "negotiate")))] == 1
+
+    def test_accept_above_range_requires_approval(self, no_llm):
+        state = _state(
+            "fechado!",
+            suggested_range={"floor": 1000.0, "target": 2000.0, "ceiling": 3000.0},
+            benchmarks={"count": 5},
+        )
+        result = negotiator.negotiate(state, fast_path=True)
+        assert result["approval_required"] is True
+        assert result["deal_accepted"] is False
+        assert result["messages"][0].content.startswith(negotiator.FAST_ACCEPT_PENDING_MESSAGE)
+
+    def test_offer_not_on_table_uses_llm(self, no_llm):
+        state = _state("fechado!", offer=4000.0)
+        with pytest.raises(AssertionError):
+            negotiator.negotiate(state, fast_path=True)
+
+    def test_influencer_ask_is_not_the_offer(self, no_llm):
+        # O agente cita a própria proposta e o pedido do influenciador
+        state = {**_state("fechado", offer=4000.0), "current_offer_brl": 5000.0}
+        state["conversation_history"][0] = {
+            "role": "assistant",
+            "content": "Consigo R$ 4.000, abaixo dos R$ 5.000 que você pediu. Fechamos?",
+        }
+        assert negotiator._offer_on_table(state) is None
+        with pytest.raises(AssertionError):
+            negotiator.negotiate(state, fast_path=True)
+
+    def test_after_operator_decision_uses_llm(self, no_llm):
+        state = {**_state("fechado!"), "current_node": "approval"}
+        with pytest.raises(AssertionError):
+            negotiator.negotiate(state, fast_path=True)
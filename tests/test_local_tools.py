@@ -0,0 +1,96 @@
+"""Tests for the local pure-tools negotiate mode and the tool-round cap."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents import negotiator
+from app.core.metrics import metrics
+
+
+class _Item(SimpleNamespace):
+    def to_dict(self):
+        return {"type": self.type, "name": self.name, "arguments": self.arguments, "call_id": self.call_id}
+
+
+class _Responses:
+    """Chama calculate_price_range enquanto as tools estiverem liberadas."""
+
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs["tool_choice"] == "none":
+            output = [SimpleNamespace(type="message", content=[SimpleNamespace(text="Fechamos em R$ 4.000,00?")])]
+        else:
+            args = {"avg_views": 100000, "qty": 1, "target_cpm_brl": 40.0}
+            output = [_Item(type="function_call", name="calculate_price_range",
+                            arguments=json.dumps(args), call_id=f"c{len(self.calls)}")]
+        return SimpleNamespace(id=f"r{len(self.calls)}", output=output, usage=None)
+
+
+@pytest.fixture
+def responses(monkeypatch):
+    responses = _Responses()
+    client = SimpleNamespace(responses=responses)
+    monkeypatch.setattr(negotiator.openai, "OpenAI", lambda *a, **k: client)
+    metrics.clear()
+    return responses
+
+
+def _state(message="faço por R$ 6.000", offer=None):
+    return {
+        "thread_id": "t1",
+        "last_user_message": message,
+        "current_node": "price",
+        "current_offer_brl": offer,
+        "operator_counter_offer_brl": None,
+        "suggested_range": {"floor": 3000.0, "target": 4000.0, "ceiling": 5000.0},
+        "benchmarks": {"count": 5, "avg_cpm": 40.0, "median_price": 4000.0},
+        "conversation_history": [],
+    }
+
+
+def _allowed(kwargs):
+    return [t["name"] for t in kwargs["tool_choice"]["tools"]]
+
+
+def _session_data(kwargs):
+    text = next(i["content"] for i in kwargs["input"] if str(i.get("content", "")).startswith("[DADOS"))
+    return json.loads(text.removeprefix("[DADOS DA SESSÃO] "))
+
+
+class TestLocalTools:
+    def test_pure_tools_removed_and_approval_precomputed(self, responses):
+        negotiator.negotiate(_state(), local_tools=True, max_tool_rounds=0)
+        sent = responses.calls[0]
+        assert sent["tool_choice"] == "none"  # sem rodadas: resposta direta
+        data = _session_data(sent)
+        # Preço desta mensagem (6000) acima do ceiling: precisa de aprovação
+        assert data["oferta_influenciador"] == 6000.0
+        assert data["requer_aprovacao"] is True
+
+    def test_allowed_tools_exclude_pure(self, responses):
+        negotiator.negotiate(_state(), local_tools=True, max_tool_rounds=1)
+        allowed = _allowed(responses.calls[0])
+        assert not set(allowed) & set(negotiator.PURE_TOOLS)
+        assert "confirm_deal" in allowed and "retrieve_benchmarks" in allowed
+        # A lista completa continua sendo enviada (prefixo estável para o cache)
+        assert responses.calls[0]["tools"] is negotiator.ALL_TOOLS
+
+    def test_llm_mode_keeps_pure_tools_and_context(self, responses):
+        negotiator.negotiate(_state(), max_tool_rounds=1)
+        assert set(negotiator.PURE_TOOLS) <= set(_allowed(responses.calls[0]))
+        assert "requer_aprovacao" not in _session_data(responses.calls[0])
+
+
+class TestToolRoundCap:
+    def test_cap_forces_text_answer(self, responses):
+        result = negotiator.negotiate(_state(), max_tool_rounds=2)
+        assert [c["tool_choice"] == "none" for c in responses.calls] == [False, False, True]
+        assert result["messages"][0].content.startswith("Fechamos em R$ 4.000,00?")
+        counters = metrics.counter_summary()
+        assert counters[("tool_rounds", (("kind", "pure"), ("node", "-")))] == 2
+        assert counters[("tool_loop_capped", (("call", "negotiate"), ("node", "-")))] == 1
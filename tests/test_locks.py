@@ -0,0 +1,104 @@
+"""Tests for the per-thread lock manager."""
+
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from app.core.locks import ThreadLockManager, ThreadLockTimeout
+from app.core.metrics import metrics
+
+
+@pytest.fixture
+def locks(tmp_path):
+    return ThreadLockManager(str(tmp_path / "threads.lock"), timeout_s=5)
+
+
+def _hold_in_child(path, thread_id, ready, release):
+    manager = ThreadLockManager(path, timeout_s=5)
+    with manager.hold(thread_id):
+        ready.set()
+        release.wait(10)
+
+
+class TestThreadLockManager:
+    def test_same_thread_id_serializes(self, locks):
+        active = []
+        overlaps = []
+
+        def turn():
+            with locks.hold("t1"):
+                active.append(1)
+                overlaps.append(len(active))
+                time.sleep(0.02)
+                active.pop()
+
+        workers = [threading.Thread(target=turn) for _ in range(4)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        assert max(overlaps) == 1
+
+    def test_other_threads_not_blocked(self, locks):
+        with locks.hold("t1"):
+            done = threading.Event()
+
+            def other():
+                with locks.hold("t2", timeout=0.5):
+                    done.set()
+
+            worker = threading.Thread(target=other)
+            worker.start()
+            worker.join()
+            assert done.is_set()
+
+    def test_timeout_in_process(self, locks):
+        held = threading.Event()
+        release = threading.Event()
+
+        def holder():
+            with locks.hold("t1"):
+                held.set()
+                release.wait(5)
+
+        worker = threading.Thread(target=holder)
+        worker.start()
+        held.wait(5)
+        with pytest.raises(ThreadLockTimeout):
+            with locks.hold("t1", timeout=0.05):
+                pass
+        release.set()
+        worker.join()
+
+    def test_reentrant_in_same_thread(self, locks):
+        with locks.hold("t1"):
+            with locks.hold("t1", timeout=0.05):
+                assert locks.held() == ["t1"]
+        assert locks.held() == []
+
+    def test_cross_process(self, locks):
+        ctx = multiprocessing.get_context("fork")
+        ready, release = ctx.Event(), ctx.Event()
+        child = ctx.Process(target=_hold_in_child, args=(locks.path, "t1", ready, release))
+        child.start()
+        try:
+            assert ready.wait(10)
+            with pytest.raises(ThreadLockTimeout):
+                with locks.hold("t1", timeout=0.1):
+                    pass
+            # Outra conversa no mesmo arquivo continua livre
+            with locks.hold("t2", timeout=0.1):
+                pass
+        finally:
+            release.set()
+            child.join(10)
+        with locks.hold("t1", timeout=1):
+            pass
+
+    def test_records_wait_metrics(self, locks):
+        metrics.clear()
+        with locks.hold("t1"):
+            pass
+        assert ("lock_wait_ms", ()) in metrics.observation_summary()
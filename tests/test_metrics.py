@@ -0,0 +1,91 @@
+"""Tests for the in-process metrics registry."""
+
+import pytest
+
+from app.core.metrics import (
+    MetricsRegistry,
+    current_node,
+    metrics,
+    node_scope,
+    percentile,
+    timed_node,
+)
+
+
+class TestPercentile:
+    def test_empty(self):
+        assert percentile([], 50) == 0.0
+
+    def test_single_value(self):
+        assert percentile([7.0], 99) == 7.0
+
+    def test_interpolates(self):
+        values = [1.0, 2.0, 3.0, 4.0, 5.0]
+        assert percentile(values, 50) == 3.0
+        assert percentile(values, 100) == 5.0
+        assert percentile(values, 95) == pytest.approx(4.8)
+
+
+class TestMetricsRegistry:
+    def test_node_summary(self):
+        reg = MetricsRegistry()
+        for ms in (10, 20, 30, 40):
+            reg.record_node("qualify", ms / 1000)
+        summary = reg.node_summary()["qualify"]
+        assert summary["count"] == 4
+        assert summary["p50"] == pytest.approx(25.0)
+
+    def test_llm_summary_groups_by_node_and_model(self):
+        reg = MetricsRegistry()
+        reg.record_llm_call(
+            node="negotiate", call="negotiate", model="gpt-4o-mini",
+            duration_s=0.5, input_tokens=100, output_tokens=20,
+        )
+        reg.record_llm_call(
+            node="negotiate", call="negotiate", model="gpt-4o-mini",
+            duration_s=0.7, input_tokens=150, output_tokens=30,
+        )
+        s = reg.llm_summary()[("negotiate", "gpt-4o-mini")]
+        assert s["calls"] == 2
+        assert s["input_tokens"] == 250
+        assert s["output_tokens"] == 50
+
+    def test_prometheus_export(self):
+        reg = MetricsRegistry()
+        reg.record_node("price", 0.002)
+        text = reg.to_prometheus()
+        assert 'negotiator_node_duration_ms{node="price",quantile="0.95"}' in text
+        assert 'negotiator_node_duration_ms_count{node="price"} 1' in text
+
+    def test_flush_and_load_roundtrip(self, tmp_path):
+        path = tmp_path / "metrics.jsonl"
+        reg = MetricsRegistry()
+        reg.record_node("qualify", 0.01)
+        assert reg.flush(str(path)) == 1
+        # Segundo flush sem eventos novos não duplica linhas
+        assert reg.flush(str(path)) == 0
+        reg.record_node("negotiate", 0.02)
+        assert reg.flush(str(path)) == 1
+
+        loaded = MetricsRegistry.load_jsonl(str(path))
+        assert set(loaded.node_summary()) == {"qualify", "negotiate"}
+
+
+class TestTimedNode:
+    def test_records_duration_and_sets_node(self):
+        seen = {}
+
+        def node(state):
+            seen["node"] = current_node()
+            return {"ok": True}
+
+        before = len(metrics.events("node"))
+        assert timed_node("price", node)({}) == {"ok": True}
+        assert seen["node"] == "price"
+        assert current_node() is None
+        assert len(metrics.events("node")) == before + 1
+
+    def test_node_scope(self):
+        with node_scope("greeting"):
+            assert current_node() == "greeting"
+        assert current_node() is None
@@ -0,0 +1,151 @@
+"""Tests for Orchestrator turns against a stub LLM client and temporary databases."""
+
+import time
+from dataclasses import replace
+
+import httpx
+import openai
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.agents.negotiator import build_graph
+from app.core.checkpoints import open_checkpointer
+from app.core.inbox import InboundMessage, OrchestratorHandler
+from app.core.locks import ThreadLockManager
+from app.core.orchestrator import FALLBACK_RESPONSE, Orchestrator
+from app.core.registry import registry
+from app.core.resources import SharedResources
+from app.db.models import Message
+from app.db.session import init_db
+from benchmarks.stub_llm import StubClient
+
+PHONE = "+5511999990000"
+QUALIFYING = "Oi, sou a Maria, faço 2 reels no instagram de fitness, 100k views, prazo 30 dias"
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/responses")
+
+
+class _Broken:
+    """``responses.create`` que falha com *error* (depois de esperar *delay_s*)."""
+
+    def __init__(self, error: Exception, delay_s: float = 0.0):
+        self.error = error
+        self.delay_s = delay_s
+
+    def create(self, **kwargs):
+        time.sleep(self.delay_s)
+        raise self.error
+
+
+class _Stalled:
+    """``responses.create`` que nunca responde: espera o timeout da tentativa e estoura."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, timeout, **kwargs):
+        self.calls += 1
+        time.sleep(timeout)
+        raise openai.APITimeoutError(request=REQUEST)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = StubClient()
+    monkeypatch.setattr(openai, "OpenAI", lambda *a, **k: client)
+    return client
+
+
+@pytest.fixture
+def resources(tmp_path, monkeypatch, client):
+    engine = create_engine(f"sqlite:///{tmp_path}/n.db")
+    init_db(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr("app.tools.retrieval.SessionLocal", factory)
+    monkeypatch.setattr("app.core.metrics.METRICS_FILE", str(tmp_path / "m.jsonl"))
+    monkeypatch.setattr("app.core.orchestrator.thread_locks", ThreadLockManager(path=None))
+    base = registry.get("negotiator")
+    # Sem retries e com prazo curto: um LLM travado vira fallback rápido
+    agent_config = replace(base, config={
+        **base.config,
+        "llm_policies": {"default": {"deadline_s": 0.5, "attempt_timeout_s": 0.2, "max_retries": 0}},
+    })
+    with open_checkpointer(str(tmp_path / "c.sqlite"), max_bytes=0, shards=1) as saver:
+        yield SharedResources(
+            agent_config=agent_config,
+            checkpointer=saver,
+            graph=build_graph(checkpointer=saver, agent_config=agent_config),
+            session_factory=factory,
+        )
+
+
+@pytest.fixture
+def orch(resources):
+    orch = Orchestrator(resources=resources)
+    yield orch
+    orch.close()
+
+
+def _inbound(msg_id: int, body: str, attempts: int = 1) -> InboundMessage:
+    return InboundMessage(id=msg_id, ordering_key=f"negotiator:{PHONE}", agent_id="negotiator",
+                          phone=PHONE, body=body, attempts=attempts, enqueued_at=0.0, started_at=0.0)
+
+
+def _user_messages(orch, conversation_id: int) -> list[str]:
+    return list(orch.db_session.scalars(
+        select(Message.content).where(Message.conversation_id == conversation_id, Message.role == "user")
+    ))
+
+
+class TestInboundRetry:
+    def test_retry_does_not_duplicate_user_message(self, resources, client):
+        handler = OrchestratorHandler(resources=resources)
+        body = QUALIFYING
+        client.responses = _Broken(ValueError("falha inesperada"))
+        with pytest.raises(ValueError):
+            handler(_inbound(1, body))
+        handler.orchestrator.db_session.rollback()
+
+        client.responses = StubClient().responses
+        result = handler(_inbound(1, body, attempts=2))
+        assert result["response"]
+        orch = handler.orchestrator
+        conv = orch.start_or_resume_conversation(PHONE)["conversation"]
+        assert _user_messages(orch, conv.id) == [body]
+        state = orch.graph.get_state({"configurable": {"thread_id": conv.thread_id}}).values
+        assert [m.content for m in state["messages"] if m.type == "human"] == [body]
+        handler.close()
+
+
+class TestLlmFallback:
+    @pytest.mark.parametrize("error", [
+        openai.AuthenticationError("chave inválida", response=httpx.Response(401, request=REQUEST), body=None),
+        openai.APITimeoutError(request=REQUEST),
+    ])
+    def test_message_falls_back(self, orch, client, error):
+        started = orch.start_or_resume_conversation(PHONE)
+        conv = started["conversation"]
+        client.responses = _Broken(error)
+        result = orch.process_message(conv.thread_id, conv.id, QUALIFYING, influencer_id=started["influencer"].id)
+        assert result == {"response": FALLBACK_RESPONSE, "owner": "agent", "approval_required": False}
+        assert _user_messages(orch, conv.id) == [QUALIFYING]
+
+    @pytest.mark.parametrize("decision", [{"approved": False}, {"approved": False, "counter_offer_brl": 9000.0}])
+    def test_approval_resume_falls_back(self, orch, client, decision):
+        started = orch.start_or_resume_conversation(PHONE)
+        conv = started["conversation"]
+        orch.process_message(conv.thread_id, conv.id, QUALIFYING, influencer_id=started["influencer"].id)
+        # Proposta fora da faixa aguardando o operador
+        config = {"configurable": {"thread_id": conv.thread_id}}
+        orch.graph.update_state(config, {"approval_required": True, "current_offer_brl": 50_000.0}, as_node="negotiate")
+        orch.graph.invoke(None, config)
+        assert orch.graph.get_state(config).next == ("approval",)
+
+        client.responses = _Stalled()
+        result = orch.handle_approval(conv.thread_id, decision, conversation_id=conv.id)
+        assert client.responses.calls >= 1
+        assert result == {"response": FALLBACK_RESPONSE, "owner": "agent", "approval_required": False}
+        last = orch.db_session.scalars(
+            select(Message.content).where(Message.conversation_id == conv.id).order_by(Message.id.desc())
+        ).first()
+        assert last == FALLBACK_RESPONSE
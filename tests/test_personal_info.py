@@ -0,0 +1,76 @@
+"""Tests for the local post-deal validators and reply templates."""
+
+import pytest
+
+from app.tools.personal_info import (
+    DONE_TEMPLATE,
+    clean_personal_fields,
+    format_phone_model,
+    parse_personal_info,
+    render_post_deal_reply,
+    valid_cpf,
+)
+
+
+class TestValidCpf:
+    @pytest.mark.parametrize("cpf", ["529.982.247-25", "52998224725", "111.444.777-35"])
+    def test_valid(self, cpf):
+        assert valid_cpf(cpf)
+
+    @pytest.mark.parametrize("cpf", ["529.982.247-24", "111.111.111-11", "1234567890", ""])
+    def test_invalid(self, cpf):
+        assert not valid_cpf(cpf)
+
+
+class TestParsePersonalInfo:
+    def test_email_and_cpf(self):
+        parsed = parse_personal_info("meu email é Ana.Silva@Gmail.com e cpf 52998224725")
+        assert parsed.fields == {"email": "ana.silva@gmail.com", "cpf": "529.982.247-25"}
+        assert not parsed.needs_llm({})
+
+    def test_invalid_cpf_is_flagged_not_sent_to_llm(self):
+        parsed = parse_personal_info("cpf 529.982.247-24")
+        assert "cpf" not in parsed.fields
+        assert parsed.invalid == ["cpf"]
+        assert not parsed.needs_llm({})
+
+    def test_address_needs_street_number_and_cep(self):
+        parsed = parse_personal_info("Av. Paulista 1000\n01310-100")
+        assert parsed.fields["address"] == "Av. Paulista 1000, CEP 01310-100"
+        assert parse_personal_info("meu cep é 01310-100").invalid == ["address"]
+
+    def test_phone_model_from_catalog(self):
+        assert parse_personal_info("tenho um iphone 15 pro max").fields == {"phone_model": "iPhone 15 Pro Max"}
+        assert format_phone_model("samsung galaxy s24") == "Samsung Galaxy S24"
+
+    def test_unknown_phone_falls_back_to_llm(self):
+        parsed = parse_personal_info("uso um celular da positivo")
+        assert parsed.unresolved == ["phone_model"]
+        assert parsed.needs_llm({})
+        assert not parsed.needs_llm({"phone_model": "iPhone 13"})
+
+    def test_question_detected(self):
+        assert parse_personal_info("quando vocês enviam o produto?").is_question
+
+
+class TestCleanPersonalFields:
+    def test_drops_invalid_values(self):
+        cleaned = clean_personal_fields(
+            {"email": "ana@", "cpf": "52998224725", "address": "", "phone_model": "Moto G84"}
+        )
+        assert cleaned == {"cpf": "529.982.247-25", "phone_model": "Moto G84"}
+
+
+class TestRenderPostDealReply:
+    def test_done(self):
+        assert render_post_deal_reply("Ana", ["cpf"], []) == DONE_TEMPLATE.format(name="Ana")
+
+    def test_asks_missing_and_flags_invalid(self):
+        reply = render_post_deal_reply("Ana", ["email"], ["cpf", "address"], ["cpf"])
+        assert "Ana" in reply
+        assert "CPF informado não passou" in reply
+        assert "endereço completo" in reply
+
+    def test_templates_rotate(self):
+        replies = {render_post_deal_reply("Ana", ["email"], ["cpf"], turn=t) for t in range(3)}
+        assert len(replies) == 3
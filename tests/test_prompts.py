@@ -0,0 +1,79 @@
+"""Tests for the cache-friendly prompt layout."""
+
+import json
+
+from app.agents.negotiator import (
+    ALL_TOOLS,
+    SYSTEM_PROMPT,
+    _allow_tools,
+    _build_context,
+    _session_input,
+)
+
+
+def _state(**overrides):
+    state = {
+        "thread_id": "t1",
+        "name": "Maria",
+        "platform": "instagram",
+        "deliverable_type": "reel",
+        "avg_views": 100_000,
+        "qty": 2,
+        "suggested_range": {"floor": 5600.0, "target": 8000.0, "ceiling": 10400.0},
+        "benchmarks": {"count": 3, "avg_cpm": 40.0, "median_price": 4000.0, "samples": []},
+        "current_offer_brl": 9000.0,
+    }
+    state.update(overrides)
+    return state
+
+
+class TestStaticPrefix:
+    def test_system_prompt_has_no_placeholders(self):
+        assert "{context}" not in SYSTEM_PROMPT
+
+    def test_tool_names_are_unique(self):
+        names = [t["name"] for t in ALL_TOOLS]
+        assert len(names) == len(set(names))
+
+    def test_allow_tools(self):
+        assert _allow_tools() == "none"
+        choice = _allow_tools("extract_info")
+        assert choice["type"] == "allowed_tools"
+        assert choice["tools"] == [{"type": "function", "name": "extract_info"}]
+
+
+class TestBuildContext:
+    def test_compact_json(self):
+        ctx = _build_context(_state())
+        assert ctx.startswith("[DADOS DA SESSÃO] ")
+        payload = ctx.split(" ", 3)[-1]
+        data = json.loads(payload)
+        assert data["faixa"] == {"ceiling": 10400.0, "floor": 5600.0, "target": 8000.0}
+        assert data["oferta_influenciador"] == 9000.0
+        assert ", " not in payload and ": " not in payload
+
+    def test_deterministic_regardless_of_dict_order(self):
+        a = _build_context(_state())
+        b = _build_context(
+            _state(suggested_range={"ceiling": 10400.0, "target": 8000.0, "floor": 5600.0})
+        )
+        assert a == b
+
+    def test_missing_offer_is_explicit_null(self):
+        ctx = _build_context(_state(current_offer_brl=None))
+        assert '"oferta_influenciador":null' in ctx
+
+    def test_samples_not_included(self):
+        ctx = _build_context(_state())
+        assert "samples" not in ctx
+
+
+class TestSessionInput:
+    def test_dynamic_items_go_last(self):
+        history = [{"role": "user", "content": "oi"}]
+        items = _session_input(history, "[DADOS DA SESSÃO] {}", "responda")
+        assert items[0] == history[0]
+        assert items[-2]["content"] == "[DADOS DA SESSÃO] {}"
+        assert items[-1]["content"] == "[TAREFA] responda"
+        # Não altera a lista original
+        assert len(history) == 1
@@ -0,0 +1,91 @@
+"""Tests for the qualify node call modes (single call vs. two calls)."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents import negotiator
+
+
+class _Item(SimpleNamespace):
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class _StubResponses:
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(output=self.outputs.pop(0), usage=None)
+
+
+def _function_call(name, args):
+    return _Item(type="function_call", name=name, arguments=json.dumps(args), call_id="c1")
+
+
+def _text(text):
+    return _Item(type="message", content=[SimpleNamespace(text=text)])
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    def install(*outputs):
+        responses = _StubResponses(outputs)
+        client = SimpleNamespace(responses=responses)
+        monkeypatch.setattr(negotiator.openai, "OpenAI", lambda *a, **k: client)
+        return responses
+
+    return install
+
+
+def _state(message):
+    return {"thread_id": "t1", "last_user_message": message, "conversation_history": []}
+
+
+class TestQualifySingleCall:
+    def test_one_round_trip_when_fields_missing(self, stub_llm):
+        responses = stub_llm(
+            [_function_call("qualify_turn", {"name": "Ana", "reply": "Oi Ana! Qual a plataforma?"})]
+        )
+        result = negotiator.qualify(_state("oi, sou a Ana"), single_call=True)
+        assert len(responses.calls) == 1
+        assert result["name"] == "Ana"
+        assert result["qualification_complete"] is False
+        assert result["messages"][0].content.startswith("Oi Ana! Qual a plataforma?")
+
+    def test_falls_back_to_two_calls(self, stub_llm):
+        responses = stub_llm(
+            [_text("sem tool")],
+            [_function_call("extract_info", {"name": "Ana"})],
+            [_text("Qual a plataforma?")],
+        )
+        result = negotiator.qualify(_state("oi, sou a Ana"), single_call=True)
+        assert len(responses.calls) == 3
+        assert result["name"] == "Ana"
+        assert result["messages"][0].content.startswith("Qual a plataforma?")
+
+    def test_complete_qualification_discards_reply(self, stub_llm):
+        fields = {
+            "name": "Ana", "platform": ["instagram"], "deliverable_type": "reel",
+            "avg_views": 100_000, "qty": 2, "deadline": "30 dias", "reply": "ok",
+        }
+        stub_llm([_function_call("qualify_turn", fields)])
+        result = negotiator.qualify(_state("..."), single_call=True)
+        assert result["qualification_complete"] is True
+        assert "messages" not in result
+        assert result["platform_details"] == {"instagram": {"qty": 2, "avg_views": 100_000}}
+
+
+class TestQualifyTwoCalls:
+    def test_default_mode_uses_two_calls(self, stub_llm):
+        responses = stub_llm(
+            [_function_call("extract_info", {"name": "Ana"})],
+            [_text("Qual a plataforma?")],
+        )
+        negotiator.qualify(_state("oi, sou a Ana"))
+        assert [c["tool_choice"] for c in responses.calls][1] == "none"
+        assert len(responses.calls) == 2
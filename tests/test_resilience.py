@@ -0,0 +1,148 @@
+"""Tests for the LLM call policy: retries, deadlines and hedging."""
+
+import threading
+import time
+
+import httpx
+import openai
+import pytest
+
+from app.core.metrics import metrics, node_scope
+from app.core.resilience import (
+    CallPolicy,
+    LlmDeadlineExceeded,
+    LlmUnavailable,
+    build_policies,
+    call_with_policy,
+    is_retryable,
+    latencies,
+    policy_scope,
+)
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/responses")
+
+
+def _status_error(status: int) -> openai.APIStatusError:
+    return openai.APIStatusError("erro", response=httpx.Response(status, request=REQUEST), body=None)
+
+
+class _Flaky:
+    """Falha as primeiras *failures* chamadas com *error*, depois responde."""
+
+    def __init__(self, failures: int, error: Exception):
+        self.failures = failures
+        self.error = error
+        self.timeouts = []
+
+    def __call__(self, timeout):
+        self.timeouts.append(timeout)
+        if len(self.timeouts) <= self.failures:
+            raise self.error
+        return "ok"
+
+
+@pytest.fixture(autouse=True)
+def clean():
+    metrics.clear()
+    latencies.clear()
+    yield
+    latencies.clear()
+
+
+class TestRetries:
+    @pytest.mark.parametrize("error", [
+        openai.APITimeoutError(request=REQUEST),
+        openai.APIConnectionError(request=REQUEST),
+        _status_error(429),
+        _status_error(503),
+    ])
+    def test_retryable_errors(self, error):
+        assert is_retryable(error)
+
+    @pytest.mark.parametrize("error", [_status_error(400), _status_error(401), ValueError("x")])
+    def test_non_retryable_errors(self, error):
+        assert not is_retryable(error)
+
+    def test_retries_then_succeeds(self):
+        fn = _Flaky(2, openai.APITimeoutError(request=REQUEST))
+        sleeps = []
+        policy = CallPolicy(max_retries=2, attempt_timeout_s=5.0)
+        assert call_with_policy(fn, "negotiate", policy, sleep=sleeps.append) == "ok"
+        assert len(fn.timeouts) == 3
+        # Jitter completo: cada espera entre 0 e o teto exponencial
+        assert 0 <= sleeps[0] <= 0.5 and 0 <= sleeps[1] <= 1.0
+        assert metrics.counter_summary()[("llm_retries", (
+            ("call", "negotiate"), ("node", "-"), ("reason", "APITimeoutError")))] == 2
+
+    def test_exhausted_retries_raise_unavailable(self):
+        fn = _Flaky(5, _status_error(500))
+        with pytest.raises(LlmUnavailable):
+            call_with_policy(fn, "negotiate", CallPolicy(max_retries=1), sleep=lambda s: None)
+        assert len(fn.timeouts) == 2
+
+    def test_non_retryable_propagates(self):
+        fn = _Flaky(1, _status_error(400))
+        with pytest.raises(openai.APIStatusError):
+            call_with_policy(fn, "negotiate", CallPolicy(), sleep=lambda s: None)
+        assert len(fn.timeouts) == 1
+        assert metrics.counter_summary()[("llm_errors", (
+            ("call", "negotiate"), ("node", "-"), ("reason", "APIStatusError")))] == 1
+
+
+class TestDeadline:
+    def test_attempt_timeout_capped_by_node_deadline(self):
+        fn = _Flaky(0, None)
+        with policy_scope(CallPolicy(deadline_s=3.0, attempt_timeout_s=20.0)):
+            call_with_policy(fn, "negotiate")
+        assert 0 < fn.timeouts[0] <= 3.0
+
+    def test_blown_deadline_raises(self):
+        def slow_failure(timeout):
+            time.sleep(0.06)
+            raise TimeoutError()
+
+        policy = CallPolicy(deadline_s=0.1, max_retries=5, backoff_base_s=0.0)
+        with policy_scope(policy), pytest.raises(LlmDeadlineExceeded):
+            call_with_policy(slow_failure, "negotiate", sleep=lambda s: None)
+
+
+class TestHedging:
+    def test_hedge_wins_when_primary_is_slow(self):
+        with node_scope("negotiate"):
+            for _ in range(20):
+                latencies.record(("negotiate", "negotiate"), 0.01)
+            release = threading.Event()
+            calls = []
+
+            def fn(timeout):
+                calls.append(timeout)
+                if len(calls) == 1:
+                    release.wait(2)  # primeira tentativa "pendurada"
+                    return "lenta"
+                return "rápida"
+
+            started = time.monotonic()
+            result = call_with_policy(fn, "negotiate", CallPolicy(hedge=True))
+            release.set()
+        assert result == "rápida"
+        assert time.monotonic() - started < 1.0
+        counters = metrics.counter_summary()
+        assert counters[("llm_hedge_wins", (("call", "negotiate"), ("node", "negotiate"), ("winner", "hedge")))] == 1
+
+    def test_no_hedge_without_enough_samples(self):
+        calls = []
+        assert call_with_policy(lambda t: calls.append(t) or "ok", "negotiate", CallPolicy(hedge=True)) == "ok"
+        assert len(calls) == 1
+        assert not any(name == "llm_hedges" for name, _ in metrics.counter_summary())
+
+
+class TestBuildPolicies:
+    def test_nodes_inherit_default(self):
+        policies = build_policies({"default": {"max_retries": 0}, "negotiate": {"hedge": True}})
+        assert policies["default"].max_retries == 0
+        assert policies["negotiate"].max_retries == 0 and policies["negotiate"].hedge
+        assert not policies["default"].hedge
+
+    def test_unknown_field(self):
+        with pytest.raises(ValueError):
+            build_policies({"negotiate": {"hedging": True}})
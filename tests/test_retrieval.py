@@ -4,9 +4,12 @@ import pytest
 
 from app.db.models import Base, Deal
 from app.db.session import get_engine
-from app.tools.retrieval import retrieve_benchmarks
+from app.agents import negotiator
+from app.core.metrics import metrics
+from app.core.store import save_deal
+from app.tools.retrieval import BenchmarkMemo, benchmark_generation, retrieve_benchmarks
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 
 
 @pytest.fixture
@@ -73,3 +76,107 @@ class TestRetrieveBenchmarks:
         # 80_000 is closer to 85_000 than 100_000
         assert result["samples"][0]["avg_views"] == 80_000
         assert result["samples"][1]["avg_views"] == 100_000
+
+
+def _count_deal_queries(session):
+    statements = []
+    event.listen(
+        session.get_bind(), "before_cursor_execute",
+        lambda conn, cursor, statement, *a: statements.append(statement) if "FROM deals" in statement else None,
+    )
+    return statements
+
+
+class TestBenchmarkMemo:
+    def test_repeated_calls_hit_memo(self, db_session):
+        queries = _count_deal_queries(db_session)
+        memo = BenchmarkMemo()
+        first = memo.get(platform="instagram", deliverable_type="reel", avg_views=90_000, session=db_session)
+        issued = len(queries)
+        # Mesmos argumentos, com outra grafia: normalizados para a mesma chave
+        again = memo.get(platform=" Instagram", deliverable_type="REEL", avg_views=90_000.0, session=db_session)
+        assert again == first
+        assert len(queries) == issued
+        assert (memo.hits, memo.misses) == (1, 1)
+
+    def test_state_roundtrip_keeps_entries(self, db_session):
+        memo = BenchmarkMemo()
+        memo.get(platform="tiktok", deliverable_type="video", avg_views=150_000, session=db_session)
+        restored = BenchmarkMemo(memo.to_state())
+        queries = _count_deal_queries(db_session)
+        stats = restored.get(platform="tiktok", deliverable_type="video", avg_views=150_000,
+                             session=db_session, samples=False)
+        assert queries == [] and restored.hits == 1
+        assert stats["count"] == 1 and "samples" not in stats
+        assert not restored.changed
+
+    def test_samples_stay_out_of_state(self, db_session):
+        memo = BenchmarkMemo()
+        full = memo.get(platform="instagram", deliverable_type="reel", avg_views=90_000, session=db_session)
+        (entry,) = memo.to_state()["entries"].values()
+        assert "samples" not in entry and len(entry["sample_ids"]) == 2
+
+        # Em outro turno as amostras voltam por chave primária, uma consulta só
+        restored = BenchmarkMemo(memo.to_state())
+        queries = _count_deal_queries(db_session)
+        again = restored.get(platform="instagram", deliverable_type="reel", avg_views=90_000, session=db_session)
+        assert again == full
+        assert len(queries) == 1 and "deals.id IN" in queries[0]
+
+    def test_old_entries_with_samples_are_dropped(self):
+        old = {"generation": 0, "entries": {"instagram|reel|None|1000|5": {"count": 0, "samples": []}}}
+        assert BenchmarkMemo(old).entries == {}
+
+    def test_save_deal_invalidates(self, db_session):
+        memo = BenchmarkMemo()
+        before = memo.get(platform="instagram", deliverable_type="reel", avg_views=90_000, session=db_session)
+        save_deal(db_session, {
+            "influencer_name": "Nova", "platform": "instagram", "niche": "fitness",
+            "deliverable_type": "reel", "avg_views": 90_000, "final_price_brl": 5000.0, "cpm_brl": 55.56,
+        })
+        db_session.commit()
+        assert benchmark_generation(db_session) == 1
+
+        stale = BenchmarkMemo(memo.to_state())
+        after = stale.get(platform="instagram", deliverable_type="reel", avg_views=90_000, session=db_session)
+        assert after["count"] == before["count"] + 1
+        assert stale.misses == 1 and stale.generation == 1
+
+    def test_max_entries_drops_oldest(self, db_session):
+        memo = BenchmarkMemo(max_entries=2)
+        for views in (1_000, 2_000, 3_000):
+            memo.get(platform="instagram", deliverable_type="reel", avg_views=views, session=db_session)
+        assert len(memo.entries) == 2
+        assert not any(key.endswith("|1000|5") for key in memo.entries)
+
+
+class TestNodeMemo:
+    def test_node_returns_memo_and_reuses_it(self, db_session, monkeypatch):
+        monkeypatch.setattr("app.tools.retrieval.SessionLocal", lambda: db_session)
+        monkeypatch.setattr(db_session, "close", lambda: None)
+        metrics.clear()
+        state = {"platform": "instagram", "deliverable_type": "reel", "avg_views": 90_000, "niche": "fitness"}
+
+        first = negotiator.retrieve_benchmarks_node(state)
+        assert first["benchmarks"]["count"] == 2
+        memo = first["benchmark_memo"]
+
+        queries = _count_deal_queries(db_session)
+        second = negotiator.retrieve_benchmarks_node({**state, "benchmark_memo": memo})
+        assert second["benchmarks"] == first["benchmarks"]
+        assert "benchmark_memo" not in second  # nada novo a gravar
+        assert queries == []
+
+        assert "samples" not in first["benchmarks"]
+
+        # A tool chamada pelo LLM durante a negociação usa o mesmo memo e só
+        # busca as amostras (por chave primária)
+        args = {"platform": "instagram", "deliverable_type": "reel", "avg_views": 90_000, "niche": "fitness"}
+        result = negotiator._dispatch_tool("retrieve_benchmarks", args, memo=BenchmarkMemo(memo))
+        assert {k: v for k, v in result.items() if k != "samples"} == first["benchmarks"]
+        assert [s["influencer"] for s in result["samples"]] == ["Test1", "Test2"]
+        assert len(queries) == 1
+
+        counters = metrics.counter_summary()
+        assert counters[("benchmark_memo", (("node", "retrieve_benchmarks"), ("result", "hit")))] == 1
+        assert counters[("benchmark_memo", (("node", "retrieve_benchmarks"), ("result", "miss")))] == 1
@@ -0,0 +1,66 @@
+"""Tests for per-node/per-call model routing."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents import negotiator
+from app.core.metrics import metrics, node_scope
+from app.core.routing import DEFAULT_MODEL, ModelRouter, router_scope
+
+SETTINGS = {
+    "default": {"model": "gpt-4.1-mini"},
+    "negotiate": {"max_output_tokens": 800},
+    "extract_fields": {"model": "gpt-4.1-nano", "max_output_tokens": 300,
+                       "reasoning": None},
+}
+
+
+class TestModelRouter:
+    def test_call_over_node_over_default(self):
+        router = ModelRouter(SETTINGS)
+        assert router.route("qualify", "extract_fields").model == "gpt-4.1-nano"
+        assert router.route("negotiate", "tool_loop").model == "gpt-4.1-mini"
+        assert router.route("negotiate", "tool_loop").max_output_tokens == 800
+        assert router.route("close", "post_deal").model == "gpt-4.1-mini"
+
+    def test_defaults_to_env_model(self):
+        route = ModelRouter().route("negotiate", "negotiate")
+        assert route.model == DEFAULT_MODEL
+        assert route.request_kwargs() == {}
+
+    def test_request_kwargs(self):
+        route = ModelRouter({"default": {"max_output_tokens": 100, "reasoning": {"effort": "minimal"}}}).default
+        assert route.request_kwargs() == {"max_output_tokens": 100, "reasoning": {"effort": "minimal"}}
+
+    def test_unknown_field(self):
+        with pytest.raises(ValueError):
+            ModelRouter({"negotiate": {"temperature": 0}})
+
+
+class _Responses:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(output=[], usage=None)
+
+
+class TestCreateResponseRouting:
+    def test_routed_model_reaches_api_and_metrics(self):
+        client = SimpleNamespace(responses=_Responses())
+        metrics.clear()
+        with router_scope(ModelRouter(SETTINGS)), node_scope("qualify"):
+            negotiator._create_response(client, "extract_fields", input=[])
+        sent = client.responses.calls[0]
+        assert sent["model"] == "gpt-4.1-nano"
+        assert sent["max_output_tokens"] == 300
+        assert "reasoning" not in sent
+        assert metrics.events("llm")[-1]["model"] == "gpt-4.1-nano"
+
+    def test_explicit_model_wins(self):
+        client = SimpleNamespace(responses=_Responses())
+        with router_scope(ModelRouter(SETTINGS)):
+            negotiator._create_response(client, "extract_fields", input=[], model="gpt-5")
+        assert client.responses.calls[0]["model"] == "gpt-5"
@@ -0,0 +1,86 @@
+"""Tests for the HTTP service routing and readiness handling."""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from app.server import BadRequest, NegotiatorService, NotFound, make_server
+
+
+class _FakeService(NegotiatorService):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def start_conversation(self, body):
+        self._check_ready()
+        if not body.get("phone"):
+            raise BadRequest("campo 'phone' é obrigatório")
+        self.calls.append(("start", body))
+        return {"conversation_id": 1, "thread_id": "t1", "resumed": False}
+
+    def message(self, conversation_id, body):
+        self._check_ready()
+        if conversation_id != 1:
+            raise NotFound("conversa não encontrada")
+        if body["message"] == "quebra":
+            # Erro dentro do turno (grafo, banco): falha do servidor, não do cliente
+            raise ValueError("estado inconsistente")
+        if body["message"] == "chave":
+            raise KeyError("thread_id")
+        self.calls.append(("message", conversation_id, body["message"]))
+        return {"response": "oi", "owner": "agent", "approval_required": False}
+
+    def _check_ready(self):
+        from app.server import NotReady
+
+        if not self.ready.is_set():
+            raise NotReady("preload em andamento")
+
+
+@pytest.fixture
+def server():
+    service = _FakeService()
+    srv = make_server(service, port=0)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield service, f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def _request(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method="POST" if data is not None else "GET")
+    try:
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read())
+
+
+class TestServer:
+    def test_not_ready_until_preload(self, server):
+        service, base = server
+        assert _request(f"{base}/healthz")[0] == 200
+        assert _request(f"{base}/readyz")[0] == 503
+        assert _request(f"{base}/conversations", {"phone": "+55"})[0] == 503
+
+    def test_routes_and_errors(self, server):
+        service, base = server
+        service.ready.set()
+        service.pool = type("P", (), {"available": lambda self: 4})()
+
+        assert _request(f"{base}/readyz") == (200, {"status": "ready", "pool_available": 4})
+        status, body = _request(f"{base}/conversations", {"phone": "+55"})
+        assert status == 200 and body["thread_id"] == "t1"
+        assert _request(f"{base}/conversations/1/messages", {"message": "oi"})[1]["response"] == "oi"
+        assert _request(f"{base}/conversations/2/messages", {"message": "oi"})[0] == 404
+        assert _request(f"{base}/conversations", {})[0] == 400
+        assert _request(f"{base}/conversations/1/messages", {"message": "quebra"}) == (500, {"error": "erro interno"})
+        assert _request(f"{base}/conversations/1/messages", {"message": "chave"})[0] == 500
+        assert _request(f"{base}/nada", {})[0] == 404
+        assert service.calls == [("start", {"phone": "+55"}), ("message", 1, "oi")]
@@ -0,0 +1,264 @@
+"""Tests for sharded conversation storage (DB_SHARDS > 1)."""
+
+import csv
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy import inspect as sa_inspect
+
+from app.core.accounting import conversation_costs
+from app.core.checkpoints import ShardedSaver, open_checkpointer
+from app.core.store import create_conversation, get_active_conversation, iter_conversation_summaries
+from app.db.export import export_tables
+from app.db.models import Agent, Conversation, Deal, Influencer, LlmCall, Message, Offer
+from app.db.shards import (
+    CATALOG,
+    ID_SPAN,
+    catalog_tables,
+    init_shard,
+    shard_for,
+    shard_of_id,
+    shard_path,
+    sharded_sessionmaker,
+)
+
+ROOT = Path(__file__).resolve().parents[1]
+BASE = datetime(2026, 1, 1)
+SHARDS = 3
+
+
+@pytest.fixture
+def factory(tmp_path):
+    catalog = create_engine(f"sqlite:///{tmp_path}/n.db")
+    catalog_tables()[0].metadata.create_all(catalog, tables=catalog_tables())
+    engines = []
+    for i in range(SHARDS):
+        engine = create_engine(shard_path(f"sqlite:///{tmp_path}/n.db", i))
+        init_shard(engine, i)
+        engines.append(engine)
+    return sharded_sessionmaker(catalog, engines)
+
+
+@pytest.fixture
+def seeded(factory):
+    """12 conversas de 6 influenciadores, com mensagens, ofertas e deals."""
+    session = factory()
+    agent = Agent(agent_id="negotiator", name="Negociador")
+    influencers = [Influencer(phone=f"+5511900000{i:03d}", name=f"Inf {i}") for i in range(6)]
+    session.add_all([agent, *influencers])
+    session.flush()
+    for i in range(12):
+        conv = create_conversation(session, agent, influencers[i % 6])
+        # Pares com o mesmo created_at: o keyset precisa desempatar pelo id
+        conv.created_at = BASE + timedelta(days=i // 2)
+        conv.status = "closed_deal" if i % 3 == 0 else "active"
+        session.flush()
+        session.add_all(
+            Message(conversation_id=conv.id, role="user", content="oi",
+                    created_at=BASE + timedelta(days=i, minutes=j))
+            for j in range(i)
+        )
+        session.add(Offer(conversation_id=conv.id, floor_brl=1, target_brl=2, ceiling_brl=3))
+        if i % 3 == 0:
+            session.add(Deal(influencer_name=f"Inf {i % 6}", platform="instagram", niche="moda",
+                             deliverable_type="reel", avg_views=1000, final_price_brl=100.0 * (i + 1),
+                             cpm_brl=1.0, thread_id=conv.thread_id))
+    session.commit()
+    session.close()
+    return factory
+
+
+def _count(session, model, shard) -> int:
+    return session.execute(select(func.count()).select_from(model), bind_arguments={"shard_id": shard}).scalar()
+
+
+class TestRouting:
+    def test_shard_for_is_stable(self):
+        assert shard_for("+5511999999999", 4) == shard_for("+5511999999999", 4)
+        assert {shard_for(f"t{i}", 4) for i in range(100)} == {0, 1, 2, 3}
+        assert shard_for("qualquer", 1) == 0
+
+    def test_shard_path(self):
+        assert shard_path("sqlite:///./data/n.db", 2) == "sqlite:///./data/n.shard2.db"
+        assert shard_path("/tmp/checkpoints.sqlite", 0) == "/tmp/checkpoints.shard0.sqlite"
+
+    def test_rows_land_on_the_phone_shard(self, seeded):
+        session = seeded()
+        for conv in session.scalars(select(Conversation)):
+            shard = shard_for(conv.thread_id, SHARDS)
+            assert shard == shard_for(conv.influencer.phone, SHARDS)
+            assert shard_of_id(conv.id) == shard
+            assert conv.id >= shard * ID_SPAN
+            assert {shard_of_id(m.id) for m in conv.messages} <= {shard}
+        assert sum(_count(session, Conversation, i) for i in range(SHARDS)) == 12
+        assert sum(_count(session, Message, i) for i in range(SHARDS)) == sum(range(12))
+        # O catálogo não recebe linhas de conversa
+        assert session.scalar(select(func.count()).select_from(Deal)) == 4
+        session.close()
+
+    def test_lookups_by_key_are_routed(self, seeded):
+        session = seeded()
+        conv = session.scalars(select(Conversation).order_by(Conversation.id.desc()).limit(1)).first()
+        thread_id, conv_id, messages = conv.thread_id, conv.id, len(conv.messages)
+        session.close()
+
+        queried = []
+        session = seeded()
+        real = session.execute_chooser
+        session.execute_chooser = lambda ctx: queried.append(real(ctx)) or queried[-1]
+        assert session.scalars(select(Conversation).filter_by(thread_id=thread_id)).one().id == conv_id
+        assert session.scalar(
+            select(func.count()).select_from(Message).where(Message.conversation_id == conv_id)
+        ) == messages
+        assert queried == [[shard_of_id(conv_id)]] * 2
+        session.close()
+
+
+    def test_active_conversation_by_phone_hits_one_shard(self, seeded):
+        session = seeded()
+        influencer = session.scalars(select(Influencer).filter_by(phone="+5511900000002")).one()
+        agent = session.scalars(select(Agent)).one()
+        queried = []
+        real = session.execute_chooser
+        session.execute_chooser = lambda ctx: queried.append(real(ctx)) or queried[-1]
+        conv = get_active_conversation(session, agent.id, influencer.id, phone=influencer.phone)
+        # Consulta presa ao shard do telefone: o execute_chooser nem é chamado
+        assert [q for q in queried if q != [CATALOG]] == []
+        assert conv.status == "active" and conv.influencer_id == influencer.id
+        shard = shard_for(influencer.phone, SHARDS)
+        assert sa_inspect(conv).identity_token == shard
+        # Lazy load segue para o mesmo shard
+        assert {shard_of_id(m.id) for m in conv.messages} <= {shard}
+        session.close()
+
+
+class TestShardedSummaries:
+    def test_same_order_as_single_database(self, seeded):
+        session = seeded()
+        rows = list(iter_conversation_summaries(session, limit=None))
+        assert [(r["created_at"], r["id"]) for r in rows] == sorted(
+            ((r["created_at"], r["id"]) for r in rows), reverse=True
+        )
+        assert len(rows) == 12
+        by_messages = {r["messages"]: r for r in rows}
+        assert sorted(by_messages) == list(range(12))
+        first = by_messages[0]
+        assert first["name"] == "Inf 0"
+        assert first["deal_value_brl"] == 100.0
+        assert first["last_message_at"] is None
+        assert by_messages[1]["deal_value_brl"] is None
+        session.close()
+
+    def test_pagination_and_filters(self, seeded):
+        session = seeded()
+        everything = [r["id"] for r in iter_conversation_summaries(session, limit=None)]
+        pages, after = [], None
+        while page := list(iter_conversation_summaries(session, after=after, limit=5)):
+            pages.append([r["id"] for r in page])
+            after = page[-1]["cursor"]
+        assert [len(p) for p in pages] == [5, 5, 2]
+        assert sum(pages, []) == everything
+
+        closed = list(iter_conversation_summaries(session, status="closed_deal", limit=None))
+        assert {r["messages"] for r in closed} == {0, 3, 6, 9}
+        phone = list(iter_conversation_summaries(session, phone="+5511900000001", limit=None))
+        assert sorted(r["messages"] for r in phone) == [1, 7]
+        assert list(iter_conversation_summaries(session, phone="+0", limit=None)) == []
+        session.close()
+
+
+class TestShardedReports:
+    def test_export_merges_shards(self, seeded, tmp_path):
+        out = tmp_path / "out"
+        counts = export_tables(str(out), chunk_size=4, incremental=True, session_factory=seeded)
+        assert counts == {"deals": 4, "conversations": 12, "messages": sum(range(12)), "offers": 12}
+        (path,) = (out / "messages").iterdir()
+        with open(path, newline="", encoding="utf-8") as fh:
+            rows = list(csv.DictReader(fh))
+        keys = [(r["created_at"], int(r["id"])) for r in rows]
+        assert keys == sorted(keys)
+        # Nada novo: a marca vale para todos os shards
+        counts = export_tables(str(out), chunk_size=4, incremental=True, session_factory=seeded)
+        assert set(counts.values()) == {0}
+
+    def test_conversation_costs_without_cross_shard_join(self, seeded):
+        session = seeded()
+        status = dict(session.execute(select(Conversation.thread_id, Conversation.status)).all())
+        threads = sorted(status)[:4]
+        session.add_all(
+            LlmCall(thread_id=t, node="negotiate", call_type="invoke", model="gpt-4o-mini", input_tokens=10,
+                    cached_tokens=0, output_tokens=5, cost_usd=0.01 * (i + 1))
+            for i, t in enumerate(threads)
+        )
+        session.commit()
+        rows = conversation_costs(session, limit=3)
+        assert [r["thread_id"] for r in rows] == threads[:0:-1]
+        assert [r["status"] for r in rows] == [status[t] for t in threads[:0:-1]]
+        deals = set(session.scalars(select(Deal.thread_id)))
+        assert [r["deals"] for r in rows] == [int(t in deals) for t in threads[:0:-1]]
+        session.close()
+
+
+def _config(thread_id: str, checkpoint_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": "", "checkpoint_id": checkpoint_id}}
+
+
+def _checkpoint(checkpoint_id: str) -> dict:
+    return {"v": 4, "id": checkpoint_id, "ts": "2026-10-19T00:00:00+00:00", "channel_values": {},
+            "channel_versions": {}, "versions_seen": {}, "updated_channels": None}
+
+
+class TestShardedSaver:
+    def test_routes_by_thread_and_lists_all(self, tmp_path):
+        path = str(tmp_path / "checkpoints.sqlite")
+        threads = [f"t{i}" for i in range(8)]
+        with open_checkpointer(path, max_bytes=1 << 20, shards=SHARDS) as saver:
+            assert isinstance(saver, ShardedSaver)
+            for n, thread_id in enumerate(threads):
+                saver.put(_config(thread_id, ""), _checkpoint(f"1f1cb6ff-0000-0000-0000-0000000000{n:02d}"),
+                          {"step": n}, {})
+            for n, thread_id in enumerate(threads):
+                shard = saver.savers[shard_for(thread_id, SHARDS)]
+                assert shard.get_tuple({"configurable": {"thread_id": thread_id}}).metadata["step"] == n
+                assert saver.get_tuple({"configurable": {"thread_id": thread_id}}).metadata["step"] == n
+            listed = [t.metadata["step"] for t in saver.list(None, limit=5)]
+            assert listed == [7, 6, 5, 4, 3]
+            saver.delete_thread("t0")
+            assert saver.get_tuple({"configurable": {"thread_id": "t0"}}) is None
+        assert all(Path(shard_path(path, i)).exists() for i in range(SHARDS))
+
+
+class TestShardedStartup:
+    def test_cli_with_db_shards(self, tmp_path):
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{tmp_path}/n.db",
+            "METRICS_FILE": str(tmp_path / "m.jsonl"),
+            "DB_SHARDS": "2",
+        }
+        code = (
+            "from typer.testing import CliRunner\n"
+            "from app.cli import app\n"
+            "from app.core.store import create_conversation, get_or_create_agent, get_or_create_influencer\n"
+            "from app.db.session import SessionLocal, init_db\n"
+            "init_db()\n"
+            "session = SessionLocal()\n"
+            "agent = get_or_create_agent(session, 'negotiator', 'Negociador')\n"
+            "for i in range(4):\n"
+            "    create_conversation(session, agent, get_or_create_influencer(session, f'+55119{i:08d}'))\n"
+            "session.commit()\n"
+            "session.close()\n"
+            "result = CliRunner().invoke(app, ['list-conversations'])\n"
+            "assert result.exit_code == 0, result.output\n"
+            "print(result.output)"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        )
+        assert out.stdout.count("+55119") == 4
+        assert (tmp_path / "n.shard0.db").exists() and (tmp_path / "n.shard1.db").exists()
@@ -0,0 +1,53 @@
+"""Import-time regression tests: DB-only commands must not load the LLM/graph stack."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ("openai", "langgraph", "langchain_core")
+
+
+def _run(code: str, tmp_path) -> set[str]:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path}/n.db",
+        "METRICS_FILE": str(tmp_path / "m.jsonl"),
+    }
+    script = code + "\nimport json, sys\nprint(json.dumps(sorted(sys.modules)))"
+    out = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return set(json.loads(out.stdout.strip().splitlines()[-1]))
+
+
+def _heavy(modules: set) -> list[str]:
+    return sorted(m for m in modules if m.split(".")[0] in HEAVY)
+
+
+class TestStartupImports:
+    def test_cli_import_is_light(self, tmp_path):
+        modules = _run("import app.cli", tmp_path)
+        assert _heavy(modules) == []
+        assert "sqlalchemy" not in modules
+
+    def test_db_commands_skip_llm_stack(self, tmp_path):
+        code = (
+            "from typer.testing import CliRunner\n"
+            "from app.cli import app\n"
+            "for cmd in (['seed'], ['list-conversations']):\n"
+            "    result = CliRunner().invoke(app, cmd)\n"
+            "    assert result.exit_code == 0, result.output"
+        )
+        assert _heavy(_run(code, tmp_path)) == []
+
+    def test_engine_created_lazily(self, tmp_path):
+        code = (
+            "import app.db.session as s\n"
+            "assert s._engine is None\n"
+            "s.SessionLocal().close()\n"
+            "assert s._engine is s.get_engine() is s.engine"
+        )
+        _run(code, tmp_path)
@@ -0,0 +1,75 @@
+"""Tests for the paginated conversation listing."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.store import iter_conversation_summaries
+from app.db.models import Agent, Base, Conversation, Deal, Influencer, Message
+
+BASE = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    agent = Agent(agent_id="negotiator", name="Negociador")
+    ana, bia = Influencer(phone="+1", name="Ana"), Influencer(phone="+2", name="Bia")
+    session.add_all([agent, ana, bia])
+    session.flush()
+    for i in range(6):
+        conv = Conversation(
+            thread_id=f"t{i}",
+            agent_id=agent.id,
+            influencer_id=(ana if i % 2 else bia).id,
+            status="closed_deal" if i % 3 == 0 else "active",
+            # Pares com o mesmo created_at: o keyset precisa desempatar pelo id
+            created_at=BASE + timedelta(days=i // 2),
+        )
+        session.add(conv)
+        session.flush()
+        for j in range(i):
+            session.add(
+                Message(conversation_id=conv.id, role="user", content="oi",
+                        created_at=BASE + timedelta(days=i, minutes=j))
+            )
+    session.add_all(
+        Deal(influencer_name="Bia", platform="instagram", niche="moda", deliverable_type="reel",
+             avg_views=1000, final_price_brl=price, cpm_brl=1.0, thread_id="t0")
+        for price in (1000.0, 500.0)
+    )
+    session.commit()
+    yield session
+    session.close()
+
+
+class TestIterConversationSummaries:
+    def test_aggregates(self, db_session):
+        rows = {r["thread_id"]: r for r in iter_conversation_summaries(db_session)}
+        assert rows["t0"]["messages"] == 0
+        assert rows["t0"]["deal_value_brl"] == 1500.0
+        assert rows["t5"]["messages"] == 5
+        assert rows["t5"]["last_message_at"] == BASE + timedelta(days=5, minutes=4)
+        assert rows["t5"]["deal_value_brl"] is None
+
+    def test_keyset_pages_cover_everything_once(self, db_session):
+        seen, cursor = [], None
+        while True:
+            page = list(iter_conversation_summaries(db_session, limit=4, after=cursor))
+            if not page:
+                break
+            seen += [r["thread_id"] for r in page]
+            cursor = page[-1]["cursor"]
+        assert seen == ["t5", "t4", "t3", "t2", "t1", "t0"]
+
+    def test_filters(self, db_session):
+        def ids(**filters):
+            return [r["thread_id"] for r in iter_conversation_summaries(db_session, limit=None, **filters)]
+
+        assert ids(status="closed_deal") == ["t3", "t0"]
+        assert ids(phone="+1") == ["t5", "t3", "t1"]
+        assert ids(since=BASE + timedelta(days=1), until=BASE + timedelta(days=2)) == ["t3", "t2"]
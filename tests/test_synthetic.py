@@ -0,0 +1,80 @@
+"""Tests for the synthetic deal generator."""
+
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from typer.testing import CliRunner
+
+from app.cli import app
+from app.db.models import Base, Deal
+from app.db.seed import SEED_DEALS
+from app.db.synthetic import SeedProfile, generate_deals, generate_rows
+
+NOW = datetime(2026, 1, 1)
+
+
+class TestGenerateRows:
+    def test_follows_seed_shape(self):
+        profile = SeedProfile()
+        rows = generate_rows(2_000, random.Random(1), profile, NOW, days=30)
+        seed_channels = {(plat, dtype) for _, plat, _, dtype, *_ in SEED_DEALS}
+        assert {(r["platform"], r["deliverable_type"]) for r in rows} <= seed_channels
+        assert {r["niche"] for r in rows} <= {niche for _, _, niche, *_ in SEED_DEALS}
+        assert all(NOW - timedelta(days=30) <= r["closed_at"] <= NOW for r in rows)
+        # CPM consistente com preço, views e quantidade
+        r = rows[0]
+        assert abs(r["cpm_brl"] - r["final_price_brl"] / (r["avg_views"] * r["qty"]) * 1000) < 0.01
+        # Mediana de CPM perto da do seed (log-normal calibrada)
+        cpms = sorted(r["cpm_brl"] for r in rows)
+        assert 25 < cpms[len(cpms) // 2] < 45
+
+    def test_seeded_is_reproducible(self):
+        profile = SeedProfile()
+        a = generate_rows(50, random.Random(7), profile, NOW)
+        b = generate_rows(50, random.Random(7), profile, NOW)
+        assert a == b
+
+
+class TestGenerateDeals:
+    def test_inserts_in_chunks(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        factory = sessionmaker(bind=engine)
+        progress = []
+        generate_deals(250, seed=3, chunk_size=100, session_factory=factory,
+                       on_progress=lambda done, _: progress.append(done))
+        assert progress == [100, 200, 250]
+        session = factory()
+        assert session.execute(select(func.count(Deal.id))).scalar_one() == 250
+        session.close()
+
+
+def _deal_count(url: str) -> int:
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.count(Deal.id))).scalar_one()
+    finally:
+        engine.dispose()
+
+
+class TestGenerateDealsCommand:
+    def test_refuses_agent_database(self, tmp_path, monkeypatch):
+        url = f"sqlite:///{tmp_path}/n.db"
+        monkeypatch.setattr("app.db.session.DATABASE_URL", url)
+        for target in (url, f"sqlite:///{tmp_path}/../{tmp_path.name}/n.db"):
+            result = CliRunner().invoke(app, ["generate-deals", "--database-url", target, "--rows", "10"])
+            assert result.exit_code == 1
+        assert not (tmp_path / "n.db").exists()
+        # Sem destino explícito o comando nem roda
+        assert CliRunner().invoke(app, ["generate-deals", "--rows", "10"]).exit_code != 0
+
+    def test_writes_to_separate_database(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("app.db.session.DATABASE_URL", f"sqlite:///{tmp_path}/n.db")
+        target = f"sqlite:///{tmp_path}/synthetic.db"
+        result = CliRunner().invoke(app, ["generate-deals", "--database-url", target, "--rows", "10", "--seed", "1"])
+        assert result.exit_code == 0, result.output
+        assert _deal_count(target) == 10
+        assert not (tmp_path / "n.db").exists()